@@ -3,15 +3,20 @@ Agent Memory Integration Module
 Integrates self-organizing memory system with OpenClaw/Nanobot
 """
 
+import atexit
 import os
 import sys
-from typing import Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
 from memory_db import get_memory_db, MemoryDB
+from memory_shards import get_shard_router
+from memory_backup import export_backup, restore_backup
+from memory_replica import ReadReplica
 from memory_manager import get_memory_manager, MemoryManager, cell_type_to_emoji
+from update_queue import UpdateQueue
 
 
 class AgentMemoryIntegration:
@@ -32,7 +37,20 @@ class AgentMemoryIntegration:
     def __init__(
         self,
         llm_provider: Optional[Callable] = None,
-        db_path: Optional[str] = None
+        db_path: Optional[str] = None,
+        async_updates: bool = False,
+        max_queue_size: int = 1000,
+        backpressure: str = "block",
+        update_batch_size: int = 32,
+        agent_id: Optional[str] = None,
+        shard_dir: Optional[str] = None,
+        read_replica: bool = False,
+        replica_refresh: float = 300.0,
+        profile_queries: bool = False,
+        slow_query_ms: float = 100.0,
+        slow_query_log: Optional[str] = None,
+        explain_slow_queries: bool = False,
+        dedup: Optional[str] = "default"
     ):
         """
         Initialize agent memory integration
@@ -41,9 +59,61 @@ class AgentMemoryIntegration:
             llm_provider: Optional LLM function with signature: (prompt: str, temperature: float, max_tokens: int) -> str
                          If not provided, uses rule-based extraction
             db_path: Optional path to SQLite database
+            async_updates: Queue update() calls and write them on a background thread
+                           (journaled to <db>_updates.db so queued interactions survive a crash)
+            max_queue_size: Maximum interactions waiting to be written
+            backpressure: When the queue is full, "block" the caller or "drop-oldest"
+            update_batch_size: Interactions extracted and inserted per batch
+            agent_id: Give this agent its own shard database (see memory_shards.py);
+                      db_path is ignored when set
+            shard_dir: Shard directory (default: shards/ next to this module)
+            read_replica: Serve list_all_scenes and get_statistics from a read-only
+                          snapshot (<db>_replica.db) instead of the primary
+            replica_refresh: Seconds between replica refreshes
+            profile_queries: Time every MemoryDB method and SQL statement
+                             (snapshot under get_statistics()["profile"])
+            slow_query_ms: Methods and statements at or above this many ms are logged as slow
+            slow_query_log: Optional JSON-lines file the slow-query log is appended to
+            explain_slow_queries: Capture EXPLAIN QUERY PLAN for slow statements
+            dedup: Duplicate policy for extracted cells: "skip", "merge", "link",
+                   None to always insert, or "default" for the database's
+                   policy ("skip" unless configured; see MemoryDB.insert_cells)
         """
-        self.db = get_memory_db(db_path)
-        self.manager = MemoryManager(self.db, llm_provider)
+        self.agent_id = agent_id
+        if agent_id:
+            self.db = get_shard_router(shard_dir).shard(agent_id)
+        else:
+            self.db = get_memory_db(db_path)
+        if profile_queries:
+            self.db.enable_profiling(
+                slow_ms=slow_query_ms,
+                slow_log_path=slow_query_log,
+                explain=explain_slow_queries
+            )
+        self.manager = MemoryManager(self.db, llm_provider, dedup=dedup)
+
+        # Write-behind update queue (None = update() writes synchronously)
+        self.update_queue = None
+        if async_updates:
+            self.update_queue = UpdateQueue.for_database(
+                self.db.db_path,
+                self.manager.update_many,
+                max_size=max_queue_size,
+                backpressure=backpressure,
+                batch_size=update_batch_size
+            )
+            atexit.register(self.update_queue.close)
+
+        # Read-only snapshot for listing and dashboard reads (None = read the primary)
+        self.replica = None
+        if read_replica:
+            self.replica = ReadReplica(self.db, refresh_interval=replica_refresh)
+            self.replica.start()
+
+    @property
+    def read_db(self) -> MemoryDB:
+        """Database for read-only tooling: the replica when enabled, else the primary"""
+        return self.replica.db if self.replica else self.db
 
     def update(self, user: str, assistant: str) -> int:
         """
@@ -54,24 +124,72 @@ class AgentMemoryIntegration:
             assistant: Assistant response
 
         Returns:
-            Number of memory cells inserted
+            Number of memory cells inserted (0 when queued with async_updates)
         """
+        if self.update_queue:
+            self.update_queue.enqueue(user, assistant)
+            return 0
+
         cell_ids = self.manager.update(user, assistant)
         return len(cell_ids)
 
-    def retrieve_context(self, query: str, limit: int = 6) -> str:
+    def update_many(self, interactions: List[Tuple[str, str]]) -> int:
+        """
+        Update memory with many interactions, batching LLM extraction
+
+        Args:
+            interactions: List of (user, assistant) pairs
+
+        Returns:
+            Number of memory cells inserted
+        """
+        cell_ids = self.manager.update_many(interactions)
+        return len(cell_ids)
+
+    def retrieve_context(self, query: str, limit: int = 6, max_tokens: Optional[int] = None) -> str:
         """
         Retrieve relevant context for a query
 
         Args:
             query: User query or context
             limit: Maximum number of memory cells to retrieve
+            max_tokens: Optional token budget for the retrieved memory; the
+                        most relevant scene summaries per token are packed
+                        first, then individual cells
 
         Returns:
             Formatted context string with scene summaries
         """
-        context = self.manager.retrieve_context_for_query(query, limit)
+        context = self.manager.retrieve_context_for_query(query, limit, max_tokens=max_tokens)
+
+        return self._format_context(context)
+
+    def retrieve_context_many(
+        self,
+        queries: List[str],
+        limit: int = 6,
+        max_tokens: Optional[int] = None
+    ) -> List[str]:
+        """
+        Retrieve context for several queries (e.g. sub-tasks) at once
+
+        Scene summaries are fetched once for every query; results match
+        calling retrieve_context per query.
+
+        Args:
+            queries: User queries or contexts
+            limit: Maximum number of memory cells to retrieve per query
+            max_tokens: Optional token budget per query (see retrieve_context)
+
+        Returns:
+            Formatted context string per query, in query order
+        """
+        contexts = self.manager.retrieve_context_for_queries(queries, limit, max_tokens=max_tokens)
+
+        return [self._format_context(context) for context in contexts]
 
+    def _format_context(self, context: str) -> str:
+        """Wrap retrieved context for the prompt"""
         if not context:
             return "No relevant memory found."
 
@@ -84,14 +202,70 @@ class AgentMemoryIntegration:
 Memory retrieval completed
         """.strip()
 
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for queued updates and background scene consolidation to catch up
+
+        Args:
+            timeout: Maximum seconds to wait for each stage (None waits forever)
+
+        Returns:
+            True if nothing is left pending
+        """
+        if self.update_queue and not self.update_queue.flush(timeout):
+            return False
+        return self.manager.flush(timeout)
+
+    def replay_failed_updates(self, ids: Optional[List[int]] = None) -> int:
+        """
+        Queue dead-lettered updates again (see UpdateQueue.replay_dead_letters)
+
+        Args:
+            ids: Dead-letter ids to replay (None replays all)
+
+        Returns:
+            Number of updates queued (0 without async_updates)
+        """
+        if not self.update_queue:
+            return 0
+        return self.update_queue.replay_dead_letters(ids)
+
+    def close(self) -> None:
+        """Drain background work and stop worker threads"""
+        if self.update_queue:
+            self.update_queue.close()
+            atexit.unregister(self.update_queue.close)
+        self.manager.close()
+        if self.replica:
+            self.replica.close()
+
     def get_statistics(self) -> dict:
         """
         Get memory statistics
 
         Returns:
-            Dict with statistics
+            Dict with statistics (plus llm_cache counters when an LLM cache is in use,
+            update_queue depth/lag with async_updates, replica age with read_replica
+            and method/statement timings with profile_queries)
         """
-        return self.db.get_statistics()
+        stats = self.read_db.get_statistics()
+
+        if self.manager.llm_cache:
+            stats["llm_cache"] = self.manager.llm_cache.stats()
+
+        if self.update_queue:
+            stats["update_queue"] = self.update_queue.stats()
+
+        if self.replica:
+            stats["replica"] = {
+                "path": self.replica.replica_path,
+                "age_seconds": round(self.replica.age(), 1)
+            }
+
+        if self.db.profiler:
+            stats["profile"] = self.db.profiler.snapshot()
+
+        return stats
 
     def list_all_scenes(self) -> str:
         """
@@ -100,7 +274,7 @@ Memory retrieval completed
         Returns:
             Formatted string with scene summaries
         """
-        scenes = self.db.get_all_scenes()
+        scenes = self.read_db.get_all_scenes()
 
         if not scenes:
             return "No scenes found in memory."
@@ -197,13 +371,25 @@ Memory retrieval completed
 
         return output.strip()
 
-    def export_memory_backup(self) -> str:
+    def export_memory_backup(self, dest_dir: Optional[str] = None) -> str:
         """
-        Export memory data as JSON backup
+        Export memory data as a backup
+
+        With dest_dir, streams cells, scenes and metadata into a compressed
+        NDJSON backup (see memory_backup.py) that restore_memory_backup can
+        load. Without it, returns the scene summaries as a JSON string.
+
+        Args:
+            dest_dir: Backup directory to write
 
         Returns:
-            JSON string of all memory data
+            Path of the backup manifest, or JSON string of the scene summaries
         """
+        if dest_dir:
+            self.flush()
+            export_backup(self.db, dest_dir)
+            return os.path.join(dest_dir, "manifest.json")
+
         import json
         from datetime import datetime
 
@@ -217,14 +403,47 @@ Memory retrieval completed
 
         return json.dumps(backup_data, indent=2)
 
+    def restore_memory_backup(self, backup_dir: str, replace: bool = False) -> Dict:
+        """
+        Load a backup written by export_memory_backup(dest_dir)
+
+        Args:
+            backup_dir: Backup directory
+            replace: Overwrite the current memory if it is not empty
+
+        Returns:
+            Rows restored per table
+        """
+        self.flush()
+        return restore_backup(backup_dir, self.db, replace=replace)
+
+    def hot_backup(self, dest_path: str) -> Dict:
+        """
+        Copy the whole database file while agents keep writing
+
+        Args:
+            dest_path: Backup file (a complete agent_memory.db that opens as-is)
+
+        Returns:
+            Backup report: pages, steps and seconds
+        """
+        self.flush()
+        return self.db.backup(dest_path)
+
 
 # Singleton instance
 _memory_integration_instance = None
 
+# Sharded instances by agent id
+_agent_memory_instances = {}
+
 
 def get_agent_memory(
     llm_provider: Optional[Callable] = None,
-    db_path: Optional[str] = None
+    db_path: Optional[str] = None,
+    async_updates: bool = False,
+    agent_id: Optional[str] = None,
+    dedup: Optional[str] = "default"
 ) -> AgentMemoryIntegration:
     """
     Get singleton instance of agent memory integration
@@ -232,16 +451,31 @@ def get_agent_memory(
     Args:
         llm_provider: Optional LLM function
         db_path: Optional database path
+        async_updates: Queue updates and write them in the background
+        agent_id: Get the agent's own sharded instance instead
+        dedup: Duplicate policy for extracted cells (used when the instance is created)
 
     Returns:
         AgentMemoryIntegration instance
     """
     global _memory_integration_instance
 
+    if agent_id:
+        if agent_id not in _agent_memory_instances:
+            _agent_memory_instances[agent_id] = AgentMemoryIntegration(
+                llm_provider=llm_provider,
+                async_updates=async_updates,
+                agent_id=agent_id,
+                dedup=dedup
+            )
+        return _agent_memory_instances[agent_id]
+
     if _memory_integration_instance is None:
         _memory_integration_instance = AgentMemoryIntegration(
             llm_provider=llm_provider,
-            db_path=db_path
+            db_path=db_path,
+            async_updates=async_updates,
+            dedup=dedup
         )
 
     return _memory_integration_instance
@@ -262,6 +496,9 @@ def example_usage():
         assistant="I'll help you set up daily (8:00 AM) and weekly (Sunday 10:00 AM) cron jobs."
     )
 
+    # Scene summaries are consolidated in the background
+    memory.flush()
+
     # Retrieve context
     print("\nRetrieving context...")
     context = memory.retrieve_context("cron automation")
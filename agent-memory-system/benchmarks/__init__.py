@@ -0,0 +1,10 @@
+"""
+Benchmarks for the Self-Organizing Agent Memory System
+
+    python -m benchmarks --scale 10k 100k          # from agent-memory-system/
+    python -m benchmarks --scale 10k --compare benchmarks/results/<old>.json
+
+Modules:
+    corpus    - deterministic synthetic cells, scenes, queries and interactions
+    runner    - measurements and the JSON result files
+"""
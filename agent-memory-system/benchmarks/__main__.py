@@ -0,0 +1,6 @@
+"""Run the memory benchmarks: python -m benchmarks --help"""
+
+from benchmarks.runner import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Synthetic Corpus Generator for memory benchmarks
+
+Generates cells that look like what extraction produces from agent
+conversations: a few thousand scenes of skewed size, the repo's six cell
+types with their usual saliences, and short sentences whose words follow a
+Zipf distribution (a small vocabulary of frequent words and a long tail of
+rare ones, like real text). Everything is derived from a seed, so the same
+scale and seed always produce the same corpus.
+"""
+
+import itertools
+import random
+from typing import Dict, Iterator, List, Tuple
+
+# Cell types with their share of the corpus and base salience
+CELL_TYPES = [
+    ("fact", 0.45, 0.7),
+    ("task", 0.2, 0.8),
+    ("plan", 0.12, 0.8),
+    ("decision", 0.1, 0.9),
+    ("preference", 0.08, 0.85),
+    ("risk", 0.05, 0.75),
+]
+
+# Frequent domain words; the long tail is made of generated words
+DOMAIN_WORDS = """
+agent memory task plan user cron deploy week skill model config database query
+cache latency token budget scene summary report error fix test build release
+workflow pipeline schedule trading bot api key limit quota retry timeout server
+dashboard metric alert backup import export index search vector embedding
+""".split()
+
+SCENE_TOPICS = """
+agent-army automation productivity skills trading research infra dashboard
+user-preferences planning releases incidents experiments integrations
+""".split()
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "qu", "do", "fi", "gu", "he", "ja"]
+
+_TEMPLATES = [
+    "{w} {w} the {w} {w} for {w} {w}",
+    "user wants {w} {w} before the {w} {w}",
+    "decided to use {w} {w} instead of {w}",
+    "{w} {w} failed because of {w} {w} {w}",
+    "next step is to {w} the {w} {w} by {w}",
+    "{w} reduced {w} {w} from {n} to {n} {w}",
+    "remember that {w} {w} needs {w} {w} {w}",
+]
+
+
+class SyntheticCorpus:
+    """
+    Deterministic synthetic memory corpus
+
+    Usage:
+        corpus = SyntheticCorpus(100_000)
+        for batch in corpus.batches(500):
+            db.insert_cells(batch)
+        queries = corpus.queries(200)
+    """
+
+    def __init__(self, cells: int, seed: int = 42, vocabulary: int = 20000, cells_per_scene: int = 50):
+        """
+        Initialize corpus
+
+        Args:
+            cells: Number of cells to generate
+            seed: Random seed
+            vocabulary: Distinct words (domain words plus generated ones)
+            cells_per_scene: Average scene size (scene sizes are skewed)
+        """
+        self.cells = cells
+        self.seed = seed
+
+        rng = random.Random(seed)
+
+        generated = (
+            "".join(parts)
+            for length in itertools.count(2)
+            for parts in itertools.product(_SYLLABLES, repeat=length)
+        )
+        tail = [word for word in itertools.islice(generated, vocabulary) if word not in DOMAIN_WORDS]
+        self.words = DOMAIN_WORDS + tail[:max(0, vocabulary - len(DOMAIN_WORDS))]
+        rng.shuffle(self.words)
+
+        # Zipf: the word at rank r is drawn with weight 1/r
+        self._word_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(self.words) + 1)))
+
+        scene_count = max(1, cells // cells_per_scene)
+        self.scenes = [
+            f"{rng.choice(SCENE_TOPICS)}-{self.words[rng.randrange(len(self.words))]}-{i}"
+            for i in range(scene_count)
+        ]
+        # Skewed scene sizes: a few hot scenes, many small ones
+        self._scene_weights = list(itertools.accumulate(1.0 / (rank ** 0.8) for rank in range(1, scene_count + 1)))
+
+        self._type_weights = list(itertools.accumulate(share for _, share, _ in CELL_TYPES))
+
+    def _sentence(self, rng: random.Random) -> str:
+        """One cell sentence from a template filled with Zipf-distributed words"""
+        template = rng.choice(_TEMPLATES)
+        words = iter(rng.choices(self.words, cum_weights=self._word_weights, k=template.count("{w}")))
+        return template.replace("{n}", str(rng.randint(1, 500))).format_map(_Words(words))
+
+    def iter_cells(self) -> Iterator[Dict]:
+        """
+        Stream the corpus cells
+
+        Yields:
+            Dicts with keys: scene, cell_type, salience, content
+        """
+        rng = random.Random(self.seed + 1)
+
+        for _ in range(self.cells):
+            cell_type, _, salience = CELL_TYPES[
+                rng.choices(range(len(CELL_TYPES)), cum_weights=self._type_weights)[0]
+            ]
+            yield {
+                "scene": rng.choices(self.scenes, cum_weights=self._scene_weights)[0],
+                "cell_type": cell_type,
+                "salience": round(min(1.0, max(0.1, salience + rng.gauss(0, 0.05))), 3),
+                "content": self._sentence(rng)
+            }
+
+    def batches(self, batch_size: int = 500) -> Iterator[List[Dict]]:
+        """Stream the corpus in lists of batch_size cells"""
+        cells = self.iter_cells()
+        while True:
+            batch = list(itertools.islice(cells, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def queries(self, count: int, words: Tuple[int, int] = (1, 3)) -> List[str]:
+        """
+        Retrieval queries drawn from the same word distribution as the cells
+
+        Args:
+            count: Number of queries
+            words: Minimum and maximum words per query
+
+        Returns:
+            List of query strings
+        """
+        rng = random.Random(self.seed + 2)
+        return [
+            " ".join(rng.choices(self.words, cum_weights=self._word_weights, k=rng.randint(*words)))
+            for _ in range(count)
+        ]
+
+    def interactions(self, count: int) -> List[Tuple[str, str]]:
+        """
+        (user, assistant) pairs for MemoryManager.update benchmarks
+
+        Args:
+            count: Number of interactions
+
+        Returns:
+            List of (user, assistant) tuples
+        """
+        rng = random.Random(self.seed + 3)
+        return [
+            (f"{self._sentence(rng)}. {self._sentence(rng)}?", f"{self._sentence(rng)}. {self._sentence(rng)}.")
+            for _ in range(count)
+        ]
+
+
+class _Words(dict):
+    """format_map source handing out the next word for every {w}"""
+
+    def __init__(self, words: Iterator[str]):
+        super().__init__()
+        self._words = words
+
+    def __missing__(self, key: str) -> str:
+        return next(self._words)
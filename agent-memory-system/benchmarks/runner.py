@@ -0,0 +1,332 @@
+"""
+Benchmark Runner for the Self-Organizing Agent Memory System
+
+Each scale runs in a fresh process against a fresh temporary database and
+measures:
+
+    insert       cells/s through MemoryDB.insert_cells
+    retrieval    retrieve_context and retrieve_scene_context latency (p50/p95/p99)
+    consolidate  rule-based MemoryManager.consolidate_scene time per scene
+    update       MemoryManager.update_many throughput (rule-based extraction)
+    storage      database size and peak RSS
+
+Results are written as JSON with the git commit, so runs of different
+commits can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+# Memory modules live one directory up (flat layout)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_db import MemoryDB
+from memory_manager import MemoryManager
+from benchmarks.corpus import SyntheticCorpus
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Metrics shown by --compare: (section, key, higher is better)
+COMPARED_METRICS = [
+    ("insert", "cells_per_second", True),
+    ("retrieve_context", "p50_ms", False),
+    ("retrieve_context", "p99_ms", False),
+    ("retrieve_scene_context", "p50_ms", False),
+    ("retrieve_scene_context", "p99_ms", False),
+    ("consolidation", "mean_ms", False),
+    ("update", "interactions_per_second", True),
+    ("storage", "db_bytes", False),
+    ("storage", "peak_rss_mb", False),
+]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean and max of latency samples in seconds, as milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def at(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(at(0.50), 3),
+        "p95_ms": round(at(0.95), 3),
+        "p99_ms": round(at(0.99), 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> Optional[str]:
+    """Current commit of the repository, if it is one"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(
+    cells: int,
+    queries: int = 200,
+    consolidate_scenes: int = 50,
+    interactions: int = 1000,
+    batch_size: int = 500,
+    dedup: Optional[str] = "merge",
+    seed: int = 42,
+    work_dir: Optional[str] = None
+) -> Dict:
+    """
+    Benchmark one corpus size against a fresh database
+
+    Args:
+        cells: Corpus size
+        queries: Retrieval queries timed (each run once, so no result cache hits)
+        consolidate_scenes: Scenes consolidated (the largest ones)
+        interactions: Interactions pushed through MemoryManager.update_many
+        batch_size: Cells per insert_cells transaction
+        dedup: Near-duplicate policy for the inserts
+        seed: Corpus seed
+        work_dir: Directory for the temporary database (default: system temp)
+
+    Returns:
+        Result dict for this scale
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="memory-bench-", dir=work_dir)
+    db = MemoryDB(os.path.join(tmp_dir, "bench.db"), dedup=dedup)
+    corpus = SyntheticCorpus(cells, seed=seed)
+
+    try:
+        # Insert throughput (corpus generation is not timed)
+        insert_seconds = 0.0
+        for batch in corpus.batches(batch_size):
+            started = time.perf_counter()
+            db.insert_cells(batch, batch_size=batch_size)
+            insert_seconds += time.perf_counter() - started
+
+        stats = db.get_statistics()
+
+        # Retrieval latency over distinct queries
+        query_list = corpus.queries(queries)
+        context_samples = []
+        for query in query_list:
+            started = time.perf_counter()
+            db.retrieve_context(query)
+            context_samples.append(time.perf_counter() - started)
+
+        scene_samples = []
+        for query in query_list:
+            started = time.perf_counter()
+            db.retrieve_scene_context(query)
+            scene_samples.append(time.perf_counter() - started)
+
+        # Consolidation of the largest scenes (full, rule-based rebuilds)
+        manager = MemoryManager(db, llm_provider=None, background_consolidation=False, llm_cache=False)
+        largest = sorted(stats["cells_by_scene"].items(), key=lambda item: item[1], reverse=True)
+        consolidation_samples = []
+        for scene, _ in largest[:consolidate_scenes]:
+            started = time.perf_counter()
+            manager.consolidate_scene(scene, incremental=False)
+            consolidation_samples.append(time.perf_counter() - started)
+
+        # End-to-end updates: extraction, insert and consolidation
+        interaction_list = corpus.interactions(interactions)
+        started = time.perf_counter()
+        manager.update_many(interaction_list)
+        manager.flush()
+        update_seconds = time.perf_counter() - started
+
+        wal_path = db.db_path + "-wal"
+        result = {
+            "cells": cells,
+            "insert": {
+                "seconds": round(insert_seconds, 3),
+                "cells_per_second": round(cells / insert_seconds, 1) if insert_seconds else None,
+                "batch_size": batch_size,
+                "dedup": dedup,
+                "stored_cells": stats["total_cells"],
+                "scenes": len(stats["cells_by_scene"])
+            },
+            "retrieve_context": percentiles(context_samples),
+            "retrieve_scene_context": percentiles(scene_samples),
+            "consolidation": dict(percentiles(consolidation_samples), total_seconds=round(sum(consolidation_samples), 3)),
+            "update": {
+                "interactions": interactions,
+                "seconds": round(update_seconds, 3),
+                "interactions_per_second": round(interactions / update_seconds, 1) if update_seconds else None
+            },
+            "storage": {
+                "db_bytes": db.database_size(),
+                "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+                "peak_rss_mb": peak_rss_mb()
+            }
+        }
+
+        manager.close()
+        return result
+    finally:
+        db.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def run(scales: List[str], **options) -> Dict:
+    """
+    Benchmark several scales, each in its own process so RSS is not shared
+
+    Args:
+        scales: Keys of SCALES or plain cell counts
+        **options: run_scale options
+
+    Returns:
+        Result document: environment, options and results per scale
+    """
+    results = {}
+    for scale in scales:
+        cells = SCALES.get(scale.lower()) or int(scale)
+        print(f"⏱️  Benchmarking {scale} cells...")
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results[scale] = pool.submit(run_scale, cells, **options).result()
+
+        summary = results[scale]
+        print(
+            f"   insert {summary['insert']['cells_per_second']} cells/s, "
+            f"retrieve p50 {summary['retrieve_context']['p50_ms']} ms / p99 {summary['retrieve_context']['p99_ms']} ms, "
+            f"db {summary['storage']['db_bytes'] / 1e6:.1f} MB, rss {summary['storage']['peak_rss_mb']} MB"
+        )
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "options": options,
+        "results": results
+    }
+
+
+def save(document: Dict, path: Optional[str] = None) -> str:
+    """
+    Write a result document as JSON
+
+    Args:
+        document: Result of run()
+        path: Output file (default: results/<timestamp>_<commit>.json)
+
+    Returns:
+        Path written
+    """
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}_{document.get('commit') or 'nogit'}.json")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+
+    return path
+
+
+def compare(old: Dict, new: Dict) -> List[Dict]:
+    """
+    Metric changes between two result documents
+
+    Args:
+        old: Baseline result document
+        new: New result document
+
+    Returns:
+        Rows with scale, metric, old, new, change_pct and improved
+    """
+    rows = []
+    for scale, result in new["results"].items():
+        baseline = old["results"].get(scale)
+        if not baseline:
+            continue
+
+        for section, key, higher_is_better in COMPARED_METRICS:
+            before = baseline.get(section, {}).get(key)
+            after = result.get(section, {}).get(key)
+            if not before or after is None:
+                continue
+
+            change = (after - before) / before * 100
+            rows.append({
+                "scale": scale,
+                "metric": f"{section}.{key}",
+                "old": before,
+                "new": after,
+                "change_pct": round(change, 1),
+                "improved": change > 0 if higher_is_better else change < 0
+            })
+
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the agent memory system")
+    parser.add_argument("--scale", nargs="+", default=["10k"], help="10k, 100k, 1m or a cell count")
+    parser.add_argument("--queries", type=int, default=200, help="Retrieval queries timed per scale")
+    parser.add_argument("--consolidate-scenes", type=int, default=50, help="Scenes consolidated per scale")
+    parser.add_argument("--interactions", type=int, default=1000, help="Interactions pushed through update_many")
+    parser.add_argument("--batch-size", type=int, default=500, help="Cells per insert transaction")
+    parser.add_argument("--dedup", default="merge", help="Insert dedup policy (skip, merge, link or none)")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed")
+    parser.add_argument("--work-dir", help="Directory for temporary databases")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    document = run(
+        args.scale,
+        queries=args.queries,
+        consolidate_scenes=args.consolidate_scenes,
+        interactions=args.interactions,
+        batch_size=args.batch_size,
+        dedup=None if args.dedup.lower() == "none" else args.dedup,
+        seed=args.seed,
+        work_dir=args.work_dir
+    )
+
+    path = save(document, args.output)
+    print(f"\n📄 Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        print(f"\n📊 Compared with {baseline.get('commit') or args.compare}:")
+        for row in compare(baseline, document):
+            mark = "➖" if row["change_pct"] == 0 else ("✅" if row["improved"] else "⚠️ ")
+            print(f"   {mark} {row['scale']:>6} {row['metric']:<30} {row['old']:>12} → {row['new']:<12} ({row['change_pct']:+.1f}%)")
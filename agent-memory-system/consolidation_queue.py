@@ -0,0 +1,164 @@
+"""
+Consolidation Queue Module for Self-Organizing Agent Memory System
+Runs scene consolidation on background worker threads with per-scene debouncing
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+
+class ConsolidationQueue:
+    """
+    Debounced background queue of dirty scenes
+
+    Marking a scene dirty schedules it for consolidation after
+    debounce_seconds. Marking it again inside that window pushes the deadline
+    back, so a burst of updates to one scene costs a single consolidation.
+    max_delay_seconds bounds how long a continuously updated scene can wait.
+    The same scene is never consolidated by two workers at once.
+    """
+
+    def __init__(
+        self,
+        consolidate: Callable[[str], object],
+        debounce_seconds: float = 2.0,
+        max_delay_seconds: float = 10.0,
+        workers: int = 2
+    ):
+        """
+        Initialize consolidation queue and start worker threads
+
+        Args:
+            consolidate: Function called with a scene identifier
+            debounce_seconds: Quiet period before a dirty scene is consolidated
+            max_delay_seconds: Upper bound on delay since a scene first became dirty
+            workers: Number of worker threads
+        """
+        self.consolidate = consolidate
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+        self._cond = threading.Condition()
+        self._dirty: Dict[str, Tuple[float, float]] = {}  # scene -> (first_marked, deadline)
+        self._running: Set[str] = set()
+        self._closed = False
+
+        self.consolidated_count = 0
+        self.failed_count = 0
+
+        self._threads = [
+            threading.Thread(
+                target=self._worker,
+                name=f"memory-consolidation-{i}",
+                daemon=True
+            )
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def mark_dirty(self, scene: str) -> None:
+        """
+        Schedule a scene for consolidation
+
+        Args:
+            scene: Scene identifier
+        """
+        now = time.monotonic()
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ConsolidationQueue is closed")
+
+            first_marked = self._dirty.get(scene, (now, now))[0]
+            deadline = min(now + self.debounce_seconds, first_marked + self.max_delay_seconds)
+            self._dirty[scene] = (first_marked, deadline)
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        """Number of scenes waiting for or undergoing consolidation"""
+        with self._cond:
+            return len(self._dirty) + len(self._running)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Consolidate every dirty scene now and wait for the workers to finish
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        with self._cond:
+            for scene, (first_marked, _) in self._dirty.items():
+                self._dirty[scene] = (first_marked, 0.0)
+            self._cond.notify_all()
+
+            return self._cond.wait_for(
+                lambda: not self._dirty and not self._running,
+                timeout
+            )
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Drain pending scenes and stop worker threads
+
+        Args:
+            timeout: Maximum seconds to wait for the drain
+        """
+        self.flush(timeout)
+
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _next_scene(self) -> Optional[str]:
+        """Wait for the next due scene; returns None once closed and drained (lock held)"""
+        while True:
+            if self._closed and not self._dirty:
+                return None
+
+            now = time.monotonic()
+            next_deadline = None
+
+            for scene, (_, deadline) in self._dirty.items():
+                if scene in self._running:
+                    continue
+                if deadline <= now:
+                    del self._dirty[scene]
+                    self._running.add(scene)
+                    return scene
+                if next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+
+            timeout = None if next_deadline is None else next_deadline - now
+            self._cond.wait(timeout)
+
+    def _worker(self) -> None:
+        """Worker loop: consolidate due scenes until closed"""
+        while True:
+            with self._cond:
+                scene = self._next_scene()
+
+            if scene is None:
+                return
+
+            succeeded = False
+            try:
+                self.consolidate(scene)
+                succeeded = True
+            except Exception as e:
+                print(f"Background consolidation of scene '{scene}' failed: {e}")
+            finally:
+                with self._cond:
+                    if succeeded:
+                        self.consolidated_count += 1
+                    else:
+                        self.failed_count += 1
+                    self._running.discard(scene)
+                    self._cond.notify_all()
@@ -0,0 +1,125 @@
+"""
+Context Cache Module for Self-Organizing Agent Memory System
+LRU cache of assembled scene contexts with per-scene invalidation
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query the way the FTS lookup sees it
+
+    Tokens are OR-ed together, so case, punctuation, order and repeats do not
+    change the result.
+
+    Args:
+        query: Raw query
+
+    Returns:
+        Sorted, de-duplicated, lowercase alphanumeric tokens joined by spaces
+    """
+    return " ".join(sorted(set(re.findall(r"[a-z0-9]+", query.lower()))))
+
+
+class ContextCache:
+    """
+    Thread-safe LRU cache of scene contexts
+
+    Each entry remembers the scenes it references; invalidate_scene() drops
+    every entry that references a scene whose summary changed. Entries also
+    expire after ttl_seconds so newly matching cells show up eventually.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 60.0):
+        """
+        Initialize context cache
+
+        Args:
+            max_entries: Maximum number of cached contexts
+            ttl_seconds: Seconds an entry stays valid (0 disables expiry)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, scenes, value)
+        self._by_scene: Dict[str, Set[Hashable]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[List[Dict]]:
+        """
+        Look up a cached context
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value (a fresh list of copies) or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or (self.ttl_seconds and entry[0] < time.monotonic()):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(item) for item in entry[2]]
+
+    def put(self, key: Hashable, value: List[Dict], scenes: Set[str]) -> None:
+        """
+        Store a context
+
+        Args:
+            key: Cache key
+            value: Rows to cache
+            scenes: Scenes referenced by the value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[key] = (expires_at, frozenset(scenes), [dict(item) for item in value])
+            for scene in scenes:
+                self._by_scene.setdefault(scene, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_scene(self, scene: str) -> None:
+        """
+        Drop every entry that references a scene
+
+        Args:
+            scene: Scene identifier
+        """
+        with self._lock:
+            for key in list(self._by_scene.get(scene, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._by_scene.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove one entry and its scene references (lock held)"""
+        _, scenes, _ = self._entries.pop(key)
+        for scene in scenes:
+            keys = self._by_scene.get(scene)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_scene[scene]
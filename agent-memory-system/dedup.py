@@ -0,0 +1,185 @@
+"""
+Near-Duplicate Detection Module for Self-Organizing Agent Memory System
+MinHash signatures and LSH banding used by MemoryDB to suppress duplicate cells
+
+Each cell's word set is summarised by NUM_PERM MinHash values. The signature is
+split into BANDS bands of ROWS values and each band is hashed to a bucket, so
+cells with high Jaccard similarity share at least one bucket with high
+probability (about 0.99 at similarity 0.8) and a lookup is one indexed probe
+per band. Candidates are then confirmed against the estimated similarity.
+
+Exact duplicates ("skip" and "merge") never need a signature: content_hash
+gives them an indexed equality lookup.
+
+Signatures are computed with NumPy when it is installed (the same values as
+the pure-Python path, so stored fingerprints stay comparable).
+"""
+
+import hashlib
+import random
+import re
+import struct
+from functools import lru_cache
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; minhash falls back to pure Python
+    np = None
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity at which "link" treats a cell as a near-duplicate
+DEFAULT_THRESHOLD = 0.7
+
+DEDUP_POLICIES = ("skip", "merge", "link")
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x6D656D)  # fixed seed: signatures are persisted
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+if np is not None:
+    # Permutation multipliers split into 31-bit halves so every partial product fits in uint64
+    _A = np.array([a for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    _A_HI, _A_LO = _A >> np.uint64(31), _A & np.uint64((1 << 31) - 1)
+    _B = np.array([b for _, b in _PERMUTATIONS], dtype=np.uint64)[:, None]
+
+
+def content_key(text: str) -> str:
+    """
+    Normalized word sequence of a text
+
+    Two cells with the same key say the same thing word for word (case,
+    punctuation and spacing aside); only those count as exact duplicates.
+    """
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def content_hash(text: str) -> int:
+    """
+    Signed 64-bit hash of a text's content_key
+
+    Stored in mem_cells.content_hash so exact duplicates are found with one
+    indexed lookup; callers still compare content_key on a hit.
+    """
+    digest = hashlib.blake2b(content_key(text).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@lru_cache(maxsize=65536)
+def _word_hash(word: str) -> int:
+    """64-bit hash of a word (cached: cell vocabularies repeat heavily)"""
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _mod_prime(x):
+    """Reduce uint64 values modulo the Mersenne prime 2^61 - 1"""
+    p = np.uint64(_PRIME)
+    x = (x & p) + (x >> np.uint64(61))
+    x = (x & p) + (x >> np.uint64(61))
+    return np.where(x >= p, x - p, x)
+
+
+def _signatures_numpy(hashes: List[int], starts: List[int]) -> "np.ndarray":
+    """
+    min over words of (a * h + b) mod p, per permutation and text
+
+    Args:
+        hashes: Word hashes of every text, concatenated
+        starts: Offset of each text's first hash in hashes
+
+    Returns:
+        Array of shape (texts, NUM_PERM)
+    """
+    h = _mod_prime(np.array(hashes, dtype=np.uint64))[None, :]
+    h_hi, h_lo = h >> np.uint64(31), h & np.uint64((1 << 31) - 1)
+
+    # a*h = hi*2^62 + mid*2^31 + lo, with 2^61 = 1 (mod p)
+    hi = _A_HI * h_hi
+    mid = _A_HI * h_lo + _A_LO * h_hi
+    lo = _A_LO * h_lo
+    mid_hi, mid_lo = mid >> np.uint64(30), mid & np.uint64((1 << 30) - 1)
+
+    x = _mod_prime(hi * np.uint64(2) + mid_hi + (mid_lo << np.uint64(31)))
+    values = _mod_prime(x + _mod_prime(lo) + _B)
+    return (np.minimum.reduceat(values, starts, axis=1) & np.uint64(0xFFFFFFFF)).T
+
+
+def minhash(text: str) -> Optional[bytes]:
+    """
+    Compute the MinHash signature of the words in text
+
+    Args:
+        text: Cell content
+
+    Returns:
+        Packed signature of NUM_PERM 32-bit values, or None if text has no words
+    """
+    return minhash_many([text])[0]
+
+
+def minhash_many(texts: List[str]) -> List[Optional[bytes]]:
+    """
+    Compute MinHash signatures for many texts at once
+
+    With NumPy, all words of all texts go through the permutations in one
+    vectorized pass, which is where batch inserts spend their time.
+
+    Args:
+        texts: Cell contents
+
+    Returns:
+        One packed signature (or None for a text without words) per text
+    """
+    word_hashes = [
+        [_word_hash(word) for word in set(re.findall(r"[a-z0-9]+", text.lower()))]
+        for text in texts
+    ]
+    signatures: List[Optional[bytes]] = [None] * len(texts)
+    present = [i for i, hashes in enumerate(word_hashes) if hashes]
+
+    if np is not None and present:
+        starts = []
+        flat = []
+        for i in present:
+            starts.append(len(flat))
+            flat.extend(word_hashes[i])
+        packed = _signatures_numpy(flat, starts).astype("<u4")
+        for row, i in enumerate(present):
+            signatures[i] = packed[row].tobytes()
+        return signatures
+
+    for i in present:
+        signatures[i] = struct.pack(
+            f"<{NUM_PERM}I",
+            *[min((a * h + b) % _PRIME for h in word_hashes[i]) & 0xFFFFFFFF for a, b in _PERMUTATIONS]
+        )
+    return signatures
+
+def lsh_buckets(signature: bytes) -> List[int]:
+    """
+    Hash each band of a signature to a bucket
+
+    Args:
+        signature: Packed MinHash signature
+
+    Returns:
+        One signed 64-bit bucket per band (band index = list position)
+    """
+    band_bytes = 4 * ROWS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * band_bytes:(band + 1) * band_bytes], digest_size=8).digest(),
+            "big",
+            signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    values_a = struct.unpack(f"<{NUM_PERM}I", a)
+    values_b = struct.unpack(f"<{NUM_PERM}I", b)
+    return sum(x == y for x, y in zip(values_a, values_b)) / NUM_PERM
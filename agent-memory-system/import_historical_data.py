@@ -1,17 +1,35 @@
 """
 Historical Data Import Script
 Imports data from MEMORY.md into self-organizing memory system
+
+Imports are incremental: a manifest in the memory database records the
+size, mtime and content hash of every imported file, so a re-run only
+parses the files that changed and replaces just their cells. Changed files
+are parsed in a process pool and their cells streamed into batched inserts.
 """
 
+import hashlib
 import os
 import re
 import json
-from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 # Import memory system
 from memory_db import get_memory_db, MemoryDB
 from memory_manager import MemoryManager
+from memory_classifier import get_classifier
+
+# Directories never searched for importable files
+SKIP_DIRS = {".git", "node_modules", "__pycache__"}
+
+# Keyword sections of MEMORY.md imported besides the heartbeat log: (scene, header keyword)
+MEMORY_SECTIONS = [
+    ("agent-army", "Agent Army"),
+    ("productivity", "Productivity"),
+    ("skills", "Skills"),
+]
 
 
 def parse_memory_markdown(memory_path: str) -> List[Dict]:
@@ -24,58 +42,119 @@ def parse_memory_markdown(memory_path: str) -> List[Dict]:
     Returns:
         List of memory cell dictionaries
     """
-    cells = []
+    return list(iter_memory_markdown(memory_path))
+
+
+def iter_memory_markdown(memory_path: str) -> Iterator[Dict]:
+    """
+    Stream memory cells from MEMORY.md, reading it line by line
+
+    Each dated entry (### YYYY-MM-DD) of the HEARTBEAT LOG section becomes
+    a block classified into a scene; the first section whose header names
+    one of MEMORY_SECTIONS is imported into that section's scene.
+
+    Args:
+        memory_path: Path to MEMORY.md file
+
+    Yields:
+        Memory cell dictionaries
+    """
+    for _, cells in parse_memory_sections(memory_path):
+        yield from cells
+
 
+def parse_memory_sections(memory_path: str) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Stream the imported sections of MEMORY.md with their cells
+
+    Args:
+        memory_path: Path to MEMORY.md file
+
+    Yields:
+        Tuples of (section key, cells); the key changes whenever the section does
+    """
     with open(memory_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        for text, scene in _memory_blocks(f):
+            scene = scene or get_classifier("import").classify(text)[0]
+            yield section_key(scene, text), extract_facts_from_text(text, scene)
 
-    # Extract HEARTBEAT LOG section
-    heartbeat_match = re.search(r'## 📋 HEARTBEAT LOG\s+(.*?)(?=\n##|\Z)', content, re.DOTALL)
 
-    if heartbeat_match:
-        heartbeat_content = heartbeat_match.group(1)
+def _memory_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+    """Split MEMORY.md lines into (text, scene) blocks; scene None for heartbeat entries"""
+    remaining_sections = list(MEMORY_SECTIONS)
+    in_heartbeat = False
+    block: List[str] = []
+    block_scene: Optional[str] = None
+    collecting = False
 
-        # Extract date entries
-        date_matches = re.finditer(
-            r'### (\d{4}-\d{2}-\d{2}.*?)(?=### \d{4}|\Z)',
-            heartbeat_content,
-            re.DOTALL
-        )
+    for line in lines:
+        if line.startswith('## ') or line.startswith('### '):
+            # A header ends the current block
+            if block:
+                yield "".join(block), block_scene
+            block = []
+            block_scene = None
+
+            if line.startswith('## '):
+                in_heartbeat = line.startswith('## 📋 HEARTBEAT LOG')
+                for scene_name, keyword in remaining_sections:
+                    if keyword in line:
+                        remaining_sections.remove((scene_name, keyword))
+                        block_scene = scene_name
+                        collecting = True
+                        break
+                else:
+                    collecting = False
+            else:
+                collecting = in_heartbeat and re.match(r'### \d{4}-\d{2}-\d{2}', line) is not None
+                if collecting:
+                    block.append(line[4:])
+
+            continue
 
-        for match in date_matches:
-            date_section = match.group(1)
-            date_line = match.group(1).split('\n')[0]
-
-            # Determine scene from date section
-            scene = "general"
-            if "user" in date_section.lower() and "prefer" in date_section.lower():
-                scene = "user-preferences"
-            elif "sub-agent" in date_section.lower():
-                scene = "subagent-capacity"
-            elif "system health" in date_section.lower():
-                scene = "system-health"
-
-            # Extract facts from section
-            facts = extract_facts_from_text(date_section, scene)
-            cells.extend(facts)
-
-    # Extract other structured sections
-    sections = [
-        ("agent-army", "Agent Army"),
-        ("productivity", "Productivity"),
-        ("skills", "Skills"),
-    ]
-
-    for scene_name, keyword in sections:
-        pattern = rf'## [^#]*{keyword}[^\n]+\s+(.*?)(?=\n##|\Z)'
-        match = re.search(pattern, content, re.DOTALL)
-
-        if match:
-            section_content = match.group(1)
-            facts = extract_facts_from_text(section_content, scene_name)
-            cells.extend(facts)
+        if collecting:
+            block.append(line)
 
-    return cells
+    if block:
+        yield "".join(block), block_scene
+
+
+def parse_doc_sections(doc_path: str) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Stream the sections of a workspace document with their cells
+
+    Every markdown header starts a section. Sections go to the scene the
+    import classifier picks, falling back to one named after the file.
+
+    Args:
+        doc_path: Path to the markdown document
+
+    Yields:
+        Tuples of (section key, cells)
+    """
+    default_scene = re.sub(r'[^a-z0-9]+', '-', os.path.splitext(os.path.basename(doc_path))[0].lower()).strip('-')
+    classifier = get_classifier("import")
+    block: List[str] = []
+
+    def section() -> Tuple[str, List[Dict]]:
+        text = "".join(block)
+        scene = classifier.classify(text, default_scene)[0]
+        return section_key(scene, text), extract_facts_from_text(text, scene)
+
+    with open(doc_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') and block:
+                yield section()
+                block = []
+            block.append(line)
+
+    if block:
+        yield section()
+
+
+def section_key(scene: str, text: str) -> str:
+    """Content key of a parsed section"""
+    return hashlib.sha1(f"{scene}\n{text}".encode('utf-8')).hexdigest()[:16]
 
 
 def extract_facts_from_text(text: str, default_scene: str) -> List[Dict]:
@@ -90,6 +169,7 @@ def extract_facts_from_text(text: str, default_scene: str) -> List[Dict]:
         List of memory cell dictionaries
     """
     cells = []
+    classifier = get_classifier("import")
 
     # Split into lines
     lines = text.split('\n')
@@ -105,27 +185,8 @@ def extract_facts_from_text(text: str, default_scene: str) -> List[Dict]:
         if len(line) < 20:
             continue
 
-        # Determine cell type
-        cell_type = "fact"
-        salience = 0.7
-
-        line_lower = line.lower()
-
-        if any(word in line_lower for word in ["plan", "will", "going to", "next step"]):
-            cell_type = "plan"
-            salience = 0.8
-        elif any(word in line_lower for word in ["prefer", "like", "want", "user"]):
-            cell_type = "preference"
-            salience = 0.85
-        elif any(word in line_lower for word in ["decide", "choose", "select"]):
-            cell_type = "decision"
-            salience = 0.9
-        elif any(word in line_lower for word in ["task", "do", "complete"]):
-            cell_type = "task"
-            salience = 0.8
-        elif any(word in line_lower for word in ["limit", "capacity", "risk", "practical"]):
-            cell_type = "risk"
-            salience = 0.75
+        # Determine cell type (single scan of the line)
+        _, cell_type, salience = classifier.classify(line, default_scene)
 
         # Compress content
         content = compress_content(line, max_words=30)
@@ -179,100 +240,376 @@ def import_week_progress(workspace_path: str) -> List[Dict]:
     """
     cells = []
 
-    # Look for week files
-    week_files = []
-
-    for root, dirs, files in os.walk(workspace_path):
-        for file in files:
-            if re.match(r'WEEK\d+_', file) or re.match(r'week-\d+', file):
-                week_files.append(os.path.join(root, file))
+    for path, kind in discover_files(workspace_path).values():
+        if kind == "week":
+            cells.extend(parse_week_file(path))
 
-    for week_file in week_files:
-        with open(week_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+    return cells
 
-        # Extract week number
-        week_match = re.search(r'WEEK ?(\d+)', week_file, re.IGNORECASE)
 
-        if week_match:
-            week_num = week_match.group(1)
-            scene = f"week-{week_num}-progress"
-        else:
-            # Fallback: use filename as scene
-            scene = os.path.basename(week_file).replace('.md', '')
+def parse_week_file(week_file: str) -> Iterator[Dict]:
+    """
+    Stream task cells from a week progress file
 
+    Args:
+        week_file: Path to the week file
 
-        # Extract objectives
-        objectives = re.findall(r'•\s+(.*?)(?=•|\n|$)', content)
+    Yields:
+        Memory cell dictionaries
+    """
+    # Extract week number
+    week_match = re.search(r'WEEK ?(\d+)', week_file, re.IGNORECASE)
+
+    if week_match:
+        week_num = week_match.group(1)
+        scene = f"week-{week_num}-progress"
+    else:
+        # Fallback: use filename as scene
+        scene = os.path.basename(week_file).replace('.md', '')
+
+    with open(week_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            # Extract objectives
+            for obj in re.findall(r'•\s+(.*?)(?=•|\n|$)', line):
+                obj = obj.strip()
+
+                if len(obj) > 10:
+                    yield {
+                        "scene": scene,
+                        "cell_type": "task",
+                        "salience": 0.8,
+                        "content": obj[:50] + ("..." if len(obj) > 50 else "")
+                    }
+
+
+def parse_week_sections(week_file: str) -> Iterator[Tuple[str, List[Dict]]]:
+    """Week files are small: the whole file is one section"""
+    cells = list(parse_week_file(week_file))
+    if cells:
+        yield section_key(cells[0]["scene"], "\n".join(cell["content"] for cell in cells)), cells
+
+
+# File kind -> streaming section parser (path -> (section key, cells))
+PARSERS: Dict[str, Callable[[str], Iterator[Tuple[str, List[Dict]]]]] = {
+    "memory": parse_memory_sections,
+    "week": parse_week_sections,
+    "doc": parse_doc_sections,
+}
+
+
+def file_kind(rel_path: str, include_docs: bool = False) -> Optional[str]:
+    """
+    Kind of an importable workspace file
 
-        for obj in objectives:
-            obj = obj.strip()
+    Args:
+        rel_path: Workspace-relative path
+        include_docs: Also import the other markdown documents at the workspace root
 
-            if len(obj) > 10:
-                cells.append({
-                    "scene": scene,
-                    "cell_type": "task",
-                    "salience": 0.8,
-                    "content": obj[:50] + ("..." if len(obj) > 50 else "")
-                })
+    Returns:
+        Key of PARSERS, or None if the file is not imported
+    """
+    name = os.path.basename(rel_path)
+    parts = rel_path.split(os.sep)
 
-    return cells
+    if any(part in SKIP_DIRS or part.startswith('.') for part in parts[:-1]):
+        return None
+    if rel_path == "MEMORY.md":
+        return "memory"
+    if re.match(r'WEEK\d+_', name) or re.match(r'week-\d+', name):
+        return "week"
+    if include_docs and len(parts) == 1 and name.endswith('.md'):
+        return "doc"
+    return None
 
 
-def import_from_memory_md(workspace_path: str) -> int:
+def discover_files(workspace_path: str, include_docs: bool = False) -> Dict[str, Tuple[str, str]]:
     """
-    Import historical data from MEMORY.md
+    Find the importable files of a workspace
 
     Args:
         workspace_path: Path to workspace directory
+        include_docs: Also import the other markdown documents at the workspace root
 
     Returns:
-        Number of cells imported
+        Dict of workspace-relative path -> (absolute path, file kind)
     """
-    memory_path = os.path.join(workspace_path, "MEMORY.md")
+    files = {}
+
+    for root, dirs, names in os.walk(workspace_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, workspace_path)
+            kind = file_kind(rel, include_docs)
+            if kind:
+                files[rel] = (path, kind)
+
+    return files
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_file(
+    path: str,
+    kind: str,
+    known_hash: Optional[str] = None
+) -> Tuple[str, Optional[List[Tuple[str, List[Dict]]]]]:
+    """
+    Hash a file and, unless its content is unchanged, parse it into sections
 
-    if not os.path.exists(memory_path):
-        print(f"MEMORY.md not found at: {memory_path}")
-        return 0
+    Top-level so it can run in a worker process.
 
-    print("Parsing MEMORY.md...")
-    cells = parse_memory_markdown(memory_path)
+    Args:
+        path: File path
+        kind: File kind (key of PARSERS)
+        known_hash: Content hash recorded by the last import
 
-    print(f"Parsing week progress files...")
-    week_cells = import_week_progress(workspace_path)
-    cells.extend(week_cells)
+    Returns:
+        Tuple of (content hash, [(section key, cells)] or None if the content is unchanged)
+    """
+    content_hash = file_hash(path)
+    if content_hash == known_hash:
+        return content_hash, None
+    return content_hash, [(key, cells) for key, cells in PARSERS[kind](path) if cells]
+
+
+def _init_manifest(db: MemoryDB) -> None:
+    """Create the import manifest table"""
+    with db.writer() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_manifest (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            cells INTEGER NOT NULL,
+            imported_at TEXT NOT NULL
+        )
+        """)
 
-    print(f"Total cells extracted: {len(cells)}")
 
-    # Import into memory database
-    print("Importing into memory database...")
+def _file_sources(db: MemoryDB, rel: str) -> Dict[str, int]:
+    """Sources (rel#section) of a file's imported cells, with their cell counts"""
+    return {
+        source: count for source, count in db.get_sources(rel).items()
+        if source == rel or source.startswith(rel + "#")
+    }
 
-    db = get_memory_db()
 
-    imported_count = 0
+def sync_files(
+    db: MemoryDB,
+    workspace_path: str,
+    paths: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    include_docs: bool = False
+) -> Dict:
+    """
+    Bring the cells imported from workspace files up to date
 
-    for cell in cells:
-        try:
-            db.insert_cell(cell)
-            imported_count += 1
-        except Exception as e:
-            print(f"Error inserting cell: {e}")
+    Files whose size and mtime match the manifest are skipped without being
+    read; the rest are hashed and, when their content changed, parsed (in a
+    process pool when several files changed). Cells are stored per section
+    (source "<path>#<section key>"), so only the sections that were edited,
+    added or removed have their cells replaced. Cells of manifest files that
+    no longer exist are deleted.
 
-    # Consolidate scenes
-    print("Consolidating scenes...")
+    Args:
+        db: Memory database
+        workspace_path: Path to workspace directory
+        paths: Only sync these files (absolute or workspace-relative); default all
+        workers: Parser processes (default: CPU count, 1 parses inline)
+        include_docs: Also import the other markdown documents at the workspace root
 
-    scenes = set(c["scene"] for c in cells)
-    manager = MemoryManager(db, llm_provider=None)
+    Returns:
+        Report dict: scanned, changed, unchanged, removed, sections_changed,
+        cells_inserted, cells_removed and the set of affected scenes
+    """
+    _init_manifest(db)
+
+    with db.writer() as conn:
+        manifest = {row["path"]: row for row in conn.execute("SELECT * FROM import_manifest")}
+
+    if paths is None:
+        found = discover_files(workspace_path, include_docs)
+    else:
+        found = {}
+        manifest_paths = set()
+        for p in paths:
+            rel = os.path.relpath(os.path.join(workspace_path, p), workspace_path)
+            kind = file_kind(rel, include_docs)
+            if kind and os.path.isfile(os.path.join(workspace_path, rel)):
+                found[rel] = (os.path.join(workspace_path, rel), kind)
+            manifest_paths.add(rel)
+        manifest = {rel: row for rel, row in manifest.items() if rel in manifest_paths}
+
+    report = {
+        "scanned": len(found),
+        "changed": 0,
+        "unchanged": 0,
+        "removed": 0,
+        "sections_changed": 0,
+        "cells_inserted": 0,
+        "cells_removed": 0,
+        "scenes": set()
+    }
+
+    # Stat check first: untouched files are never opened
+    candidates = []
+    for rel, (path, kind) in found.items():
+        stat = os.stat(path)
+        row = manifest.get(rel)
+        if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            report["unchanged"] += 1
+        else:
+            candidates.append((rel, path, kind, stat, row["sha256"] if row is not None else None))
+
+    def remove(sources: Dict[str, int]) -> None:
+        for source, count in sources.items():
+            report["cells_removed"] += count
+            report["sections_changed"] += 1
+            report["scenes"].update(db.delete_source_cells(source))
+
+    def apply(
+        rel: str,
+        stat: os.stat_result,
+        content_hash: str,
+        sections: Optional[List[Tuple[str, List[Dict]]]]
+    ) -> None:
+        if sections is not None:
+            report["changed"] += 1
+
+            old = _file_sources(db, rel)
+            new = {f"{rel}#{key}": cells for key, cells in sections}
+
+            # Untouched sections keep their cells; edited ones get a new key
+            remove({source: count for source, count in old.items() if source not in new})
+            for source, cells in new.items():
+                if source not in old:
+                    report["sections_changed"] += 1
+                    report["cells_inserted"] += len(db.insert_cells(cells, dedup="link", source=source))
+                    report["scenes"].update(cell["scene"] for cell in cells)
+
+            cell_count = sum(len(cells) for cells in new.values())
+        else:
+            # Touched but identical: only the recorded stat changes
+            report["unchanged"] += 1
+            cell_count = manifest[rel]["cells"]
+
+        with db.writer() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO import_manifest VALUES (?,?,?,?,?,?)",
+                (rel, stat.st_size, stat.st_mtime_ns, content_hash, cell_count, datetime.utcnow().isoformat())
+            )
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(candidates) <= 1:
+        for rel, path, kind, stat, known_hash in candidates:
+            apply(rel, stat, *parse_file(path, kind, known_hash))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(candidates))) as pool:
+            futures = [
+                (rel, stat, pool.submit(parse_file, path, kind, known_hash))
+                for rel, path, kind, stat, known_hash in candidates
+            ]
+            # Insert in discovery order so duplicate linking is deterministic
+            for rel, stat, future in futures:
+                apply(rel, stat, *future.result())
+
+    # Files imported before but gone now
+    for rel in manifest.keys() - found.keys():
+        report["removed"] += 1
+        remove(_file_sources(db, rel))
+        with db.writer() as conn:
+            conn.execute("DELETE FROM import_manifest WHERE path=?", (rel,))
+
+    return report
+
+
+def consolidate_scenes(db: MemoryDB, scenes: Iterable[str], manager: Optional[MemoryManager] = None) -> None:
+    """
+    Rebuild the summaries of scenes whose cells were replaced
+
+    Args:
+        db: Memory database
+        scenes: Scenes to rebuild
+        manager: Manager doing the consolidation (default: rule-based, no LLM)
+    """
+    manager = manager or MemoryManager(db, llm_provider=None, background_consolidation=False)
 
-    for scene in scenes:
+    for scene in sorted(scenes):
         try:
-            manager.consolidate_scene(scene)
+            # Cells were deleted, so the summary cannot be extended incrementally
+            manager.consolidate_scene(scene, incremental=False)
         except Exception as e:
             print(f"Error consolidating scene '{scene}': {e}")
 
+
+def import_workspace(
+    workspace_path: str,
+    db: Optional[MemoryDB] = None,
+    workers: Optional[int] = None,
+    consolidate: bool = True,
+    include_docs: bool = False
+) -> Dict:
+    """
+    Incrementally import MEMORY.md and week progress files
+
+    Args:
+        workspace_path: Path to workspace directory
+        db: Memory database (default: shared instance)
+        workers: Parser processes (default: CPU count)
+        consolidate: Rebuild the summaries of affected scenes
+        include_docs: Also import the other markdown documents at the workspace root
+
+    Returns:
+        Report dict (see sync_files)
+    """
+    db = db or get_memory_db()
+    report = sync_files(db, workspace_path, workers=workers, include_docs=include_docs)
+
+    if consolidate and report["scenes"]:
+        consolidate_scenes(db, report["scenes"])
+
+    return report
+
+
+def import_from_memory_md(workspace_path: str) -> int:
+    """
+    Import historical data from MEMORY.md
+
+    Args:
+        workspace_path: Path to workspace directory
+
+    Returns:
+        Number of cells imported
+    """
+    memory_path = os.path.join(workspace_path, "MEMORY.md")
+
+    if not os.path.exists(memory_path):
+        print(f"MEMORY.md not found at: {memory_path}")
+        return 0
+
+    print("Importing changed files into memory database...")
+
+    db = get_memory_db()
+
+    try:
+        report = import_workspace(workspace_path, db)
+    except Exception as e:
+        print(f"Error importing files: {e}")
+        return 0
+
     print(f"\n✅ Import complete!")
-    print(f"   Cells imported: {imported_count}")
-    print(f"   Scenes consolidated: {len(scenes)}")
+    print(f"   Files changed: {report['changed']} (unchanged: {report['unchanged']}, removed: {report['removed']})")
+    print(f"   Cells imported: {report['cells_inserted']} (replaced: {report['cells_removed']})")
+    print(f"   Scenes consolidated: {len(report['scenes'])}")
 
     # Print statistics
     stats = db.get_statistics()
@@ -281,7 +618,7 @@ def import_from_memory_md(workspace_path: str) -> int:
     print(f"   Total scenes: {stats['total_scenes']}")
     print(f"   Cells by type: {stats['cells_by_type']}")
 
-    return imported_count
+    return report["cells_inserted"]
 
 
 def main():
@@ -0,0 +1,212 @@
+"""
+LLM Cache Module for Self-Organizing Agent Memory System
+Persistent LRU cache of LLM responses for extraction and consolidation prompts
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+def provider_id(llm_provider: Callable) -> Optional[str]:
+    """
+    Identify an LLM provider for cache keys
+
+    Uses the provider's provider_id attribute if it has one, otherwise its
+    module and qualified name. Give providers that switch models a
+    provider_id so responses from different models are not mixed.
+
+    Lambdas and functions defined inside other functions share a qualified
+    name (e.g. make_llm.<locals>.call), so they have no stable identifier.
+
+    Args:
+        llm_provider: LLM function
+
+    Returns:
+        Provider identifier, or None for a lambda or local function without provider_id
+    """
+    explicit = getattr(llm_provider, "provider_id", None)
+    if explicit:
+        return str(explicit)
+
+    module = getattr(llm_provider, "__module__", None) or type(llm_provider).__module__
+    name = getattr(llm_provider, "__qualname__", None) or type(llm_provider).__qualname__
+
+    if "<lambda>" in name or "<locals>" in name:
+        return None
+
+    return f"{module}.{name}"
+
+
+class LLMCache:
+    """
+    Size-bounded SQLite cache of LLM responses
+
+    Responses are keyed by a hash of provider id, prompt, temperature and
+    max_tokens. The least recently used entries are evicted once more than
+    max_entries are stored. Several processes may share one cache file; the
+    entry count is always read from the file. Pass ":memory:" as the path
+    for a cache that lives only as long as the instance.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        """
+        Initialize LLM cache
+
+        Args:
+            path: SQLite file holding the cache (or ":memory:")
+            max_entries: Maximum number of cached responses
+        """
+        self.path = path
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+
+        self.db.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """)
+
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used
+        ON llm_cache(last_used)
+        """)
+
+        self.db.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def for_database(cls, db_path: str, max_entries: int = 10000) -> "LLMCache":
+        """Open the cache stored next to a memory database (<db>_llm_cache.db)"""
+        return cls(os.path.splitext(db_path)[0] + "_llm_cache.db", max_entries)
+
+    @staticmethod
+    def key(provider: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """Cache key for one LLM call"""
+        payload = json.dumps([provider, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached response or None
+        """
+        with self._lock:
+            row = self.db.execute("SELECT response FROM llm_cache WHERE key=?", (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.db.execute("UPDATE llm_cache SET last_used=? WHERE key=?", (time.time(), key))
+            self.db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Store a response, evicting least recently used entries over the limit
+
+        Args:
+            key: Cache key
+            response: LLM response
+        """
+        now = time.time()
+
+        with self._lock:
+            self.db.execute("""
+            INSERT INTO llm_cache (key, response, created_at, last_used) VALUES (?,?,?,?)
+            ON CONFLICT(key) DO UPDATE SET response=excluded.response, last_used=excluded.last_used
+            """, (key, response, now, now))
+
+            # Counted inside the write transaction, so other processes' entries are included
+            overflow = self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self.db.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?
+                )
+                """, (overflow,))
+                self.evictions += overflow
+
+            self.db.commit()
+
+    def call(
+        self,
+        llm_provider: Callable,
+        provider: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        parse: Optional[Callable[[str], object]] = None
+    ):
+        """
+        Call an LLM provider through the cache
+
+        A response is only stored after parse accepts it, so malformed
+        output is retried rather than replayed.
+
+        Args:
+            llm_provider: LLM function (prompt, temperature, max_tokens) -> str
+            provider: Provider identifier (see provider_id)
+            prompt: Prompt text
+            temperature: Sampling temperature
+            max_tokens: Response token limit
+            parse: Optional function turning the response into the result; raises on bad output
+
+        Returns:
+            The (parsed) response
+        """
+        key = self.key(provider, prompt, temperature, max_tokens)
+
+        cached = self.get(key)
+        if cached is not None:
+            try:
+                return parse(cached) if parse else cached
+            except Exception:
+                pass  # Entry written by an older parser; fetch a fresh one
+
+        response = llm_provider(prompt, temperature=temperature, max_tokens=max_tokens)
+        result = parse(response) if parse else response
+        self.put(key, response)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Entry count and hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                "entries": self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0],
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self.db.execute("DELETE FROM llm_cache")
+            self.db.commit()
+
+    def close(self) -> None:
+        """Close the cache database"""
+        with self._lock:
+            self.db.close()
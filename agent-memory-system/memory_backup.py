@@ -0,0 +1,405 @@
+"""
+Memory Backup Module for Self-Organizing Agent Memory System
+Streaming export of the memory database to compressed NDJSON and bulk restore
+
+A backup is a directory:
+
+    manifest.json               format, row counts, chunk files and their SHA-256
+    mem_cells-00000.ndjson.gz   one JSON object per line, chunk_rows lines per file
+    mem_scenes-00000.ndjson.gz
+    mem_meta-00000.ndjson.gz
+
+Export reads one consistent snapshot row by row and restore loads row by
+row, so memory use stays flat whatever the database size. Derived data
+(content hashes, token estimates, the FTS index and statistics counters) is
+not exported; restore rebuilds it. MinHash fingerprints and LSH buckets are
+left to the first "link" insert, as for any cell inserted without them.
+
+Usage:
+    python memory_backup.py export /backups/2026-03-01 [--db agent_memory.db]
+    python memory_backup.py restore /backups/2026-03-01 --db restored.db
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from dedup import content_hash
+from memory_db import MemoryDB, _cell_text
+from token_budget import estimate_tokens
+
+BACKUP_FORMAT = 1
+
+# Exported columns per table; derived columns are rebuilt on restore
+CELL_COLUMNS = ["id", "scene", "cell_type", "salience", "content", "created_at", "duplicate_of", "source"]
+SCENE_COLUMNS = ["scene", "summary", "updated_at", "last_cell_id", "increments"]
+META_COLUMNS = ["key", "value"]
+
+# Rows handed to one executemany during restore (bounds memory use)
+LOAD_BATCH_ROWS = 5000
+
+# Optional tables exported when present: table -> columns
+EXTRA_TABLES = {
+    "import_manifest": ["path", "size", "mtime_ns", "sha256", "cells", "imported_at"],
+}
+
+
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_chunks(
+    dest_dir: str,
+    table: str,
+    rows: Iterable[Dict],
+    chunk_rows: int,
+    compresslevel: int
+) -> Dict:
+    """Write rows as gzipped NDJSON chunks; returns the table's manifest entry"""
+    chunks: List[Dict] = []
+    total = 0
+    out = None
+    path = None
+
+    def close_chunk() -> None:
+        out.close()
+        chunks[-1]["bytes"] = os.path.getsize(path)
+        chunks[-1]["sha256"] = _file_sha256(path)
+
+    try:
+        for row in rows:
+            if out is None or chunks[-1]["rows"] >= chunk_rows:
+                if out is not None:
+                    close_chunk()
+                name = f"{table}-{len(chunks):05d}.ndjson.gz"
+                path = os.path.join(dest_dir, name)
+                out = gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel)
+                chunks.append({"file": name, "rows": 0})
+
+            out.write(json.dumps(row, ensure_ascii=False))
+            out.write("\n")
+            chunks[-1]["rows"] += 1
+            total += 1
+    finally:
+        if out is not None and not out.closed:
+            close_chunk()
+
+    return {"rows": total, "chunks": chunks}
+
+
+def _verify_backup(backup_dir: str, tables: Dict) -> None:
+    """
+    Check every chunk's checksum and row count against the manifest
+
+    Raises:
+        ValueError: If a chunk is missing, corrupt or truncated
+    """
+    for table, entry in tables.items():
+        for chunk in entry["chunks"]:
+            path = os.path.join(backup_dir, chunk["file"])
+            if not os.path.exists(path):
+                raise ValueError(f"Backup chunk '{chunk['file']}' is missing")
+            if _file_sha256(path) != chunk["sha256"]:
+                raise ValueError(f"Backup chunk '{chunk['file']}' is corrupt (checksum mismatch)")
+
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    rows = sum(1 for _ in f)
+            except (OSError, EOFError, UnicodeDecodeError) as e:
+                raise ValueError(f"Backup chunk '{chunk['file']}' cannot be read: {e}")
+            if rows != chunk["rows"]:
+                raise ValueError(f"Backup chunk '{chunk['file']}' has {rows} rows, manifest says {chunk['rows']}")
+
+        if sum(chunk["rows"] for chunk in entry["chunks"]) != entry["rows"]:
+            raise ValueError(f"Backup chunks of {table} do not add up to {entry['rows']} rows")
+
+
+def _read_chunks(backup_dir: str, entry: Dict) -> Iterator[Dict]:
+    """Stream the rows of one table's chunks"""
+    for chunk in entry["chunks"]:
+        path = os.path.join(backup_dir, chunk["file"])
+        rows = 0
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                rows += 1
+                yield json.loads(line)
+
+        if rows != chunk["rows"]:
+            raise ValueError(f"Backup chunk '{chunk['file']}' has {rows} rows, manifest says {chunk['rows']}")
+
+
+def _batches(rows: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of size items"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_backup(
+    db: MemoryDB,
+    dest_dir: str,
+    chunk_rows: int = 100_000,
+    compresslevel: int = 6
+) -> Dict:
+    """
+    Stream the memory database to a backup directory
+
+    All tables are read from one snapshot, so a backup taken while agents
+    keep writing is still consistent.
+
+    Args:
+        db: Memory database
+        dest_dir: Backup directory (created; must not already hold a backup)
+        chunk_rows: Rows per NDJSON chunk file
+        compresslevel: gzip level (1 fastest, 9 smallest)
+
+    Returns:
+        The manifest
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    manifest_path = os.path.join(dest_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        raise FileExistsError(f"Backup already exists at: {dest_dir}")
+
+    tables = {}
+
+    with db._read() as conn:
+        # One read transaction: every table comes from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            def cells() -> Iterator[Dict]:
+                cursor = conn.execute(f"SELECT {', '.join(CELL_COLUMNS)} FROM mem_cells ORDER BY id")
+                for row in cursor:
+                    cell = dict(zip(CELL_COLUMNS, row))
+                    cell["content"] = json.loads(cell["content"])
+                    yield cell
+
+            def rows(table: str, columns: List[str]) -> Iterator[Dict]:
+                for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table}"):
+                    yield dict(zip(columns, row))
+
+            tables["mem_cells"] = _write_chunks(dest_dir, "mem_cells", cells(), chunk_rows, compresslevel)
+            tables["mem_scenes"] = _write_chunks(
+                dest_dir, "mem_scenes", rows("mem_scenes", SCENE_COLUMNS), chunk_rows, compresslevel
+            )
+            tables["mem_meta"] = _write_chunks(
+                dest_dir, "mem_meta", rows("mem_meta", META_COLUMNS), chunk_rows, compresslevel
+            )
+
+            for table, columns in EXTRA_TABLES.items():
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+                ).fetchone()
+                if exists:
+                    tables[table] = _write_chunks(dest_dir, table, rows(table, columns), chunk_rows, compresslevel)
+        finally:
+            conn.execute("COMMIT")
+
+    manifest = {
+        "format": BACKUP_FORMAT,
+        "created_at": datetime.utcnow().isoformat(),
+        "source": os.path.abspath(db.db_path),
+        "sqlite_version": sqlite3.sqlite_version,
+        "columns": {
+            "mem_cells": CELL_COLUMNS,
+            "mem_scenes": SCENE_COLUMNS,
+            "mem_meta": META_COLUMNS,
+            **{table: columns for table, columns in EXTRA_TABLES.items() if table in tables}
+        },
+        "tables": tables
+    }
+
+    # Written last: a directory without a manifest is an incomplete backup
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    return manifest
+
+
+def restore_backup(
+    backup_dir: str,
+    db: MemoryDB,
+    replace: bool = False,
+    verify: bool = True
+) -> Dict:
+    """
+    Bulk-load a backup into a memory database
+
+    Every chunk's checksum and row count is checked before the target is
+    touched. The old memory is then deleted and the backup loaded in one
+    transaction: triggers on mem_cells are dropped for the load, rows are
+    written LOAD_BATCH_ROWS at a time (so memory stays flat), and the
+    triggers, the FTS index and the statistics counters are rebuilt before
+    the commit. Any failure rolls the target back to its previous state.
+    Fingerprints, LSH buckets and token estimates are computed while
+    loading.
+
+    Args:
+        backup_dir: Backup directory written by export_backup
+        db: Target memory database (must be empty unless replace is set)
+        replace: Delete the target's current memory first
+        verify: Check chunk checksums and row counts before loading
+
+    Returns:
+        Report dict with rows restored per table
+    """
+    with open(os.path.join(backup_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != BACKUP_FORMAT:
+        raise ValueError(f"Unsupported backup format: {manifest.get('format')}")
+
+    tables = manifest["tables"]
+    report = {}
+
+    if verify:
+        _verify_backup(backup_dir, tables)
+
+    with db.writer() as conn:
+        has_cells = conn.execute("SELECT 1 FROM mem_cells LIMIT 1").fetchone()
+        if has_cells and not replace:
+            raise ValueError("Target memory database is not empty (pass replace=True to overwrite it)")
+
+        # Not allowed inside a transaction; a crash still rolls back through the WAL
+        conn.execute("PRAGMA synchronous=OFF")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            triggers = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name='mem_cells'"
+            ).fetchall()
+            for trigger in triggers:
+                conn.execute(f"DROP TRIGGER {trigger['name']}")
+
+            conn.execute("INSERT INTO mem_cells_fts (mem_cells_fts) VALUES ('delete-all')")
+            for table in ("mem_cell_lsh", "mem_cells", "mem_scenes", "mem_meta"):
+                conn.execute(f"DELETE FROM {table}")
+
+            report["mem_cells"] = _restore_cells(conn, _read_chunks(backup_dir, tables["mem_cells"]))
+
+            report["mem_scenes"] = 0
+            for batch in _batches(_read_chunks(backup_dir, tables["mem_scenes"]), LOAD_BATCH_ROWS):
+                conn.executemany(
+                    f"INSERT INTO mem_scenes ({', '.join(SCENE_COLUMNS)}, summary_tokens) VALUES (?,?,?,?,?,?)",
+                    [
+                        [scene[column] for column in SCENE_COLUMNS] + [estimate_tokens(scene["summary"])]
+                        for scene in batch
+                    ]
+                )
+                report["mem_scenes"] += len(batch)
+
+            for table, columns in [("mem_meta", META_COLUMNS), *EXTRA_TABLES.items()]:
+                if table not in tables:
+                    continue
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+                ).fetchone()
+                if not exists:
+                    continue  # Created by a module this database does not use (yet)
+                report[table] = 0
+                for batch in _batches(_read_chunks(backup_dir, tables[table]), LOAD_BATCH_ROWS):
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({','.join('?' * len(columns))})",
+                        [[row[column] for column in columns] for row in batch]
+                    )
+                    report[table] += len(batch)
+
+            # Restored cells have no fingerprints yet (see MemoryDB._backfill_fingerprints)
+            conn.execute("DELETE FROM mem_meta WHERE key='fingerprinted_through'")
+
+            for table, entry in tables.items():
+                if table in report and report[table] != entry["rows"]:
+                    raise ValueError(f"Restored {report[table]} rows into {table}, backup has {entry['rows']}")
+
+            for trigger in triggers:
+                conn.execute(trigger["sql"])
+
+            # One FTS build instead of one trigger insert per row
+            conn.execute("INSERT INTO mem_cells_fts (mem_cells_fts) VALUES ('rebuild')")
+            db._rebuild_stats(conn)
+
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("PRAGMA synchronous=NORMAL")
+
+    if db.context_cache:
+        db.context_cache.clear()
+
+    if db.vector_index is not None:
+        db.rebuild_vector_index()
+
+    return report
+
+
+def _restore_cells(conn: sqlite3.Connection, cells: Iterable[Dict]) -> int:
+    """Insert cells with their content hashes and token estimates"""
+    restored = 0
+
+    for batch in _batches(cells, LOAD_BATCH_ROWS):
+        rows = []
+        for cell in batch:
+            text = _cell_text(cell["content"])
+            rows.append((
+                cell["id"], cell["scene"], cell["cell_type"], cell["salience"],
+                json.dumps(cell["content"]), cell["created_at"], cell.get("duplicate_of"),
+                estimate_tokens(text), cell.get("source"), content_hash(text)
+            ))
+
+        conn.executemany("""
+        INSERT INTO mem_cells
+        (id, scene, cell_type, salience, content, created_at, duplicate_of, tokens, source, content_hash)
+        VALUES (?,?,?,?,?,?,?,?,?,?)
+        """, rows)
+        restored += len(rows)
+
+    return restored
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Back up or restore the agent memory database")
+    parser.add_argument("command", choices=["export", "restore"])
+    parser.add_argument("backup_dir", help="Backup directory")
+    parser.add_argument("--db", help="Path to agent_memory.db (default: next to this script)")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Rows per chunk file (export)")
+    parser.add_argument("--replace", action="store_true", help="Overwrite a non-empty database (restore)")
+    args = parser.parse_args(argv)
+
+    db = MemoryDB(args.db)
+
+    if args.command == "export":
+        manifest = export_backup(db, args.backup_dir, chunk_rows=args.chunk_rows)
+        print(f"💾 Backup written to {args.backup_dir}")
+        for table, entry in manifest["tables"].items():
+            print(f"   {table}: {entry['rows']} rows in {len(entry['chunks'])} chunk(s)")
+    else:
+        report = restore_backup(args.backup_dir, db, replace=args.replace)
+        print(f"♻️  Restored {args.backup_dir} into {db.db_path}")
+        for table, rows in report.items():
+            print(f"   {table}: {rows} rows")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
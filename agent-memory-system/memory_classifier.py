@@ -0,0 +1,149 @@
+"""
+Memory Classifier Module for Self-Organizing Agent Memory System
+Table-driven scene and cell_type classification shared by rule-based
+extraction and the historical data importer
+
+Rules live in memory_rules.json (override with the AGENT_MEMORY_RULES
+environment variable), one profile per caller:
+
+    "scenes":     ordered; the first rule whose "all" groups each have a
+                  matching keyword sets the scene
+    "cell_types": ordered; the first rule with "any" matching keyword sets
+                  cell_type and salience
+
+Keywords are case-insensitive and match whole words: "do" does not match
+"done". A trailing * matches a word prefix ("prefer*" matches "preferences")
+and spaces in a phrase match any whitespace.
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), "memory_rules.json")
+
+
+def load_rules(path: Optional[str] = None) -> Dict:
+    """
+    Load classification rules
+
+    Args:
+        path: Rules JSON file (default: $AGENT_MEMORY_RULES or memory_rules.json)
+
+    Returns:
+        Dict of profile name -> rules
+    """
+    path = path or os.environ.get("AGENT_MEMORY_RULES") or RULES_PATH
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _keyword_pattern(keyword: str) -> str:
+    """Regex for one keyword with word boundaries"""
+    prefix = keyword.endswith("*")
+    words = keyword.rstrip("*").lower().split()
+    pattern = r"\s+".join(re.escape(word) for word in words)
+    return rf"(?<!\w){pattern}" + (r"\w*" if prefix else r"(?!\w)")
+
+
+class RuleClassifier:
+    """
+    Classifies text with one compiled regex over every keyword of a profile
+
+    classify() scans the text once, collecting the keywords that occur, and
+    then resolves the scene and cell_type rules against that set.
+    """
+
+    def __init__(self, rules: Dict):
+        """
+        Initialize classifier
+
+        Args:
+            rules: One profile from memory_rules.json
+        """
+        self.default_scene = rules.get("default_scene", "general")
+        default_type = rules.get("default_cell_type", {"cell_type": "fact", "salience": 0.7})
+        self.default_cell_type = (default_type["cell_type"], default_type["salience"])
+
+        keywords: List[str] = []
+        index: Dict[str, int] = {}
+
+        def keyword_id(keyword: str) -> int:
+            if keyword not in index:
+                index[keyword] = len(keywords)
+                keywords.append(keyword)
+            return index[keyword]
+
+        # Scene rules: (scene, [set of keyword ids per required group])
+        self.scene_rules: List[Tuple[str, List[Set[int]]]] = [
+            (rule["scene"], [{keyword_id(k) for k in group} for group in rule["all"]])
+            for rule in rules.get("scenes", [])
+        ]
+
+        # Cell type rules: (cell_type, salience, keyword ids)
+        self.cell_type_rules: List[Tuple[str, float, Set[int]]] = [
+            (rule["cell_type"], rule["salience"], {keyword_id(k) for k in rule["any"]})
+            for rule in rules.get("cell_types", [])
+        ]
+
+        self.keywords = keywords
+
+        # Longest keywords first so phrases win over their first word
+        ordered = sorted(range(len(keywords)), key=lambda i: len(keywords[i]), reverse=True)
+        self._pattern = re.compile(
+            "|".join(f"(?P<k{i}>{_keyword_pattern(keywords[i])})" for i in ordered),
+            re.IGNORECASE
+        ) if keywords else None
+
+    def matches(self, text: str) -> Set[int]:
+        """Ids of the keywords occurring in text (single scan)"""
+        if self._pattern is None:
+            return set()
+        return {int(match.lastgroup[1:]) for match in self._pattern.finditer(text)}
+
+    def classify(self, text: str, default_scene: Optional[str] = None) -> Tuple[str, str, float]:
+        """
+        Classify text
+
+        Args:
+            text: Text to classify
+            default_scene: Scene when no scene rule matches (default: profile default)
+
+        Returns:
+            Tuple of (scene, cell_type, salience)
+        """
+        found = self.matches(text)
+
+        scene = default_scene or self.default_scene
+        for rule_scene, groups in self.scene_rules:
+            if all(group & found for group in groups):
+                scene = rule_scene
+                break
+
+        cell_type, salience = self.default_cell_type
+        for rule_type, rule_salience, keyword_ids in self.cell_type_rules:
+            if keyword_ids & found:
+                cell_type, salience = rule_type, rule_salience
+                break
+
+        return scene, cell_type, salience
+
+
+# Classifier per profile, compiled once
+_classifiers: Dict[str, RuleClassifier] = {}
+
+
+def get_classifier(profile: str) -> RuleClassifier:
+    """
+    Get the shared classifier for a rules profile
+
+    Args:
+        profile: Profile name in the rules file ("interaction" or "import")
+
+    Returns:
+        RuleClassifier instance
+    """
+    if profile not in _classifiers:
+        _classifiers[profile] = RuleClassifier(load_rules()[profile])
+    return _classifiers[profile]
@@ -0,0 +1,288 @@
+"""
+Memory Compaction Module for Self-Organizing Agent Memory System
+Ages, expires and archives memory cells and reclaims space in the memory database
+
+Run once from the command line:
+    python memory_compaction.py --max-cells 50000
+
+Or on a schedule (every 6 hours):
+    python memory_compaction.py --every 21600
+"""
+
+import argparse
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from memory_db import MemoryDB
+
+# Days a cell of each type stays in the hot store (None = no expiry)
+DEFAULT_TTL_DAYS = {
+    "fact": None,
+    "plan": 90,
+    "preference": None,
+    "decision": None,
+    "task": 60,
+    "risk": 180
+}
+
+
+class MemoryCompactor:
+    """Salience decay, TTL expiry, archival and space reclamation for MemoryDB"""
+
+    def __init__(
+        self,
+        db: MemoryDB,
+        archive_path: Optional[str] = None,
+        half_life_days: float = 90.0,
+        ttl_days: Optional[Dict[str, Optional[float]]] = None,
+        min_salience: float = 0.05,
+        max_cells: Optional[int] = None,
+        fts_merge_pages: int = 500
+    ):
+        """
+        Initialize memory compactor
+
+        Args:
+            db: MemoryDB instance
+            archive_path: SQLite file receiving archived cells (default: <db>_archive.db)
+            half_life_days: Days for salience to halve
+            ttl_days: Per cell_type TTL overrides for DEFAULT_TTL_DAYS
+            min_salience: Cells decayed below this are archived
+            max_cells: Upper bound on hot cells; lowest-salience extras are archived
+            fts_merge_pages: Pages merged per run of the FTS incremental merge
+        """
+        self.db = db
+        self.archive_path = archive_path or os.path.splitext(db.db_path)[0] + "_archive.db"
+        self.half_life_days = half_life_days
+        self.ttl_days = dict(DEFAULT_TTL_DAYS)
+        self.ttl_days.update(ttl_days or {})
+        self.min_salience = min_salience
+        self.max_cells = max_cells
+        self.fts_merge_pages = fts_merge_pages
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self, full_vacuum: bool = False) -> Dict:
+        """
+        Run one compaction pass
+
+        Args:
+            full_vacuum: Rewrite the whole file with VACUUM instead of incremental_vacuum
+
+        Returns:
+            Report dict with cells decayed/archived and bytes reclaimed
+        """
+        bytes_before = self.db.database_size()
+        report = {}
+        # Ids of archived cells, collected for the vector index
+        self._archived_ids = []
+
+        with self.db.writer() as conn:
+            # ATTACH must run before the transaction opens
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+            try:
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS archive.mem_cells (
+                    id INTEGER PRIMARY KEY,
+                    scene TEXT NOT NULL,
+                    cell_type TEXT NOT NULL,
+                    salience REAL NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    archived_at TEXT NOT NULL
+                )
+                """)
+
+                report["decayed_cells"] = self._decay_salience(conn)
+                report["archived_expired"] = self._archive_expired(conn)
+                report["archived_cold"] = self._archive(conn, "salience < ?", (self.min_salience,))
+                report["archived_overflow"] = self._archive_overflow(conn)
+
+                # Linked duplicates whose original was archived go with it
+                report["archived_duplicates"] = self._archive(
+                    conn,
+                    "duplicate_of IS NOT NULL AND duplicate_of NOT IN (SELECT id FROM main.mem_cells)",
+                    ()
+                )
+
+                conn.commit()
+            finally:
+                # DETACH is refused while a transaction is open
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute("DETACH DATABASE archive")
+
+        # Archived cells may be referenced by cached scene contexts
+        if self.db.context_cache:
+            self.db.context_cache.clear()
+
+        # Drop archived cells from the vector index and rewrite its files without them
+        if self.db.vector_index is not None:
+            report["vectors_removed"] = self.db.vector_index.remove(self._archived_ids)
+            self.db.vector_index.compact()
+
+        self.db.optimize_fts(merge_pages=self.fts_merge_pages)
+        self.db.vacuum(None if full_vacuum else 0)
+
+        bytes_after = self.db.database_size()
+
+        report["hot_cells"] = self.db.get_statistics()["total_cells"]
+        report["bytes_before"] = bytes_before
+        report["bytes_after"] = bytes_after
+        report["bytes_reclaimed"] = max(0, bytes_before - bytes_after)
+
+        return report
+
+    def _decay_salience(self, conn) -> int:
+        """Scale salience by 0.5 ** (days since last decay / half_life_days)"""
+        now = datetime.utcnow()
+        row = conn.execute("SELECT value FROM mem_meta WHERE key='last_decay_at'").fetchone()
+
+        conn.execute(
+            "INSERT INTO mem_meta VALUES ('last_decay_at', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (now.isoformat(),)
+        )
+
+        # First run only records the starting point
+        if not row:
+            return 0
+
+        elapsed_days = (now - datetime.fromisoformat(row["value"])).total_seconds() / 86400
+        factor = 0.5 ** (elapsed_days / self.half_life_days)
+
+        return conn.execute("UPDATE mem_cells SET salience = salience * ?", (factor,)).rowcount
+
+    def _archive_expired(self, conn) -> int:
+        """Archive cells older than their cell_type's TTL"""
+        archived = 0
+        now = datetime.utcnow()
+
+        for cell_type, ttl in self.ttl_days.items():
+            if ttl is None:
+                continue
+            cutoff = (now - timedelta(days=ttl)).isoformat()
+            archived += self._archive(conn, "cell_type = ? AND created_at < ?", (cell_type, cutoff))
+
+        return archived
+
+    def _archive_overflow(self, conn) -> int:
+        """Archive the lowest-salience cells beyond max_cells"""
+        if self.max_cells is None:
+            return 0
+
+        total = conn.execute("SELECT COUNT(*) FROM main.mem_cells").fetchone()[0]
+        if total <= self.max_cells:
+            return 0
+
+        return self._archive(
+            conn,
+            "id IN (SELECT id FROM main.mem_cells ORDER BY salience ASC, id ASC LIMIT ?)",
+            (total - self.max_cells,)
+        )
+
+    def _archive(self, conn, where: str, params: tuple) -> int:
+        """Move cells matching a WHERE clause into the archive database"""
+        if self.db.vector_index is not None:
+            self._archived_ids.extend(
+                row[0] for row in conn.execute(f"SELECT id FROM main.mem_cells WHERE {where}", params)
+            )
+
+        conn.execute(f"""
+        INSERT OR REPLACE INTO archive.mem_cells
+            (id, scene, cell_type, salience, content, created_at, archived_at)
+        SELECT id, scene, cell_type, salience, content, created_at, ?
+        FROM main.mem_cells
+        WHERE {where}
+        """, (datetime.utcnow().isoformat(), *params))
+
+        # Delete triggers drop the matching FTS and LSH entries
+        return conn.execute(f"DELETE FROM main.mem_cells WHERE {where}", params).rowcount
+
+    def start_schedule(self, interval_seconds: float, full_vacuum_every: int = 0) -> None:
+        """
+        Run compaction periodically on a background thread
+
+        Args:
+            interval_seconds: Seconds between runs
+            full_vacuum_every: Use a full VACUUM every N runs (0 = never)
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+
+        def loop():
+            runs = 0
+            while not self._stop.wait(interval_seconds):
+                runs += 1
+                full_vacuum = bool(full_vacuum_every) and runs % full_vacuum_every == 0
+                try:
+                    report = self.run(full_vacuum=full_vacuum)
+                    print(f"Memory compaction: {report}")
+                except Exception as e:
+                    print(f"Memory compaction failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="memory-compaction", daemon=True)
+        self._thread.start()
+
+    def stop_schedule(self) -> None:
+        """Stop the background schedule"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+def print_report(report: Dict) -> None:
+    """Print a compaction report"""
+    print("🧹 Memory compaction complete")
+    print(f"   Cells decayed: {report['decayed_cells']}")
+    print(f"   Archived (TTL): {report['archived_expired']}")
+    print(f"   Archived (cold): {report['archived_cold']}")
+    print(f"   Archived (over limit): {report['archived_overflow']}")
+    print(f"   Archived (duplicates): {report['archived_duplicates']}")
+    print(f"   Hot cells: {report['hot_cells']}")
+    print(f"   Bytes reclaimed: {report['bytes_reclaimed']:,} "
+          f"({report['bytes_before']:,} -> {report['bytes_after']:,})")
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Compact the agent memory database")
+    parser.add_argument("--db", help="Path to agent_memory.db (default: next to this script)")
+    parser.add_argument("--archive", help="Archive database path (default: <db>_archive.db)")
+    parser.add_argument("--half-life-days", type=float, default=90.0, help="Salience half-life in days")
+    parser.add_argument("--min-salience", type=float, default=0.05, help="Archive cells below this salience")
+    parser.add_argument("--max-cells", type=int, help="Maximum number of hot cells")
+    parser.add_argument("--full-vacuum", action="store_true", help="Run a full VACUUM")
+    parser.add_argument("--every", type=float, help="Keep running, compacting every N seconds")
+    args = parser.parse_args(argv)
+
+    db = MemoryDB(args.db)
+    compactor = MemoryCompactor(
+        db,
+        archive_path=args.archive,
+        half_life_days=args.half_life_days,
+        min_salience=args.min_salience,
+        max_cells=args.max_cells
+    )
+
+    print_report(compactor.run(full_vacuum=args.full_vacuum))
+
+    if args.every:
+        stop = threading.Event()
+        try:
+            while not stop.wait(args.every):
+                print_report(compactor.run(full_vacuum=args.full_vacuum))
+        except KeyboardInterrupt:
+            pass
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
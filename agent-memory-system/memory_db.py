@@ -5,21 +5,186 @@ Implements SQLite database with FTS5 full-text search for structured memory stor
 
 import sqlite3
 import json
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Iterable, Iterator, Optional
+import inspect
 import os
 
+from context_cache import ContextCache, normalize_query
+from dedup import (
+    DEDUP_POLICIES, DEFAULT_THRESHOLD, content_hash, content_key, lsh_buckets, minhash_many, similarity
+)
+from query_profiler import ProfiledConnection, QueryProfiler
+from token_budget import estimate_tokens
+
+def _fts_query(text: str) -> str:
+    """
+    FTS5 MATCH expression OR-ing the alphanumeric tokens of a query
+
+    Every token is quoted, so words FTS5 reads as operators (AND, OR, NOT,
+    NEAR) are searched as plain terms instead of failing the statement.
+
+    Args:
+        text: Raw query
+
+    Returns:
+        MATCH expression, empty if the query has no tokens
+    """
+    return " OR ".join(f'"{token}"' for token in re.findall(r"[a-zA-Z0-9]+", text))
+
+
+# The salience + recency fallback re-ranks only this many top-salience cells per
+# result, read through idx_salience, instead of scoring every cell
+FALLBACK_CANDIDATES_PER_RESULT = 10
+
+
+def _salience_fallback_sql(columns: str, limit: str = ":limit") -> str:
+    """
+    SELECT for the cells returned when a query matches nothing
+
+    Args:
+        columns: mem_cells columns to return besides score
+        limit: SQL expression for the number of cells
+
+    Returns:
+        SQL using the :w_salience, :w_recency and :half_life parameters
+    """
+    return f"""
+    SELECT {columns},
+           (:w_salience * salience
+            + :w_recency / (1.0 + (julianday('now') - julianday(created_at)) / :half_life)
+           ) AS score
+    FROM (
+        SELECT * FROM mem_cells
+        WHERE duplicate_of IS NULL
+        ORDER BY salience DESC
+        LIMIT ({limit}) * {FALLBACK_CANDIDATES_PER_RESULT}
+    )
+    ORDER BY score DESC
+    LIMIT {limit}
+    """
+
+
+# Statements shared by their MemoryDB methods and MemoryDB.HOT_QUERY_PLANS, so the
+# plans checked are the plans run
+CELLS_BY_SCENE_SQL = """
+SELECT * FROM mem_cells
+WHERE scene=? AND duplicate_of IS NULL
+ORDER BY salience DESC
+LIMIT ?
+"""
+
+CELLS_BY_TYPE_SQL = """
+SELECT * FROM mem_cells
+WHERE cell_type=? AND duplicate_of IS NULL
+ORDER BY salience DESC
+LIMIT ?
+"""
+
+SCENE_LAST_CELL_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM mem_cells WHERE scene=?"
+
+# Exact-duplicate candidates for "skip" and "merge" (confirmed with content_key)
+EXACT_DUPLICATE_SQL = """
+SELECT id, content FROM mem_cells
+WHERE scene=? AND content_hash=? AND duplicate_of IS NULL
+"""
+
+# Range scan on idx_cells_source (LIKE would not use the index)
+SOURCES_SQL = """
+SELECT source, COUNT(*) AS cells FROM mem_cells
+WHERE source >= ? AND source < ?
+GROUP BY source
+"""
+
+# Unranked retrieve_context fallback
+TOP_SALIENCE_SQL = """
+SELECT id, scene, content, salience, cell_type
+FROM mem_cells
+WHERE duplicate_of IS NULL
+ORDER BY salience DESC
+LIMIT ?
+"""
+
+# Ranked retrieve_context / retrieve_context_many fallback
+SALIENCE_FALLBACK_SQL = _salience_fallback_sql("id, scene, content, salience, cell_type, tokens")
+
 
 class MemoryDB:
     """Structured memory database with FTS5 full-text search"""
 
-    def __init__(self, db_path: Optional[str] = None):
+    # Default weights for ranked retrieval (see retrieve_context)
+    DEFAULT_RANK_WEIGHTS = {
+        "bm25": 1.0,
+        "salience": 2.0,
+        "recency": 1.0,
+        "half_life_days": 30.0,
+        "vector": 0.5,     # share of cosine similarity in hybrid scores
+        "candidates": 4    # hybrid: candidates per result taken from each index
+    }
+
+    # Salience added to an existing cell when a near-duplicate is merged into it
+    DEDUP_MERGE_BOOST = 0.05
+
+    # Hot lookups and the index each must use (see check_query_plans)
+    HOT_QUERY_PLANS = {
+        "get_cells_by_scene": (CELLS_BY_SCENE_SQL, ("", 100), "idx_cells_scene_salience"),
+        "search_by_type": (CELLS_BY_TYPE_SQL, ("", 20), "idx_cells_type_salience"),
+        "get_scene_last_cell_id": (SCENE_LAST_CELL_ID_SQL, ("",), "idx_cells_scene_salience"),
+        "get_sources": (SOURCES_SQL, ("", "\U0010ffff"), "idx_cells_source"),
+        "exact_duplicates": (EXACT_DUPLICATE_SQL, ("", 0), "idx_cells_content_hash"),
+        "top_salience": (TOP_SALIENCE_SQL, (6,), "idx_salience"),
+        "salience_fallback": (
+            SALIENCE_FALLBACK_SQL,
+            {"w_salience": 2.0, "w_recency": 1.0, "half_life": 30.0, "limit": 6},
+            "idx_salience"
+        ),
+    }
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        rank_weights: Optional[Dict[str, float]] = None,
+        reader_pool_size: int = 4,
+        busy_timeout_ms: int = 5000,
+        mmap_size: int = 256 * 1024 * 1024,
+        vector_index=None,
+        dedup: Optional[str] = "skip",
+        dedup_threshold: float = DEFAULT_THRESHOLD,
+        stats_histograms: bool = False,
+        context_cache_size: int = 512,
+        context_cache_ttl: float = 60.0
+    ):
         """
         Initialize memory database
 
+        The database runs in WAL mode with one writer connection (self.db)
+        serialized by a lock and a pool of reader connections, so retrieval
+        never waits on an in-flight write.
+
         Args:
             db_path: Path to SQLite database file. If None, creates in workspace
+            rank_weights: Optional overrides for DEFAULT_RANK_WEIGHTS
+            reader_pool_size: Maximum number of concurrent reader connections
+            busy_timeout_ms: How long a connection waits on a locked database
+            mmap_size: Bytes of the database file to memory-map per connection
+            vector_index: Optional VectorIndex used for hybrid retrieval
+                          (see enable_vector_index)
+            dedup: Default duplicate policy for inserts: "skip", "merge",
+                   "link" or None to always insert (see insert_cells)
+            dedup_threshold: Minimum estimated Jaccard similarity "link" treats as a duplicate
+            stats_histograms: Also maintain salience-bucket and per-day insert counters
+                              (persists in the database once enabled)
+            context_cache_size: Entries kept by the retrieve_scene_context cache (0 disables)
+            context_cache_ttl: Seconds a cached scene context stays valid
         """
+        self.rank_weights = dict(self.DEFAULT_RANK_WEIGHTS)
+        self.rank_weights.update(rank_weights or {})
+
         if db_path is None:
             db_path = os.path.join(
                 os.path.dirname(__file__),
@@ -29,12 +194,183 @@ class MemoryDB:
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
-        self.db = sqlite3.connect(db_path)
-        self.db.row_factory = sqlite3.Row
+        self.db_path = db_path
+        self.vector_index = vector_index
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self.stats_histograms = stats_histograms
+        self.context_cache = (
+            ContextCache(context_cache_size, context_cache_ttl) if context_cache_size else None
+        )
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.profiler: Optional[QueryProfiler] = None
+
+        # Single writer connection, shared across threads behind a lock
+        self._write_lock = threading.RLock()
+        self.db = self._connect()
+        self.db.execute("PRAGMA journal_mode=WAL")
         self._init_schema()
 
+        # Reader pool: connections are created lazily up to reader_pool_size
+        # and pinned to a thread for the duration of a read
+        self.reader_pool_size = reader_pool_size
+        self._readers = queue.Queue()
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the pool's pragmas applied"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=ProfiledConnection)
+        conn.row_factory = sqlite3.Row
+        conn.profiler = self.profiler
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the write lock and yield the writer connection inside a transaction
+
+        For maintenance jobs that need several statements to commit together.
+        Commits on success, rolls back on error.
+        """
+        with self._write_lock, self.db:
+            yield self.db
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a reader connection for the current thread
+
+        Nested reads on the same thread reuse the connection already held.
+        """
+        conn = getattr(self._local, "reader", None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._checkout_reader()
+        self._local.reader = conn
+        try:
+            yield conn
+        finally:
+            self._local.reader = None
+            self._readers.put(conn)
+
+    def _checkout_reader(self) -> sqlite3.Connection:
+        """Take an idle reader, open a new one, or wait for one to be released"""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if len(self._all_readers) < self.reader_pool_size:
+                conn = self._connect()
+                self._all_readers.append(conn)
+                return conn
+
+        return self._readers.get()
+
     def _init_schema(self):
-        """Initialize memory database schema"""
+        """
+        Bring the schema up to date, then set up the statistics counters
+
+        PRAGMA user_version holds the last migration applied (see _migrations).
+        Each pending migration runs in its own transaction together with its
+        user_version bump, so an interrupted upgrade resumes where it stopped.
+        Databases created before versioning report 0 and replay every
+        migration; each one only adds what is missing.
+        """
+        self._fts_needs_rebuild = False
+        applied = self._migrate()
+
+        self._init_stats()
+
+        self.db.commit()
+
+        # Reclaim the pages held by the old duplicated content
+        if self._fts_needs_rebuild:
+            self.db.execute("VACUUM")
+
+        if applied:
+            self.check_query_plans()
+
+    def _migrations(self) -> List[tuple]:
+        """Schema migrations in order: (user_version, description, migration)"""
+        return [
+            (1, "cells, scenes and metadata tables", self._migrate_base_tables),
+            (2, "near-duplicate fingerprints and LSH buckets", self._migrate_fingerprints),
+            (3, "incremental consolidation high-water marks", self._migrate_consolidation_marks),
+            (4, "token estimates", self._migrate_token_estimates),
+            (5, "external-content FTS index", self._migrate_fts),
+            (6, "import source column", self._migrate_source),
+            (7, "scene, type and created_at lookup indexes", self._migrate_lookup_indexes),
+            (8, "exact-duplicate content hashes", self._migrate_content_hash),
+        ]
+
+    def schema_version(self) -> int:
+        """Last migration applied to this database (PRAGMA user_version)"""
+        with self._write_lock:
+            return self.db.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self) -> List[int]:
+        """
+        Apply pending migrations
+
+        Returns:
+            Versions applied by this call
+        """
+        migrations = self._migrations()
+        latest = migrations[-1][0]
+        current = self.schema_version()
+
+        if current > latest:
+            print(f"⚠️ Database schema version {current} is newer than this code ({latest})")
+            return []
+
+        applied = []
+        for version, description, migration in migrations:
+            if version <= current:
+                continue
+
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                current = self.schema_version()
+                if version > current:
+                    migration()
+                    self.db.execute(f"PRAGMA user_version={int(version)}")
+                    applied.append(version)
+                    current = version
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                print(f"❌ Schema migration {version} ({description}) failed")
+                raise
+
+        return applied
+
+    def _add_column(self, table: str, column: str, definition: str) -> bool:
+        """
+        Add a column unless the table already has it
+
+        Returns:
+            True if the column was added
+        """
+        columns = {row["name"] for row in self.db.execute(f"PRAGMA table_info({table})")}
+        if column in columns:
+            return False
+
+        self.db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
+    def _migrate_base_tables(self):
+        """Memory cells, consolidated scene summaries and maintenance metadata"""
         # Memory cells table - atomic knowledge units
         self.db.execute("""
         CREATE TABLE IF NOT EXISTS mem_cells (
@@ -47,6 +383,12 @@ class MemoryDB:
         )
         """)
 
+        # Index on salience for fallback retrieval
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_salience
+        ON mem_cells(salience DESC)
+        """)
+
         # Scenes table - consolidated scene summaries
         self.db.execute("""
         CREATE TABLE IF NOT EXISTS mem_scenes (
@@ -56,53 +398,703 @@ class MemoryDB:
         )
         """)
 
-        # Full-text search index for fast retrieval
+        # Key-value metadata for maintenance jobs (e.g. last salience decay)
+        self.db.execute("""
+        CREATE TABLE IF NOT EXISTS mem_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+        """)
+
+    def _migrate_fingerprints(self):
+        """MinHash fingerprints, duplicate links and LSH buckets for near-duplicate lookup"""
+        self._add_column("mem_cells", "fingerprint", "BLOB")
+        self._add_column("mem_cells", "duplicate_of", "INTEGER")
+
+        # LSH buckets over MinHash bands for O(1) near-duplicate lookup
+        self.db.execute("""
+        CREATE TABLE IF NOT EXISTS mem_cell_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            cell_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, cell_id)
+        ) WITHOUT ROWID
+        """)
+
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lsh_cell
+        ON mem_cell_lsh(cell_id)
+        """)
+
+        self.db.execute("""
+        CREATE TRIGGER IF NOT EXISTS mem_cells_lsh_ad AFTER DELETE ON mem_cells BEGIN
+            DELETE FROM mem_cell_lsh WHERE cell_id = old.id;
+        END
+        """)
+
+        # Fingerprints are filled in lazily by the first insert that deduplicates
+        # (see _backfill_fingerprints)
+
+    def _migrate_consolidation_marks(self):
+        """Per-scene high-water mark and increment count for incremental consolidation"""
+        self._add_column("mem_scenes", "last_cell_id", "INTEGER NOT NULL DEFAULT 0")
+        self._add_column("mem_scenes", "increments", "INTEGER NOT NULL DEFAULT 0")
+
+    def _migrate_token_estimates(self):
+        """Stored token estimates for cells and scene summaries"""
+        needs_cell_tokens = self._add_column("mem_cells", "tokens", "INTEGER")
+        needs_scene_tokens = self._add_column("mem_scenes", "summary_tokens", "INTEGER")
+
+        if needs_cell_tokens or needs_scene_tokens:
+            self._backfill_token_estimates()
+
+    def _migrate_fts(self):
+        """Full-text index over mem_cells, kept in sync by triggers"""
+        # Older databases carry a standalone FTS table with its own copy of content
+        self._migrate_standalone_fts()
+
+        # Full-text search index for fast retrieval (external content, reads from mem_cells)
         self.db.execute("""
         CREATE VIRTUAL TABLE IF NOT EXISTS mem_cells_fts
-        USING fts5(content, scene, cell_type)
+        USING fts5(content, scene, cell_type, content='mem_cells', content_rowid='id')
         """)
 
-        # Index on salience for fallback retrieval
+        # Triggers keep the FTS index in sync with mem_cells
         self.db.execute("""
-        CREATE INDEX IF NOT EXISTS idx_salience
-        ON mem_cells(salience DESC)
+        CREATE TRIGGER IF NOT EXISTS mem_cells_ai AFTER INSERT ON mem_cells BEGIN
+            INSERT INTO mem_cells_fts (rowid, content, scene, cell_type)
+            VALUES (new.id, new.content, new.scene, new.cell_type);
+        END
         """)
 
-        self.db.commit()
+        self.db.execute("""
+        CREATE TRIGGER IF NOT EXISTS mem_cells_ad AFTER DELETE ON mem_cells BEGIN
+            INSERT INTO mem_cells_fts (mem_cells_fts, rowid, content, scene, cell_type)
+            VALUES ('delete', old.id, old.content, old.scene, old.cell_type);
+        END
+        """)
+
+        self.db.execute("""
+        CREATE TRIGGER IF NOT EXISTS mem_cells_au AFTER UPDATE OF content, scene, cell_type ON mem_cells BEGIN
+            INSERT INTO mem_cells_fts (mem_cells_fts, rowid, content, scene, cell_type)
+            VALUES ('delete', old.id, old.content, old.scene, old.cell_type);
+            INSERT INTO mem_cells_fts (rowid, content, scene, cell_type)
+            VALUES (new.id, new.content, new.scene, new.cell_type);
+        END
+        """)
+
+        if self._fts_needs_rebuild:
+            self.db.execute("INSERT INTO mem_cells_fts (mem_cells_fts) VALUES ('rebuild')")
 
-    def insert_cell(self, cell: Dict) -> int:
+    def _migrate_source(self):
+        """Source file of imported cells so a re-import can replace them"""
+        self._add_column("mem_cells", "source", "TEXT")
+
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cells_source
+        ON mem_cells(source) WHERE source IS NOT NULL
+        """)
+
+    def _migrate_lookup_indexes(self):
+        """Indexes for per-scene and per-type lookups ordered by salience, and for age-based archival"""
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cells_scene_salience
+        ON mem_cells(scene, salience DESC)
+        """)
+
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cells_type_salience
+        ON mem_cells(cell_type, salience DESC)
+        """)
+
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cells_created_at
+        ON mem_cells(created_at)
+        """)
+
+    def _migrate_content_hash(self, batch_size: int = 5000):
+        """Indexed content hash per cell so exact duplicates are found without MinHash"""
+        if self._add_column("mem_cells", "content_hash", "INTEGER"):
+            last_id = 0
+            while True:
+                rows = self.db.execute(
+                    "SELECT id, content FROM mem_cells WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+                self.db.executemany(
+                    "UPDATE mem_cells SET content_hash=? WHERE id=?",
+                    [(content_hash(_cell_text(json.loads(row["content"]))), row["id"]) for row in rows]
+                )
+
+        self.db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cells_content_hash
+        ON mem_cells(content_hash)
+        """)
+
+    def check_query_plans(self, strict: bool = False) -> Dict[str, List[str]]:
+        """
+        Check with EXPLAIN QUERY PLAN that hot lookups use their index
+
+        Runs after every migration and prints a warning for each of
+        HOT_QUERY_PLANS a schema change left scanning the table. The database
+        stays usable; only a caller asking for strict checking gets an error.
+
+        Args:
+            strict: Raise instead of warning
+
+        Returns:
+            Query plan lines per hot query
+
+        Raises:
+            AssertionError: With strict, if a query does not use its expected index
+        """
+        plans = {}
+        failures = []
+        with self._write_lock:
+            for name, (sql, params, index) in self.HOT_QUERY_PLANS.items():
+                plan = [row[3] for row in self.db.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                plans[name] = plan
+                if not any(f"INDEX {index} " in f"{line} " for line in plan):
+                    failures.append(f"{name}: expected {index}, got {plan}")
+
+        if failures and strict:
+            raise AssertionError("Hot queries not using their index:\n  " + "\n  ".join(failures))
+
+        for failure in failures:
+            print(f"⚠️ Hot query not using its index: {failure}")
+
+        return plans
+
+    def _init_stats(self):
+        """
+        Create the trigger-maintained statistics counters
+
+        mem_stats holds one counter per name: cells, scenes, content_bytes,
+        type:<cell_type> and scene:<scene>. With stats_histograms enabled it
+        also holds salience:<bucket> (tenths) and day:<YYYY-MM-DD> insert counts.
+        """
+        stats_exists = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='mem_stats'"
+        ).fetchone()
+
+        self.db.execute("""
+        CREATE TABLE IF NOT EXISTS mem_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """)
+
+        def bump(name: str, delta: str) -> str:
+            return (
+                f"INSERT INTO mem_stats VALUES ({name}, {delta}) "
+                f"ON CONFLICT(name) DO UPDATE SET value = value + ({delta});"
+            )
+
+        content_bytes = "length(CAST({row}.content AS BLOB))"
+        bucket = "'salience:' || MIN(CAST({row}.salience * 10 AS INTEGER), 9)"
+
+        triggers = {
+            "mem_stats_cells_ai": f"""
+            AFTER INSERT ON mem_cells BEGIN
+                {bump("'cells'", "1")}
+                {bump("'type:' || new.cell_type", "1")}
+                {bump("'scene:' || new.scene", "1")}
+                {bump("'content_bytes'", content_bytes.format(row="new"))}
+            END""",
+            "mem_stats_cells_ad": f"""
+            AFTER DELETE ON mem_cells BEGIN
+                {bump("'cells'", "-1")}
+                {bump("'type:' || old.cell_type", "-1")}
+                {bump("'scene:' || old.scene", "-1")}
+                {bump("'content_bytes'", "-" + content_bytes.format(row="old"))}
+            END""",
+            "mem_stats_cells_au": f"""
+            AFTER UPDATE OF scene, cell_type, content ON mem_cells BEGIN
+                {bump("'type:' || old.cell_type", "-1")}
+                {bump("'type:' || new.cell_type", "1")}
+                {bump("'scene:' || old.scene", "-1")}
+                {bump("'scene:' || new.scene", "1")}
+                {bump("'content_bytes'", content_bytes.format(row="new") + " - " + content_bytes.format(row="old"))}
+            END""",
+            "mem_stats_scenes_ai": f"""
+            AFTER INSERT ON mem_scenes BEGIN
+                {bump("'scenes'", "1")}
+            END""",
+            "mem_stats_scenes_ad": f"""
+            AFTER DELETE ON mem_scenes BEGIN
+                {bump("'scenes'", "-1")}
+            END"""
+        }
+
+        histogram_triggers = {
+            "mem_stats_hist_ai": f"""
+            AFTER INSERT ON mem_cells BEGIN
+                {bump(bucket.format(row="new"), "1")}
+                {bump("'day:' || substr(new.created_at, 1, 10)", "1")}
+            END""",
+            "mem_stats_hist_ad": f"""
+            AFTER DELETE ON mem_cells BEGIN
+                {bump(bucket.format(row="old"), "-1")}
+            END""",
+            "mem_stats_hist_au": f"""
+            AFTER UPDATE OF salience ON mem_cells
+            WHEN {bucket.format(row="old")} != {bucket.format(row="new")} BEGIN
+                {bump(bucket.format(row="old"), "-1")}
+                {bump(bucket.format(row="new"), "1")}
+            END"""
+        }
+
+        for name, body in triggers.items():
+            self.db.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+        histograms_exist = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='mem_stats_hist_ai'"
+        ).fetchone()
+
+        # Histograms stay enabled once any connection has turned them on
+        if self.stats_histograms and not histograms_exist:
+            for name, body in histogram_triggers.items():
+                self.db.execute(f"CREATE TRIGGER {name} {body}")
+
+        if not stats_exists or (self.stats_histograms and not histograms_exist):
+            self._rebuild_stats(self.db)
+
+        self.stats_histograms = self.stats_histograms or bool(histograms_exist)
+
+    def _rebuild_stats(self, conn: sqlite3.Connection):
+        """Recompute every statistics counter from the tables"""
+        conn.execute("DELETE FROM mem_stats")
+        conn.execute("""
+        INSERT INTO mem_stats
+        SELECT 'cells', COUNT(*) FROM mem_cells
+        UNION ALL SELECT 'scenes', COUNT(*) FROM mem_scenes
+        UNION ALL SELECT 'content_bytes', COALESCE(SUM(length(CAST(content AS BLOB))), 0) FROM mem_cells
+        UNION ALL SELECT 'type:' || cell_type, COUNT(*) FROM mem_cells GROUP BY cell_type
+        UNION ALL SELECT 'scene:' || scene, COUNT(*) FROM mem_cells GROUP BY scene
+        """)
+
+        if self.stats_histograms:
+            conn.execute("""
+            INSERT INTO mem_stats
+            SELECT 'salience:' || MIN(CAST(salience * 10 AS INTEGER), 9), COUNT(*)
+            FROM mem_cells GROUP BY 1
+            UNION ALL
+            SELECT 'day:' || substr(created_at, 1, 10), COUNT(*)
+            FROM mem_cells GROUP BY 1
+            """)
+
+    def rebuild_statistics(self) -> None:
+        """Recompute statistics counters (e.g. after loading data with triggers disabled)"""
+        with self.writer() as conn:
+            self._rebuild_stats(conn)
+
+    def _migrate_standalone_fts(self):
+        """
+        Drop a standalone mem_cells_fts table so it can be recreated as an
+        external-content index and rebuilt from mem_cells
+        """
+        row = self.db.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='mem_cells_fts'"
+        ).fetchone()
+
+        self._fts_needs_rebuild = bool(row) and "content=" not in row["sql"]
+
+        if self._fts_needs_rebuild:
+            self.db.execute("DROP TABLE mem_cells_fts")
+
+    def _backfill_fingerprints(self, batch_size: int = 5000):
+        """
+        Compute fingerprints and LSH buckets for cells inserted without them
+
+        Only "link" inserts fingerprint cells, so the first "link" insert after
+        any others catches up here. mem_meta "fingerprinted_through"
+        holds the highest cell id known to be done, so each call only looks at
+        cells added since. Runs inside the caller's write transaction.
+        """
+        row = self.db.execute("SELECT value FROM mem_meta WHERE key='fingerprinted_through'").fetchone()
+        after_id = int(row["value"]) if row else 0
+
+        while True:
+            rows = self.db.execute("""
+            SELECT id, content, duplicate_of FROM mem_cells
+            WHERE id > ? AND fingerprint IS NULL
+            ORDER BY id
+            LIMIT ?
+            """, (after_id, batch_size)).fetchall()
+            if not rows:
+                break
+            after_id = rows[-1]["id"]
+
+            fingerprints = minhash_many([_cell_text(json.loads(row["content"])) for row in rows])
+            self.db.executemany(
+                "UPDATE mem_cells SET fingerprint=? WHERE id=?",
+                [(fingerprint, row["id"]) for row, fingerprint in zip(rows, fingerprints) if fingerprint is not None]
+            )
+            # Only originals are LSH candidates (as in _insert_batch)
+            self.db.executemany(
+                "INSERT OR IGNORE INTO mem_cell_lsh VALUES (?,?,?)",
+                [
+                    (band, bucket, row["id"])
+                    for row, fingerprint in zip(rows, fingerprints)
+                    if fingerprint is not None and row["duplicate_of"] is None
+                    for band, bucket in enumerate(lsh_buckets(fingerprint))
+                ]
+            )
+
+        self._set_fingerprinted_through()
+
+    def _set_fingerprinted_through(self) -> None:
+        """Record that every current cell has its fingerprint (inside the write transaction)"""
+        self.db.execute("""
+        INSERT INTO mem_meta (key, value)
+        SELECT 'fingerprinted_through', COALESCE(MAX(id), 0) FROM mem_cells WHERE true
+        ON CONFLICT(key) DO UPDATE SET value=excluded.value
+        """)
+
+    def _backfill_token_estimates(self, batch_size: int = 5000):
+        """Store token estimates for cells and scene summaries written before they existed"""
+        cursor = self.db.execute("SELECT id, content FROM mem_cells WHERE tokens IS NULL")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            self.db.executemany(
+                "UPDATE mem_cells SET tokens=? WHERE id=?",
+                [(estimate_tokens(_cell_text(json.loads(row["content"]))), row["id"]) for row in rows]
+            )
+
+        rows = self.db.execute("SELECT scene, summary FROM mem_scenes WHERE summary_tokens IS NULL").fetchall()
+        self.db.executemany(
+            "UPDATE mem_scenes SET summary_tokens=? WHERE scene=?",
+            [(estimate_tokens(row["summary"]), row["scene"]) for row in rows]
+        )
+
+    def insert_cell(self, cell: Dict, dedup: Optional[str] = "default") -> int:
         """
         Insert a memory cell
 
         Args:
             cell: Dictionary with keys: scene, cell_type, salience, content
+            dedup: Duplicate policy (see insert_cells)
 
         Returns:
-            ID of inserted cell
-        """
-        cursor = self.db.execute(
-            "INSERT INTO mem_cells (scene, cell_type, salience, content, created_at) VALUES (?,?,?,?,?)",
-            (
-                cell["scene"],
-                cell["cell_type"],
-                cell["salience"],
-                json.dumps(cell["content"]),
-                datetime.utcnow().isoformat()
+            ID of inserted cell (or of the existing cell it duplicates)
+        """
+        return self.insert_cells([cell], dedup=dedup)[0]
+
+    def insert_cells(
+        self,
+        cells: Iterable[Dict],
+        batch_size: int = 500,
+        dedup: Optional[str] = "default",
+        source: Optional[str] = None
+    ) -> List[int]:
+        """
+        Insert many memory cells using one transaction per batch
+
+        Duplicates of a cell already in the same scene (or earlier in the
+        call) are handled by the dedup policy:
+            "skip"  - exact duplicates (same normalized wording, found through
+                      the indexed content_hash) are not inserted; the
+                      existing cell's id is returned (the default)
+            "merge" - exact duplicates are not inserted; the existing cell's
+                      salience is boosted
+            "link"  - near-duplicates (estimated word Jaccard similarity >=
+                      self.dedup_threshold, found through MinHash LSH
+                      buckets) are inserted with duplicate_of set, hidden
+                      from retrieval
+            None    - always insert
+
+        Args:
+            cells: Iterable of dicts with keys: scene, cell_type, salience, content
+            batch_size: Number of cells committed per transaction
+            dedup: Duplicate policy; "default" uses self.dedup
+            source: Origin of the cells (e.g. an imported file), see delete_source_cells
+
+        Returns:
+            IDs of inserted (or matched existing) cells, in input order
+        """
+        if dedup == "default":
+            dedup = self.dedup
+        if dedup is not None and dedup not in DEDUP_POLICIES:
+            raise ValueError(f"Invalid dedup policy '{dedup}'. Must be one of: {', '.join(DEDUP_POLICIES)}")
+
+        inserted_ids = []
+        batch = []
+
+        for cell in cells:
+            batch.append(cell)
+            if len(batch) >= batch_size:
+                inserted_ids.extend(self._insert_batch(batch, dedup, source))
+                batch = []
+
+        if batch:
+            inserted_ids.extend(self._insert_batch(batch, dedup, source))
+
+        return inserted_ids
+
+    def _insert_batch(self, cells: List[Dict], dedup: Optional[str], source: Optional[str] = None) -> List[int]:
+        """Insert one batch of cells in a single transaction"""
+        created_at = datetime.utcnow().isoformat()
+        texts = [_cell_text(cell["content"]) for cell in cells]
+
+        hashes = [content_hash(text) for text in texts]
+
+        # Fingerprinting is the bulk of insert time, so only near-duplicate linking pays for it
+        fingerprints = minhash_many(texts) if dedup == "link" else [None] * len(cells)
+
+        with self._write_lock, self.db:
+            # Per cell: None, ("db", cell_id) or ("batch", index of an earlier cell)
+            originals = [None] * len(cells)
+            if dedup == "link":
+                self._backfill_fingerprints()
+                originals = self._find_duplicates(cells, fingerprints)
+            elif dedup:
+                originals = self._find_exact_duplicates(cells, texts, hashes)
+
+            to_insert = [
+                i for i, original in enumerate(originals)
+                if original is None or dedup == "link"
+            ]
+
+            rows = [
+                (
+                    cells[i]["scene"],
+                    cells[i]["cell_type"],
+                    cells[i]["salience"],
+                    json.dumps(cells[i]["content"]),
+                    created_at,
+                    fingerprints[i],
+                    originals[i][1] if originals[i] and originals[i][0] == "db" else None,
+                    estimate_tokens(texts[i]),
+                    source,
+                    hashes[i]
+                )
+                for i in to_insert
+            ]
+
+            self.db.executemany(
+                "INSERT INTO mem_cells (scene, cell_type, salience, content, created_at, fingerprint, duplicate_of, tokens, source, content_hash) VALUES (?,?,?,?,?,?,?,?,?,?)",
+                rows
             )
-        )
 
-        # Also insert into full-text search index
-        self.db.execute(
-            "INSERT INTO mem_cells_fts (content, scene, cell_type) VALUES (?,?,?)",
-            (
-                json.dumps(cell["content"]),
-                cell["scene"],
-                cell["cell_type"]
+            # AUTOINCREMENT ids are contiguous inside one write transaction
+            last_id = self.db.execute("SELECT last_insert_rowid()").fetchone()[0]
+            new_ids = dict(zip(to_insert, range(last_id - len(rows) + 1, last_id + 1)))
+
+            def original_id(i: int) -> int:
+                source, ref = originals[i]
+                return ref if source == "db" else new_ids[ref]
+
+            ids = [new_ids[i] if i in new_ids else original_id(i) for i in range(len(cells))]
+
+            # Only originals go into the LSH table, so later duplicates resolve to them
+            self.db.executemany(
+                "INSERT OR IGNORE INTO mem_cell_lsh VALUES (?,?,?)",
+                [
+                    (band, bucket, new_ids[i])
+                    for i in to_insert
+                    if originals[i] is None and fingerprints[i] is not None
+                    for band, bucket in enumerate(lsh_buckets(fingerprints[i]))
+                ]
             )
-        )
 
-        self.db.commit()
-        return cursor.lastrowid
+            duplicates = [i for i, original in enumerate(originals) if original is not None]
+
+            if dedup == "link":
+                self.db.executemany(
+                    "UPDATE mem_cells SET duplicate_of=? WHERE id=?",
+                    [(original_id(i), new_ids[i]) for i in duplicates if originals[i][0] == "batch"]
+                )
+            elif dedup == "merge":
+                self.db.executemany(
+                    "UPDATE mem_cells SET salience=MIN(1.0, MAX(salience, ?) + ?) WHERE id=?",
+                    [(cells[i]["salience"], self.DEDUP_MERGE_BOOST, original_id(i)) for i in duplicates]
+                )
+
+            if dedup == "link":
+                self._set_fingerprinted_through()
+
+            # Still under the write lock so vector ids are appended in order
+            if self.vector_index is not None and to_insert:
+                self.vector_index.add(
+                    [new_ids[i] for i in to_insert],
+                    [texts[i] for i in to_insert]
+                )
+
+        return ids
+
+    def delete_source_cells(self, source: str) -> List[str]:
+        """
+        Delete every cell inserted with a given source
+
+        Linked duplicates (dedup="link") from other sources that pointed at a
+        deleted cell are promoted: the oldest becomes the new original and
+        the rest are re-linked to it, so the fact stays retrievable.
+
+        Args:
+            source: Source passed to insert_cells
+
+        Returns:
+            Scenes that lost or gained visible cells
+        """
+        with self.writer() as conn:
+            rows = conn.execute("SELECT id, scene FROM mem_cells WHERE source=?", (source,)).fetchall()
+            if not rows:
+                return []
+
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS deleted_cells (id INTEGER PRIMARY KEY)")
+            conn.executemany("INSERT INTO temp.deleted_cells VALUES (?)", [(row["id"],) for row in rows])
+
+            promoted = conn.execute("""
+            SELECT duplicate_of AS old_id, MIN(id) AS new_id
+            FROM mem_cells
+            WHERE duplicate_of IN (SELECT id FROM temp.deleted_cells)
+              AND source IS NOT ?
+            GROUP BY duplicate_of
+            """, (source,)).fetchall()
+
+            conn.executemany(
+                "UPDATE mem_cells SET duplicate_of = ? WHERE duplicate_of = ? AND id != ?",
+                [(row["new_id"], row["old_id"], row["new_id"]) for row in promoted]
+            )
+            conn.executemany(
+                "UPDATE mem_cells SET duplicate_of = NULL WHERE id = ?",
+                [(row["new_id"],) for row in promoted]
+            )
+
+            # Promoted cells become LSH candidates for future duplicates
+            promoted_rows = conn.execute(f"""
+            SELECT id, scene, fingerprint FROM mem_cells
+            WHERE id IN ({",".join("?" * len(promoted))})
+            """, [row["new_id"] for row in promoted]).fetchall() if promoted else []
+            conn.executemany(
+                "INSERT OR IGNORE INTO mem_cell_lsh VALUES (?,?,?)",
+                [
+                    (band, bucket, row["id"])
+                    for row in promoted_rows
+                    if row["fingerprint"] is not None
+                    for band, bucket in enumerate(lsh_buckets(row["fingerprint"]))
+                ]
+            )
+
+            # Delete triggers drop the FTS, LSH and statistics entries
+            conn.execute("DELETE FROM mem_cells WHERE id IN (SELECT id FROM temp.deleted_cells)")
+            conn.execute("DELETE FROM temp.deleted_cells")
+
+        if self.vector_index is not None:
+            self.vector_index.remove([row["id"] for row in rows])
+
+        scenes = sorted({row["scene"] for row in rows} | {row["scene"] for row in promoted_rows})
+
+        if self.context_cache:
+            for scene in scenes:
+                self.context_cache.invalidate_scene(scene)
+
+        return scenes
+
+    def get_sources(self, prefix: str = "") -> Dict[str, int]:
+        """
+        Cell sources starting with a prefix
+
+        Args:
+            prefix: Source prefix (e.g. a file path)
+
+        Returns:
+            Dict of source -> number of cells
+        """
+        with self._read() as conn:
+            rows = conn.execute(SOURCES_SQL, (prefix, prefix + "\U0010ffff")).fetchall()
+
+        return {row["source"]: row["cells"] for row in rows}
+
+    def _find_exact_duplicates(self, cells: List[Dict], texts: List[str], hashes: List[int]) -> List:
+        """
+        Look up exact-duplicate originals for each cell via content_hash
+
+        Checks cells already stored in the same scene first, then earlier
+        cells of the same batch. A hash hit only matches when the normalized
+        wording is identical (content_key), so policies that drop the new
+        cell never lose a changed detail such as "8am" -> "9am".
+        """
+        originals = []
+        seen: Dict[tuple, List[int]] = {}
+        keys = [content_key(text) for text in texts]
+
+        for i, cell in enumerate(cells):
+            match = None
+
+            for row in self.db.execute(EXACT_DUPLICATE_SQL, (cell["scene"], hashes[i])).fetchall():
+                if content_key(_cell_text(json.loads(row["content"]))) == keys[i]:
+                    match = ("db", row["id"])
+                    break
+
+            if match is None:
+                for j in seen.get((cell["scene"], hashes[i]), []):
+                    if keys[j] == keys[i]:
+                        match = ("batch", j)
+                        break
+
+            originals.append(match)
+
+            if match is None:
+                seen.setdefault((cell["scene"], hashes[i]), []).append(i)
+
+        return originals
+
+    def _find_duplicates(self, cells: List[Dict], fingerprints: List[Optional[bytes]]) -> List:
+        """
+        Look up near-duplicate originals for each cell via LSH buckets
+
+        Checks cells already stored in the same scene first, then earlier
+        cells of the same batch, confirming candidates against the estimated
+        similarity.
+        """
+        originals = []
+        batch_buckets: Dict[tuple, List[int]] = {}
+
+        for i, (cell, fingerprint) in enumerate(zip(cells, fingerprints)):
+            if fingerprint is None:
+                originals.append(None)
+                continue
+
+            buckets = lsh_buckets(fingerprint)
+            match = None
+
+            for band, bucket in enumerate(buckets):
+                cursor = self.db.execute("""
+                SELECT mem_cells.id, mem_cells.fingerprint
+                FROM mem_cell_lsh
+                JOIN mem_cells ON mem_cells.id = mem_cell_lsh.cell_id
+                WHERE mem_cell_lsh.band=? AND mem_cell_lsh.bucket=? AND mem_cells.scene=?
+                """, (band, bucket, cell["scene"]))
+                for row in cursor:
+                    if similarity(row["fingerprint"], fingerprint) >= self.dedup_threshold:
+                        match = ("db", row["id"])
+                        break
+                cursor.close()
+                if match:
+                    break
+
+            if match is None:
+                for band, bucket in enumerate(buckets):
+                    for j in batch_buckets.get((cell["scene"], band, bucket), []):
+                        if similarity(fingerprints[j], fingerprint) >= self.dedup_threshold:
+                            match = ("batch", j)
+                            break
+                    if match:
+                        break
+
+            originals.append(match)
+
+            if match is None:
+                for band, bucket in enumerate(buckets):
+                    batch_buckets.setdefault((cell["scene"], band, bucket), []).append(i)
+
+        return originals
 
     def get_scene(self, scene: str) -> Optional[Dict]:
         """
@@ -114,28 +1106,48 @@ class MemoryDB:
         Returns:
             Scene dict or None
         """
-        row = self.db.execute(
-            "SELECT * FROM mem_scenes WHERE scene=?",
-            (scene,)
-        ).fetchone()
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT * FROM mem_scenes WHERE scene=?",
+                (scene,)
+            ).fetchone()
 
-        return dict(row) if row else None
+            return dict(row) if row else None
 
-    def upsert_scene(self, scene: str, summary: str) -> None:
+    def upsert_scene(
+        self,
+        scene: str,
+        summary: str,
+        last_cell_id: Optional[int] = None,
+        increments: Optional[int] = None
+    ) -> None:
         """
         Insert or update scene summary
 
         Args:
             scene: Scene identifier
             summary: Consolidated scene summary
+            last_cell_id: Highest cell id folded into the summary (None keeps current)
+            increments: Incremental updates since the last full rebuild (None keeps current)
         """
-        self.db.execute("""
-        INSERT INTO mem_scenes VALUES (?,?,?)
-        ON CONFLICT(scene) DO UPDATE SET
-            summary=excluded.summary,
-            updated_at=excluded.updated_at
-        """, (scene, summary, datetime.utcnow().isoformat()))
-        self.db.commit()
+        with self._write_lock:
+            self.db.execute("""
+            INSERT INTO mem_scenes (scene, summary, updated_at, last_cell_id, increments, summary_tokens)
+            VALUES (?,?,?,COALESCE(?, 0),COALESCE(?, 0),?)
+            ON CONFLICT(scene) DO UPDATE SET
+                summary=excluded.summary,
+                updated_at=excluded.updated_at,
+                summary_tokens=excluded.summary_tokens,
+                last_cell_id=COALESCE(?, last_cell_id),
+                increments=COALESCE(?, increments)
+            """, (
+                scene, summary, datetime.utcnow().isoformat(),
+                last_cell_id, increments, estimate_tokens(summary), last_cell_id, increments
+            ))
+            self.db.commit()
+
+        if self.context_cache:
+            self.context_cache.invalidate_scene(scene)
 
     def retrieve_scene_summary(self, scene: str) -> str:
         """
@@ -150,45 +1162,433 @@ class MemoryDB:
         row = self.get_scene(scene)
         return row["summary"] if row else ""
 
-    def retrieve_context(self, query: str, limit: int = 6) -> List[Dict]:
+    def retrieve_context(
+        self,
+        query: str,
+        limit: int = 6,
+        ranked: bool = True,
+        weights: Optional[Dict[str, float]] = None,
+        hybrid: Optional[bool] = None
+    ) -> List[Dict]:
         """
         Retrieve relevant memory cells using full-text search
 
         Args:
             query: Search query
             limit: Maximum number of results
+            ranked: Order matches by combined BM25 + salience + recency score.
+                    If False, returns matches in FTS order (legacy behaviour)
+            weights: Optional overrides for self.rank_weights
+            hybrid: Fuse vector similarity into the ranking. Defaults to True
+                    when a vector index is attached (ranked mode only)
 
         Returns:
             List of matching memory cells
         """
-        import re
-
-        # Tokenize query for FTS
-        tokens = re.findall(r"[a-zA-Z0-9]+", query)
-        if not tokens:
+        fts_query = _fts_query(query)
+        if not fts_query:
             return []
 
-        fts_query = " OR ".join(tokens)
+        with self._read() as conn:
+            if not ranked:
+                rows = conn.execute("""
+                SELECT mem_cells.id, mem_cells.scene, mem_cells.content, mem_cells.salience, mem_cells.cell_type
+                FROM mem_cells_fts
+                JOIN mem_cells ON mem_cells.id = mem_cells_fts.rowid
+                WHERE mem_cells_fts MATCH ? AND mem_cells.duplicate_of IS NULL
+                LIMIT ?
+                """, (fts_query, limit)).fetchall()
 
-        # Try full-text search first
-        rows = self.db.execute("""
-        SELECT mem_cells.scene, mem_cells.content, mem_cells.salience, mem_cells.cell_type
-        FROM mem_cells_fts
-        JOIN mem_cells ON mem_cells.id = mem_cells_fts.rowid
-        WHERE mem_cells_fts MATCH ?
-        LIMIT ?
-        """, (fts_query, limit)).fetchall()
+                if not rows:
+                    rows = conn.execute(TOP_SALIENCE_SQL, (limit,)).fetchall()
 
-        # Fallback to salience-based retrieval
-        if not rows:
-            rows = self.db.execute("""
-            SELECT scene, content, salience, cell_type
+                return [dict(row) for row in rows]
+
+            w = dict(self.rank_weights)
+            w.update(weights or {})
+
+            use_vectors = self.vector_index is not None and hybrid is not False
+            candidate_limit = limit * int(w["candidates"]) if use_vectors else limit
+
+            params = {
+                "w_bm25": w["bm25"],
+                "w_salience": w["salience"],
+                "w_recency": w["recency"],
+                "half_life": w["half_life_days"],
+                "query": fts_query,
+                "limit": candidate_limit
+            }
+
+            # bm25() is negative (lower = better) so it is negated. Recency uses a
+            # hyperbolic decay: 1.0 when new, 0.5 after half_life_days.
+            # ORDER BY ... LIMIT lets SQLite keep only the top-k rows in its sorter.
+            rows = [dict(row) for row in conn.execute("""
+            SELECT mem_cells.id, mem_cells.scene, mem_cells.content, mem_cells.salience, mem_cells.cell_type,
+                   mem_cells.tokens,
+                   (:w_bm25 * -bm25(mem_cells_fts)
+                    + :w_salience * mem_cells.salience
+                    + :w_recency / (1.0 + (julianday('now') - julianday(mem_cells.created_at)) / :half_life)
+                   ) AS score
+            FROM mem_cells_fts
+            JOIN mem_cells ON mem_cells.id = mem_cells_fts.rowid
+            WHERE mem_cells_fts MATCH :query AND mem_cells.duplicate_of IS NULL
+            ORDER BY score DESC
+            LIMIT :limit
+            """, params)]
+
+            if use_vectors:
+                rows = self._fuse_vector_scores(conn, query, rows, limit, candidate_limit, w["vector"], params)
+
+            # Fallback to salience + recency when nothing matches
+            if not rows:
+                rows = self._salience_fallback(conn, params, limit)
+
+            return rows
+
+    def retrieve_context_many(
+        self,
+        queries: List[str],
+        limit: int = 6,
+        weights: Optional[Dict[str, float]] = None,
+        hybrid: Optional[bool] = None
+    ) -> List[List[Dict]]:
+        """
+        Retrieve ranked memory cells for several queries
+
+        Runs retrieve_context for each distinct query on one reader connection.
+
+        Args:
+            queries: Search queries
+            limit: Maximum number of results per query
+            weights: Optional overrides for self.rank_weights
+            hybrid: Fuse vector similarity (see retrieve_context)
+
+        Returns:
+            One list of cells per query, in query order (same shape as retrieve_context)
+        """
+        results: Dict[str, List[Dict]] = {}
+
+        with self._read():
+            for query in queries:
+                if query not in results:
+                    results[query] = self.retrieve_context(query, limit, weights=weights, hybrid=hybrid)
+
+        return [[dict(cell) for cell in results[query]] for query in queries]
+
+    def _salience_fallback(self, conn: sqlite3.Connection, params: Dict, limit: int) -> List[Dict]:
+        """
+        Top cells by salience + recency, used when a query matches nothing
+
+        Only the top cells by salience are re-ranked (see _salience_fallback_sql),
+        so a recent cell with very low salience can be missed; in exchange the
+        fallback reads a few rows through idx_salience instead of the table.
+        """
+        return [dict(row) for row in conn.execute(SALIENCE_FALLBACK_SQL, dict(params, limit=limit))]
+
+    def _fuse_vector_scores(
+        self,
+        conn: sqlite3.Connection,
+        query: str,
+        lexical: List[Dict],
+        limit: int,
+        candidate_limit: int,
+        alpha: float,
+        params: Dict
+    ) -> List[Dict]:
+        """
+        Merge lexical candidates with vector-index hits and rescore
+
+        The fused score is alpha * cosine similarity + (1 - alpha) * lexical
+        score normalized by the best lexical score among the candidates.
+        Vector-only hits get a lexical score from salience and recency alone.
+        """
+        query_vector = self.vector_index.embed([query])[0]
+        candidates = {row["id"]: row for row in lexical}
+
+        similarities = dict(self.vector_index.search(query_vector, k=candidate_limit)[0])
+
+        missing = [cell_id for cell_id in similarities if cell_id not in candidates]
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            for row in conn.execute(f"""
+            SELECT id, scene, content, salience, cell_type, tokens,
+                   (? * salience
+                    + ? / (1.0 + (julianday('now') - julianday(created_at)) / ?)
+                   ) AS score
             FROM mem_cells
-            ORDER BY salience DESC
-            LIMIT ?
-            """, (limit,)).fetchall()
+            WHERE id IN ({placeholders}) AND duplicate_of IS NULL
+            """, [params["w_salience"], params["w_recency"], params["half_life"], *missing]):
+                candidates[row["id"]] = dict(row)
+
+        unscored = [cell_id for cell_id in candidates if cell_id not in similarities]
+        similarities.update(self.vector_index.similarity(query_vector, unscored))
+
+        best_lexical = max((row["score"] for row in candidates.values()), default=0.0) or 1.0
+
+        for cell_id, row in candidates.items():
+            row["score"] = (
+                alpha * similarities.get(cell_id, 0.0)
+                + (1.0 - alpha) * row["score"] / best_lexical
+            )
+
+        return sorted(candidates.values(), key=lambda row: row["score"], reverse=True)[:limit]
+
+    def retrieve_scene_context(
+        self,
+        query: str,
+        limit: int = 6,
+        weights: Optional[Dict[str, float]] = None,
+        hybrid: Optional[bool] = None
+    ) -> List[Dict]:
+        """
+        Retrieve the scene summaries for the cells matching a query
+
+        Matching cells and their scene summaries are resolved in one SQL
+        statement and scenes are ordered by the summed score of their matching
+        cells. Results are cached per normalized query until a referenced
+        scene is upserted (or the cache TTL passes).
+
+        Args:
+            query: Search query
+            limit: Maximum number of matching cells considered
+            weights: Optional overrides for self.rank_weights
+            hybrid: Fuse vector similarity (see retrieve_context)
+
+        Returns:
+            List of dicts with keys: scene, summary, summary_tokens, relevance, cells
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return []
+
+        use_vectors = self.vector_index is not None and hybrid is not False
+        key = (normalized, limit, tuple(sorted((weights or {}).items())), use_vectors)
+
+        if self.context_cache:
+            cached = self.context_cache.get(key)
+            if cached is not None:
+                return cached
+
+        if use_vectors:
+            scenes = self._scene_context_from_cells(self.retrieve_context(query, limit, weights=weights))
+        else:
+            scenes = self._scene_context_sql(normalized, limit, weights)
+
+        if self.context_cache:
+            self.context_cache.put(key, scenes, {row["scene"] for row in scenes})
+
+        return scenes
+
+    def _scene_context_sql(self, normalized: str, limit: int, weights: Optional[Dict[str, float]]) -> List[Dict]:
+        """Top cells, salience fallback and scene summaries in a single statement"""
+        w = dict(self.rank_weights)
+        w.update(weights or {})
+
+        with self._read() as conn:
+            rows = conn.execute(f"""
+            WITH matches AS (
+                SELECT mem_cells.scene AS scene,
+                       (:w_bm25 * -bm25(mem_cells_fts)
+                        + :w_salience * mem_cells.salience
+                        + :w_recency / (1.0 + (julianday('now') - julianday(mem_cells.created_at)) / :half_life)
+                       ) AS score
+                FROM mem_cells_fts
+                JOIN mem_cells ON mem_cells.id = mem_cells_fts.rowid
+                WHERE mem_cells_fts MATCH :query AND mem_cells.duplicate_of IS NULL
+                ORDER BY score DESC
+                LIMIT :limit
+            ),
+            -- Fallback size: 0 when anything matches (the EXISTS probe stops at the first hit)
+            fallback_limit AS (
+                SELECT CASE WHEN EXISTS (
+                    SELECT 1
+                    FROM mem_cells_fts
+                    JOIN mem_cells AS hit ON hit.id = mem_cells_fts.rowid
+                    WHERE mem_cells_fts MATCH :query AND hit.duplicate_of IS NULL
+                ) THEN 0 ELSE :limit END AS n
+            ),
+            candidates AS (
+                SELECT scene, score FROM matches
+                UNION ALL
+                SELECT scene, score FROM ({_salience_fallback_sql("scene", "(SELECT n FROM fallback_limit)")})
+            )
+            SELECT candidates.scene, mem_scenes.summary, mem_scenes.summary_tokens,
+                   SUM(candidates.score) AS relevance, COUNT(*) AS cells
+            FROM candidates
+            JOIN mem_scenes ON mem_scenes.scene = candidates.scene
+            WHERE mem_scenes.summary != ''
+            GROUP BY candidates.scene
+            ORDER BY relevance DESC
+            """, {
+                "w_bm25": w["bm25"],
+                "w_salience": w["salience"],
+                "w_recency": w["recency"],
+                "half_life": w["half_life_days"],
+                "query": _fts_query(normalized),
+                "limit": limit
+            }).fetchall()
+
+            return [dict(row) for row in rows]
+
+    def retrieve_scene_context_many(
+        self,
+        queries: List[str],
+        limit: int = 6,
+        weights: Optional[Dict[str, float]] = None,
+        hybrid: Optional[bool] = None
+    ) -> List[List[Dict]]:
+        """
+        Retrieve scene summaries for several queries at once
+
+        Cached queries are answered from the context cache. The rest go
+        through retrieve_context_many, and the summaries of every scene they
+        reference come from one lookup; repeated queries are resolved once.
+
+        Args:
+            queries: Search queries
+            limit: Maximum number of matching cells considered per query
+            weights: Optional overrides for self.rank_weights
+            hybrid: Fuse vector similarity (see retrieve_context)
+
+        Returns:
+            One list per query, shaped like retrieve_scene_context
+        """
+        use_vectors = self.vector_index is not None and hybrid is not False
+        weights_key = tuple(sorted((weights or {}).items()))
+        keys = [(normalize_query(query), limit, weights_key, use_vectors) for query in queries]
+
+        resolved: Dict[tuple, List[Dict]] = {}
+        pending: Dict[tuple, str] = {}
+
+        for key, query in zip(keys, queries):
+            if not key[0]:
+                resolved[key] = []
+            elif key not in resolved and key not in pending:
+                cached = self.context_cache.get(key) if self.context_cache else None
+                if cached is not None:
+                    resolved[key] = cached
+                else:
+                    pending[key] = query
+
+        if pending:
+            cells_per_query = self.retrieve_context_many(list(pending.values()), limit, weights=weights, hybrid=hybrid)
+            summaries = self._scene_summaries(
+                {cell["scene"] for cells in cells_per_query for cell in cells}
+            )
+
+            for key, cells in zip(pending, cells_per_query):
+                scenes = self._scene_context_from_cells(cells, summaries)
+                resolved[key] = scenes
+                if self.context_cache:
+                    self.context_cache.put(key, scenes, {row["scene"] for row in scenes})
+
+        return [[dict(row) for row in resolved[key]] for key in keys]
+
+    def _scene_summaries(self, scenes: Iterable[str]) -> Dict[str, sqlite3.Row]:
+        """Non-empty summaries (with token estimates) of the given scenes, in one query"""
+        scenes = list(scenes)
+        if not scenes:
+            return {}
+
+        placeholders = ",".join("?" * len(scenes))
+        with self._read() as conn:
+            return {
+                row["scene"]: row for row in conn.execute(
+                    f"SELECT scene, summary, summary_tokens FROM mem_scenes WHERE scene IN ({placeholders}) AND summary != ''",
+                    scenes
+                )
+            }
+
+    def _scene_context_from_cells(self, cells: List[Dict], summaries: Optional[Dict] = None) -> List[Dict]:
+        """Aggregate already-ranked cells by scene, fetching summaries in one query unless given"""
+        relevance: Dict[str, float] = {}
+        counts: Dict[str, int] = {}
+        for cell in cells:
+            relevance[cell["scene"]] = relevance.get(cell["scene"], 0.0) + cell.get("score", 0.0)
+            counts[cell["scene"]] = counts.get(cell["scene"], 0) + 1
+
+        if not relevance:
+            return []
+
+        if summaries is None:
+            summaries = self._scene_summaries(relevance)
+
+        scenes = [
+            {
+                "scene": scene,
+                "summary": summaries[scene]["summary"],
+                "summary_tokens": summaries[scene]["summary_tokens"],
+                "relevance": relevance[scene],
+                "cells": counts[scene]
+            }
+            for scene in relevance
+            if scene in summaries
+        ]
+        return sorted(scenes, key=lambda row: row["relevance"], reverse=True)
+
+    def enable_vector_index(self, embedder=None):
+        """
+        Attach the vector index stored next to this database, building it if empty
+
+        Cells inserted while no index was attached (ids above its last_id)
+        are embedded on attach.
+
+        Args:
+            embedder: Optional embedder (defaults to the offline HashingEmbedder)
+
+        Returns:
+            The attached VectorIndex
+        """
+        from vector_index import VectorIndex
+
+        with self._write_lock:
+            self.vector_index = VectorIndex.for_database(self.db_path, embedder)
+
+            if not len(self.vector_index):
+                self.rebuild_vector_index()
+            else:
+                self._backfill_vector_index()
+
+        return self.vector_index
+
+    def rebuild_vector_index(self, batch_size: int = 5000) -> int:
+        """
+        Re-embed every cell into the attached vector index
+
+        Args:
+            batch_size: Cells embedded per batch
+
+        Returns:
+            Number of cells indexed
+        """
+        if self.vector_index is None:
+            raise RuntimeError("No vector index attached; call enable_vector_index() first")
+
+        with self._write_lock:
+            self.vector_index.clear()
+            return self._backfill_vector_index(batch_size)
+
+    def _backfill_vector_index(self, batch_size: int = 5000) -> int:
+        """Embed cells newer than the vector index's last_id (write lock held)"""
+        indexed = 0
+        after_id = self.vector_index.last_id
 
-        return [dict(row) for row in rows]
+        while True:
+            rows = self.db.execute(
+                "SELECT id, content FROM mem_cells WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            after_id = rows[-1]["id"]
+
+            self.vector_index.add(
+                [row["id"] for row in rows],
+                [_cell_text(json.loads(row["content"])) for row in rows]
+            )
+            indexed += len(rows)
+
+        return indexed
 
     def get_all_scenes(self) -> List[Dict]:
         """
@@ -197,8 +1597,9 @@ class MemoryDB:
         Returns:
             List of scene dictionaries
         """
-        rows = self.db.execute("SELECT * FROM mem_scenes").fetchall()
-        return [dict(row) for row in rows]
+        with self._read() as conn:
+            rows = conn.execute("SELECT * FROM mem_scenes").fetchall()
+            return [dict(row) for row in rows]
 
     def get_cells_by_scene(self, scene: str, limit: int = 100) -> List[Dict]:
         """
@@ -211,14 +1612,87 @@ class MemoryDB:
         Returns:
             List of memory cells for the scene
         """
-        rows = self.db.execute("""
-        SELECT * FROM mem_cells
-        WHERE scene=?
-        ORDER BY salience DESC
-        LIMIT ?
-        """, (scene, limit)).fetchall()
+        with self._read() as conn:
+            rows = conn.execute(CELLS_BY_SCENE_SQL, (scene, limit)).fetchall()
+
+            return [dict(row) for row in rows]
 
-        return [dict(row) for row in rows]
+    def iter_scene_cells(self, scenes: Iterable[str], batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream every visible cell of some scenes, ready for insert_cells
+
+        Args:
+            scenes: Scene identifiers
+            batch_size: Cells read per query
+
+        Yields:
+            Dicts with keys: scene, cell_type, salience, content (decoded)
+        """
+        scenes = list(scenes)
+        if not scenes:
+            return
+
+        placeholders = ",".join("?" * len(scenes))
+        after_id = 0
+
+        while True:
+            # Keyset pagination: no long-lived read transaction
+            with self._read() as conn:
+                rows = conn.execute(f"""
+                SELECT id, scene, cell_type, salience, content FROM mem_cells
+                WHERE scene IN ({placeholders}) AND duplicate_of IS NULL AND id > ?
+                ORDER BY id
+                LIMIT ?
+                """, (*scenes, after_id, batch_size)).fetchall()
+
+            for row in rows:
+                yield {
+                    "scene": row["scene"],
+                    "cell_type": row["cell_type"],
+                    "salience": row["salience"],
+                    "content": json.loads(row["content"])
+                }
+
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1]["id"]
+
+    def get_cells_since(self, scene: str, after_id: int, limit: int = 100) -> List[Dict]:
+        """
+        Get cells added to a scene after a given cell id
+
+        Args:
+            scene: Scene identifier
+            after_id: Only cells with id greater than this are returned
+            limit: Maximum number of cells
+
+        Returns:
+            List of memory cells in insertion order
+        """
+        with self._read() as conn:
+            rows = conn.execute("""
+            SELECT * FROM mem_cells
+            WHERE scene=? AND id>? AND duplicate_of IS NULL
+            ORDER BY id
+            LIMIT ?
+            """, (scene, after_id, limit)).fetchall()
+
+            return [dict(row) for row in rows]
+
+    def get_scene_last_cell_id(self, scene: str) -> int:
+        """
+        Get the highest cell id in a scene
+
+        Args:
+            scene: Scene identifier
+
+        Returns:
+            Highest cell id, or 0 if the scene has no cells
+        """
+        with self._read() as conn:
+            row = conn.execute(SCENE_LAST_CELL_ID_SQL, (scene,)).fetchone()
+
+            return row[0]
 
     def search_by_type(self, cell_type: str, limit: int = 20) -> List[Dict]:
         """
@@ -231,62 +1705,273 @@ class MemoryDB:
         Returns:
             List of memory cells
         """
-        rows = self.db.execute("""
-        SELECT * FROM mem_cells
-        WHERE cell_type=?
-        ORDER BY salience DESC
-        LIMIT ?
-        """, (cell_type, limit)).fetchall()
+        with self._read() as conn:
+            rows = conn.execute(CELLS_BY_TYPE_SQL, (cell_type, limit)).fetchall()
 
-        return [dict(row) for row in rows]
+            return [dict(row) for row in rows]
 
     def get_statistics(self) -> Dict:
         """
-        Get database statistics
+        Get database statistics from the trigger-maintained counters
 
         Returns:
-            Dict with stats: total_cells, total_scenes, cells_by_type
+            Dict with stats: total_cells, total_scenes, cells_by_type,
+            cells_by_scene, content_bytes and, with stats_histograms enabled,
+            salience_histogram and inserts_by_day
         """
-        total_cells = self.db.execute("SELECT COUNT(*) FROM mem_cells").fetchone()[0]
-        total_scenes = self.db.execute("SELECT COUNT(*) FROM mem_scenes").fetchone()[0]
+        with self._read() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM mem_stats").fetchall())
 
         # Count cells by type
-        cells_by_type = {}
-        for cell_type in ["fact", "plan", "preference", "decision", "task", "risk"]:
-            count = self.db.execute(
-                "SELECT COUNT(*) FROM mem_cells WHERE cell_type=?",
-                (cell_type,)
-            ).fetchone()[0]
-            cells_by_type[cell_type] = count
-
-        return {
-            "total_cells": total_cells,
-            "total_scenes": total_scenes,
-            "cells_by_type": cells_by_type
+        cells_by_type = {
+            cell_type: counters.get(f"type:{cell_type}", 0)
+            for cell_type in ["fact", "plan", "preference", "decision", "task", "risk"]
+        }
+
+        stats = {
+            "total_cells": counters.get("cells", 0),
+            "total_scenes": counters.get("scenes", 0),
+            "cells_by_type": cells_by_type,
+            "cells_by_scene": {
+                name[len("scene:"):]: value
+                for name, value in counters.items()
+                if name.startswith("scene:") and value
+            },
+            "content_bytes": counters.get("content_bytes", 0)
         }
 
+        if self.stats_histograms:
+            stats["salience_histogram"] = {
+                f"{bucket / 10:.1f}-{(bucket + 1) / 10:.1f}": counters.get(f"salience:{bucket}", 0)
+                for bucket in range(10)
+            }
+            stats["inserts_by_day"] = {
+                name[len("day:"):]: value
+                for name, value in sorted(counters.items())
+                if name.startswith("day:")
+            }
+
+        return stats
+
+    def database_size(self) -> int:
+        """
+        Bytes used by the database (page_count * page_size, excluding the WAL)
+
+        Returns:
+            Size in bytes
+        """
+        with self._read() as conn:
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            return page_count * page_size
+
+    def optimize_fts(self, merge_pages: Optional[int] = None) -> None:
+        """
+        Merge FTS index segments
+
+        Args:
+            merge_pages: Run an incremental 'merge' of roughly this many pages.
+                         If None, run a full 'optimize' into a single segment.
+        """
+        with self.writer() as conn:
+            if merge_pages is None:
+                conn.execute("INSERT INTO mem_cells_fts (mem_cells_fts) VALUES ('optimize')")
+            else:
+                conn.execute(
+                    "INSERT INTO mem_cells_fts (mem_cells_fts, rank) VALUES ('merge', ?)",
+                    (merge_pages,)
+                )
+
+    def vacuum(self, incremental_pages: Optional[int] = None) -> None:
+        """
+        Return free pages to the filesystem
+
+        The first incremental call switches the database to
+        auto_vacuum=INCREMENTAL, which needs one full VACUUM.
+
+        Args:
+            incremental_pages: Free at most this many pages with incremental_vacuum
+                               (0 frees all). If None, run a full VACUUM.
+        """
+        with self._write_lock:
+            if incremental_pages is None:
+                self.db.execute("VACUUM")
+            else:
+                if self.db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    self.db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    self.db.execute("VACUUM")
+                self.db.execute(f"PRAGMA incremental_vacuum({int(incremental_pages)})").fetchall()
+
+            # Shrink the WAL back down after rewriting pages
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    def backup(
+        self,
+        dest_path: str,
+        pages_per_step: int = 1024,
+        step_sleep: float = 0.005,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict:
+        """
+        Copy the database to a file while writers keep going (online backup API)
+
+        The copy runs inside one read transaction, so it is a consistent
+        snapshot and commits made meanwhile do not restart it. Pages are
+        copied pages_per_step at a time with step_sleep seconds in between,
+        which keeps the I/O from starving writers.
+
+        Args:
+            dest_path: Backup file (overwritten)
+            pages_per_step: Pages copied per step (-1 copies everything in one step)
+            step_sleep: Seconds to pause between steps
+            progress: Optional callback (remaining_pages, total_pages) after each step
+
+        Returns:
+            Dict with pages, steps and seconds
+        """
+        started = time.monotonic()
+        steps = 0
+        total_pages = 0
+
+        def on_step(status: int, remaining: int, total: int) -> None:
+            nonlocal steps, total_pages
+            steps += 1
+            total_pages = total
+            if progress:
+                progress(remaining, total)
+            if remaining and step_sleep:
+                time.sleep(step_sleep)
+
+        tmp_path = dest_path + ".tmp"
+        source = self._connect()
+        source.isolation_level = None
+        dest = sqlite3.connect(tmp_path)
+        try:
+            # Pin one WAL snapshot for the whole copy
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM mem_cells LIMIT 1").fetchall()
+            source.backup(dest, pages=pages_per_step, progress=on_step)
+            source.execute("COMMIT")
+
+            # A standalone copy: no WAL file to carry around
+            dest.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dest.close()
+            source.close()
+
+        os.replace(tmp_path, dest_path)
+
+        return {"pages": total_pages, "steps": steps, "seconds": round(time.monotonic() - started, 3)}
+
+    # Public methods not timed by the profiler (generators, context managers, lifecycle)
+    UNPROFILED_METHODS = {"writer", "iter_scene_cells", "enable_profiling", "disable_profiling", "close"}
+
+    def enable_profiling(
+        self,
+        slow_ms: float = 100.0,
+        slow_log_path: Optional[str] = None,
+        explain: bool = False
+    ) -> QueryProfiler:
+        """
+        Time every public method and SQL statement of this instance
+
+        Until this is called, connections pass statements straight through
+        and methods are not wrapped, so profiling costs nothing when off.
+
+        Args:
+            slow_ms: Methods and statements at or above this many milliseconds go to the slow log
+            slow_log_path: Optional JSON-lines file the slow log is appended to
+            explain: Capture EXPLAIN QUERY PLAN for slow statements
+
+        Returns:
+            The attached QueryProfiler (see QueryProfiler.snapshot)
+        """
+        self.disable_profiling()
+        profiler = QueryProfiler(slow_ms=slow_ms, slow_log_path=slow_log_path, explain=explain)
+
+        for name, member in inspect.getmembers(type(self), inspect.isfunction):
+            if name.startswith("_") or name in self.UNPROFILED_METHODS:
+                continue
+            setattr(self, name, profiler.wrap_method(name, getattr(self, name)))
+
+        self._set_connection_profiler(profiler)
+        self.profiler = profiler
+        return profiler
+
+    def disable_profiling(self) -> None:
+        """Detach the profiler and unwrap methods"""
+        if self.profiler is None:
+            return
+
+        for name in list(vars(self)):
+            if getattr(vars(self)[name], "__wrapped__", None) is not None:
+                delattr(self, name)
+
+        self.profiler = None
+        self._set_connection_profiler(None)
+
+    def _set_connection_profiler(self, profiler: Optional[QueryProfiler]) -> None:
+        """Attach a profiler to the writer and every pooled reader"""
+        with self._readers_lock:
+            connections = [self.db] + list(self._all_readers)
+        for conn in connections:
+            conn.profiler = profiler
+
     def close(self):
-        """Close database connection"""
-        self.db.close()
+        """Close writer and reader connections"""
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+            self._readers = queue.Queue()
+
+        with self._write_lock:
+            self.db.close()
+
+
+def _cell_text(content) -> str:
+    """Plain text of a cell's content for embedding"""
+    return content if isinstance(content, str) else json.dumps(content)
 
 
 # Convenience function for quick database access
 _memory_db_instance = None
 
+# Every instance handed out by get_memory_db, by absolute path
+_memory_db_instances: Dict[str, MemoryDB] = {}
+_memory_db_lock = threading.Lock()
+
 
-def get_memory_db(db_path: Optional[str] = None) -> MemoryDB:
+def get_memory_db(db_path: Optional[str] = None, **db_options) -> MemoryDB:
     """
-    Get singleton instance of memory database
+    Get the shared memory database instance for a path
+
+    Each database file gets one instance per process. The first instance
+    created is also the default returned when no path is given.
 
     Args:
-        db_path: Database path
+        db_path: Database path (default: the default instance)
+        **db_options: MemoryDB options (e.g. dedup), used when the instance is created
 
     Returns:
         MemoryDB instance
     """
     global _memory_db_instance
 
-    if _memory_db_instance is None:
-        _memory_db_instance = MemoryDB(db_path)
+    with _memory_db_lock:
+        if db_path is None and _memory_db_instance is not None:
+            return _memory_db_instance
+
+        if _memory_db_instance is not None:
+            _memory_db_instances.setdefault(os.path.abspath(_memory_db_instance.db_path), _memory_db_instance)
+
+        if db_path is not None and os.path.abspath(db_path) in _memory_db_instances:
+            return _memory_db_instances[os.path.abspath(db_path)]
+
+        db = MemoryDB(db_path, **db_options)
+        _memory_db_instances[os.path.abspath(db.db_path)] = db
+
+        if _memory_db_instance is None:
+            _memory_db_instance = db
 
-    return _memory_db_instance
+        return db
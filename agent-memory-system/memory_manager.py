@@ -5,17 +5,37 @@ Handles extraction of memory cells from interactions and scene consolidation
 VERSION: 1.1 - Fixed scene consolidation to properly store summaries
 """
 
+import atexit
 import json
 import re
 import threading
-from typing import List, Dict, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, Tuple
 from memory_db import MemoryDB
+from consolidation_queue import ConsolidationQueue
+from llm_cache import LLMCache, provider_id
+from memory_classifier import RuleClassifier, get_classifier
+from token_budget import estimate_tokens, pack
 
 
 class MemoryManager:
     """Manages memory extraction, storage, and consolidation"""
 
-    def __init__(self, db: MemoryDB, llm_provider: Optional[Callable] = None):
+    def __init__(
+        self,
+        db: MemoryDB,
+        llm_provider: Optional[Callable] = None,
+        background_consolidation: bool = True,
+        debounce_seconds: float = 2.0,
+        consolidation_workers: int = 2,
+        incremental_consolidation: bool = True,
+        max_increments: int = 10,
+        max_incremental_cells: int = 100,
+        llm_cache=True,
+        llm_provider_id: Optional[str] = None,
+        classifier: Optional[RuleClassifier] = None,
+        dedup: Optional[str] = "default"
+    ):
         """
         Initialize memory manager
 
@@ -23,11 +43,61 @@ class MemoryManager:
             db: MemoryDB instance
             llm_provider: Optional LLM function with signature: (prompt: str, temperature: float, max_tokens: int) -> str
                           If not provided, uses simple rule-based extraction
+            background_consolidation: Consolidate touched scenes on worker threads
+                                      instead of inside update()
+            debounce_seconds: Quiet period before a touched scene is consolidated
+            consolidation_workers: Number of background consolidation threads
+            incremental_consolidation: Fold only new cells into an existing scene summary
+            max_increments: Incremental updates before a scene is fully re-summarised
+            max_incremental_cells: New cells one incremental update folds in; a scene
+                                   with more is fully re-summarised instead
+            llm_cache: Cache LLM responses next to the database (True), in the given
+                       LLMCache, or not at all (False/None)
+            llm_provider_id: Identifies the provider/model in cache keys
+                             (default: see llm_cache.provider_id; providers without
+                             a stable id are only cached in memory)
+            classifier: Rule-based extraction classifier (default: "interaction"
+                        profile of memory_rules.json)
+            dedup: Duplicate policy for extracted cells (see MemoryDB.insert_cells);
+                   "default" uses the database's policy
         """
         self.db = db
+        self.dedup = dedup
         self.llm_provider = llm_provider
+        self.classifier = classifier or get_classifier("interaction")
+
+        # Persistent LLM response cache (only used with an LLM provider)
+        self.llm_cache = None
+        self.llm_provider_id = llm_provider_id or (provider_id(llm_provider) if llm_provider else None)
+        if llm_provider and llm_cache:
+            if self.llm_provider_id is None:
+                # Entries of an unnamed provider could never be hit by a later run, and
+                # would evict ones that can; keep them in memory for this manager only
+                print(
+                    "⚠️ LLM provider has no stable id (lambda or local function); its responses "
+                    "are cached in memory only. Set its provider_id or pass llm_provider_id."
+                )
+                self.llm_provider_id = "anonymous"
+                self.llm_cache = LLMCache(":memory:")
+            elif isinstance(llm_cache, LLMCache):
+                self.llm_cache = llm_cache
+            else:
+                self.llm_cache = LLMCache.for_database(db.db_path)
+        self.incremental_consolidation = incremental_consolidation
+        self.max_increments = max_increments
+        self.max_incremental_cells = max_incremental_cells
         self._lock = threading.Lock()  # Thread-safe updates
 
+        # Background scene consolidation (None = consolidate synchronously)
+        self.consolidation_queue = None
+        if background_consolidation:
+            self.consolidation_queue = ConsolidationQueue(
+                self.consolidate_scene,
+                debounce_seconds=debounce_seconds,
+                workers=consolidation_workers
+            )
+            atexit.register(self.consolidation_queue.close)
+
         # Extraction prompt template
         self.extraction_prompt = """
 Convert this interaction into structured memory cells.
@@ -42,6 +112,24 @@ User: {user}
 Assistant: {assistant}
 
 Remember: Return ONLY the JSON array, nothing else.
+"""
+
+        # Batch extraction prompt template (several interactions per call)
+        self.batch_extraction_prompt = """
+Convert each of these interactions into structured memory cells.
+
+Return ONLY a JSON array with one object per interaction:
+{{"id": "<interaction id>", "cells": [<memory cells>]}}
+
+Each memory cell is an object containing:
+- scene: Topic identifier (e.g., "week-5-cron", "user-preferences")
+- cell_type: One of [fact, plan, preference, decision, task, risk]
+- salience: Float 0-1 (higher = more important, 0.9+ = critical)
+- content: Compressed, factual representation (max 50 words)
+
+{interactions}
+
+Remember: Return ONLY the JSON array, with an entry for every interaction id, nothing else.
 """
 
         # Consolidation prompt template
@@ -57,6 +145,21 @@ Focus on:
 - Key facts and decisions
 - Important plans and tasks
 - Critical preferences and risks
+"""
+
+        # Incremental consolidation prompt template
+        self.incremental_consolidation_prompt = """
+Update this scene summary with the new memory cells (keep it under 100 words).
+
+Scene: {scene}
+
+Current summary:
+{summary}
+
+New cells:
+{cells}
+
+Keep existing facts unless the new cells supersede them.
 """
 
     def extract_cells(self, user: str, assistant: str) -> List[Dict]:
@@ -84,59 +187,150 @@ Focus on:
             assistant=assistant
         )
 
-        try:
-            raw_result = self.llm_provider(prompt, temperature=0.1, max_tokens=500)
-
+        def parse(raw_result: str) -> List[Dict]:
             # Clean markdown code blocks
             raw_result = re.sub(r"```json|```", "", raw_result).strip()
 
             cells = json.loads(raw_result)
             return cells if isinstance(cells, list) else []
 
+        try:
+            return self._call_llm(prompt, temperature=0.1, max_tokens=500, parse=parse)
+
         except Exception as e:
             # Fallback to rule-based if LLM fails
             print(f"LLM extraction failed: {e}, using rule-based approach")
             return self._extract_rules(user, assistant)
 
+    def extract_cells_many(
+        self,
+        interactions: List[Tuple[str, str]],
+        max_prompt_tokens: int = 3000,
+        max_batch_size: int = 20,
+        max_response_tokens: int = 4000,
+        max_concurrency: int = 4
+    ) -> List[List[Dict]]:
+        """
+        Extract memory cells from many interactions with batched LLM prompts
+
+        Interactions are packed into prompts of up to max_prompt_tokens
+        (estimated) and the LLM returns one keyed entry per interaction.
+        Entries that are missing or malformed fall back to per-interaction
+        extraction. Batches run on up to max_concurrency threads, so the LLM
+        provider must be thread-safe.
+
+        Args:
+            interactions: List of (user, assistant) pairs
+            max_prompt_tokens: Token budget for one batch prompt
+            max_batch_size: Maximum interactions per prompt
+            max_response_tokens: Upper bound on max_tokens requested per batch
+            max_concurrency: Batches in flight at once
+
+        Returns:
+            List of memory cell lists, one per interaction, in input order
+        """
+        if not self.llm_provider:
+            return [self._extract_rules(user, assistant) for user, assistant in interactions]
+
+        batches = self._pack_interactions(interactions, max_prompt_tokens, max_batch_size)
+        results: List[List[Dict]] = [[] for _ in interactions]
+
+        def run(batch: List[int]) -> None:
+            if len(batch) == 1:
+                results[batch[0]] = self._extract_with_llm(*interactions[batch[0]])
+                return
+
+            extracted = self._extract_batch_with_llm(
+                {str(i): interactions[i] for i in batch},
+                min(500 * len(batch), max_response_tokens)
+            )
+            for i in batch:
+                cells = extracted.get(str(i))
+                results[i] = cells if cells is not None else self._extract_with_llm(*interactions[i])
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            list(executor.map(run, batches))
+
+        return results
+
+    def _pack_interactions(
+        self,
+        interactions: List[Tuple[str, str]],
+        max_prompt_tokens: int,
+        max_batch_size: int
+    ) -> List[List[int]]:
+        """Group interaction indexes into batches that fit the prompt budget"""
+        budget = max_prompt_tokens - estimate_tokens(self.batch_extraction_prompt)
+
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        used = 0
+
+        for i, (user, assistant) in enumerate(interactions):
+            cost = estimate_tokens(self._format_interaction(str(i), user, assistant))
+            if batch and (used + cost > budget or len(batch) >= max_batch_size):
+                batches.append(batch)
+                batch, used = [], 0
+            batch.append(i)
+            used += cost
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _format_interaction(self, key: str, user: str, assistant: str) -> str:
+        """One interaction block of the batch extraction prompt"""
+        return f"[id: {key}]\nUser: {user}\nAssistant: {assistant}\n"
+
+    def _extract_batch_with_llm(self, interactions: Dict[str, Tuple[str, str]], max_tokens: int) -> Dict[str, List[Dict]]:
+        """
+        Extract cells for several interactions with one LLM call
+
+        Returns only the interactions whose entry passed validation; the
+        caller extracts the rest one by one.
+        """
+        prompt = self.batch_extraction_prompt.format(
+            interactions="\n".join(
+                self._format_interaction(key, user, assistant)
+                for key, (user, assistant) in interactions.items()
+            )
+        )
+
+        def parse(raw_result: str) -> Dict[str, List[Dict]]:
+            # Clean markdown code blocks
+            raw_result = re.sub(r"```json|```", "", raw_result).strip()
+
+            entries = json.loads(raw_result)
+            if not isinstance(entries, list):
+                raise ValueError("batch extraction did not return a JSON array")
+
+            extracted = {}
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    continue
+                key = str(entry.get("id"))
+                cells = entry.get("cells")
+                if key in interactions and isinstance(cells, list) and all(map(_valid_cell, cells)):
+                    extracted[key] = cells
+
+            if not extracted:
+                raise ValueError("batch extraction returned no usable entries")
+
+            return extracted
+
+        try:
+            return self._call_llm(prompt, temperature=0.1, max_tokens=max_tokens, parse=parse)
+        except Exception as e:
+            print(f"LLM batch extraction failed: {e}, extracting {len(interactions)} interactions one by one")
+            return {}
+
     def _extract_rules(self, user: str, assistant: str) -> List[Dict]:
         """Rule-based extraction (simple fallback)"""
         cells = []
 
-        # Detect scene/topics from interaction
-        text = f"{user} {assistant}".lower()
-
-        scene = "general"
-
-        if "week" in text and ("5" in text or "week 5" in text):
-            scene = "week-5-tasks"
-        elif "user" in text and "prefer" in text:
-            scene = "user-preferences"
-        elif "task" in text or "todo" in text:
-            scene = "tasks"
-        elif "agent" in text:
-            scene = "agent-army"
-        elif "cron" in text:
-            scene = "automation"
-
-        # Detect cell types
-        cell_type = "fact"
-        salience = 0.7
-
-        if "plan" in text or "will" in text or "going to" in text:
-            cell_type = "plan"
-            salience = 0.8
-        elif "prefer" in text or "like" in text or "want" in text:
-            cell_type = "preference"
-            salience = 0.85
-        elif "decide" in text or "choose" in text or "select" in text:
-            cell_type = "decision"
-            salience = 0.9
-        elif "task" in text or "do" in text:
-            cell_type = "task"
-            salience = 0.8
-        elif "risk" in text or "limitation" in text or "concern" in text:
-            cell_type = "risk"
-            salience = 0.75
+        # Detect scene and cell type in one pass over the interaction
+        scene, cell_type, salience = self.classifier.classify(f"{user} {assistant}")
 
         # Compress content
         content = self._compress_content(f"{user} {assistant}")
@@ -160,29 +354,50 @@ Focus on:
         # Simple truncation for now (could use LLM for better compression)
         return " ".join(words[:max_words]) + "..."
 
-    def consolidate_scene(self, scene: str) -> Optional[str]:
+    def consolidate_scene(self, scene: str, incremental: Optional[bool] = None) -> Optional[str]:
         """
-        Consolidate all cells in a scene into a summary (FIXED VERSION - stores summary)
+        Consolidate cells in a scene into a summary
+
+        Incremental mode folds only cells newer than the scene's high-water mark
+        (mem_scenes.last_cell_id) into the stored summary. A full rebuild runs
+        for new scenes, after max_increments incremental updates and when more
+        than max_incremental_cells new cells are waiting.
 
         Args:
             scene: Scene identifier
+            incremental: Override self.incremental_consolidation
 
         Returns:
             Consolidated summary or None
         """
+        if incremental is None:
+            incremental = self.incremental_consolidation
+
+        existing = self.db.get_scene(scene) if incremental else None
+
+        # Scenes consolidated before high-water marks existed have last_cell_id=0
+        if (
+            existing
+            and existing["summary"]
+            and existing["last_cell_id"]
+            and existing["increments"] < self.max_increments
+        ):
+            return self._consolidate_incremental(scene, existing)
+
+        return self._consolidate_full(scene)
+
+    def _consolidate_full(self, scene: str) -> Optional[str]:
+        """Re-summarise a scene from its top cells"""
+        # Read the high-water mark first so cells inserted meanwhile are folded in later
+        last_cell_id = self.db.get_scene_last_cell_id(scene)
+
         # Get all cells for scene
         cells = self.db.get_cells_by_scene(scene)
 
         if not cells:
             return None
 
-        # Unpack content
-        cell_contents = []
-        for cell in cells:
-            content_json = json.loads(cell["content"])
-            cell_contents.append(
-                f"{cell_type_to_emoji(cell['cell_type'])} (salience={cell['salience']}) {content_json}"
-            )
+        cell_contents = self._format_cells(cells)
 
         # Generate summary
         if self.llm_provider:
@@ -194,10 +409,52 @@ Focus on:
 
         # Store summary in database
         if summary:
-            self.db.upsert_scene(scene, summary)
+            self.db.upsert_scene(scene, summary, last_cell_id=last_cell_id, increments=0)
+
+        return summary
+
+    def _consolidate_incremental(self, scene: str, existing: Dict) -> str:
+        """Fold cells newer than the scene's high-water mark into its summary"""
+        cells = self.db.get_cells_since(
+            scene, existing["last_cell_id"], limit=self.max_incremental_cells + 1
+        )
+
+        if not cells:
+            return existing["summary"]
+
+        # Too many to fold in at once: advancing the mark past a partial batch
+        # would drop the rest, so re-summarise from the top cells instead
+        if len(cells) > self.max_incremental_cells:
+            return self._consolidate_full(scene)
+
+        cell_contents = self._format_cells(cells)
+
+        if self.llm_provider:
+            summary = self._consolidate_incremental_with_llm(scene, existing["summary"], cell_contents)
+        else:
+            # Newest cells first so they survive truncation
+            summary = self._consolidate_simple(cell_contents[::-1] + [existing["summary"]])
+
+        if summary:
+            self.db.upsert_scene(
+                scene,
+                summary,
+                last_cell_id=cells[-1]["id"],
+                increments=existing["increments"] + 1
+            )
 
         return summary
 
+    def _format_cells(self, cells: List[Dict]) -> List[str]:
+        """Unpack cell content into summary lines"""
+        cell_contents = []
+        for cell in cells:
+            content_json = json.loads(cell["content"])
+            cell_contents.append(
+                f"{cell_type_to_emoji(cell['cell_type'])} (salience={cell['salience']}) {content_json}"
+            )
+        return cell_contents
+
     def _consolidate_with_llm(self, scene: str, cells: List[str]) -> str:
         """Consolidate scene using LLM"""
         prompt = self.consolidation_prompt.format(
@@ -206,11 +463,41 @@ Focus on:
         )
 
         try:
-            return self.llm_provider(prompt, temperature=0.05, max_tokens=200)
+            return self._call_llm(prompt, temperature=0.05, max_tokens=200)
         except Exception as e:
             print(f"LLM consolidation failed: {e}, using simple approach")
             return self._consolidate_simple(cells)
 
+    def _consolidate_incremental_with_llm(self, scene: str, summary: str, cells: List[str]) -> str:
+        """Fold new cells into an existing summary using LLM"""
+        prompt = self.incremental_consolidation_prompt.format(
+            scene=scene,
+            summary=summary,
+            cells="\n".join(cells)
+        )
+
+        try:
+            return self._call_llm(prompt, temperature=0.05, max_tokens=200)
+        except Exception as e:
+            print(f"LLM incremental consolidation failed: {e}, using simple approach")
+            return self._consolidate_simple(cells[::-1] + [summary])
+
+    def _call_llm(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        parse: Optional[Callable[[str], object]] = None
+    ):
+        """Call the LLM provider, answering repeated prompts from the response cache"""
+        if self.llm_cache is None:
+            response = self.llm_provider(prompt, temperature=temperature, max_tokens=max_tokens)
+            return parse(response) if parse else response
+
+        return self.llm_cache.call(
+            self.llm_provider, self.llm_provider_id, prompt, temperature, max_tokens, parse=parse
+        )
+
     def _consolidate_simple(self, cells: List[str]) -> str:
         """Simple consolidation by concatenation"""
         return " | ".join(cells)[:200]
@@ -229,45 +516,183 @@ Focus on:
         with self._lock:  # Thread-safe
             cells = self.extract_cells(user, assistant)
 
-            inserted_ids = []
+            # Insert all cells in a single transaction
+            inserted_ids = self.db.insert_cells(cells, batch_size=max(len(cells), 1), dedup=self.dedup)
 
-            for cell in cells:
-                # Insert cell
-                cell_id = self.db.insert_cell(cell)
-                inserted_ids.append(cell_id)
+        # Consolidate scenes outside the lock
+        scenes = set(c["scene"] for c in cells)
+        for scene in scenes:
+            if self.consolidation_queue:
+                self.consolidation_queue.mark_dirty(scene)
+            else:
+                self.consolidate_scene(scene)
+
+        return inserted_ids
+
+    def update_many(self, interactions: List[Tuple[str, str]], **batch_options) -> List[int]:
+        """
+        Update memory with many interactions (e.g. a transcript backfill)
+
+        Args:
+            interactions: List of (user, assistant) pairs
+            **batch_options: Passed to extract_cells_many
+
+        Returns:
+            List of inserted cell IDs
+        """
+        # LLM calls run outside the lock; only the insert is serialized
+        extracted = self.extract_cells_many(interactions, **batch_options)
+        cells = [cell for interaction_cells in extracted for cell in interaction_cells]
 
-            # Consolidate scenes
-            scenes = set(c["scene"] for c in cells)
-            for scene in scenes:
+        # One transaction for the whole call, so a failed call (e.g. retried by
+        # the update queue) has inserted nothing
+        with self._lock:
+            inserted_ids = self.db.insert_cells(cells, batch_size=max(len(cells), 1), dedup=self.dedup)
+
+        scenes = set(c["scene"] for c in cells)
+        for scene in scenes:
+            if self.consolidation_queue:
+                self.consolidation_queue.mark_dirty(scene)
+            else:
                 self.consolidate_scene(scene)
 
-            return inserted_ids
+        return inserted_ids
 
-    def retrieve_context_for_query(self, query: str, limit: int = 6) -> str:
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for pending background consolidations to finish
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if nothing is left pending
+        """
+        if not self.consolidation_queue:
+            return True
+        return self.consolidation_queue.flush(timeout)
+
+    def close(self) -> None:
+        """Drain pending consolidations and stop background workers"""
+        if self.consolidation_queue:
+            self.consolidation_queue.close()
+            atexit.unregister(self.consolidation_queue.close)
+
+        if self.llm_cache:
+            self.llm_cache.close()
+
+    def retrieve_context_for_query(self, query: str, limit: int = 6, max_tokens: Optional[int] = None) -> str:
         """
         Retrieve relevant context for a query
 
         Args:
             query: User query
             limit: Maximum number of cells
+            max_tokens: Optional token budget for the returned context (see _pack_context)
 
         Returns:
             Formatted context string
         """
-        cells = self.db.retrieve_context(query, limit)
-
-        # Group by scene
-        scenes = set(c["scene"] for c in cells)
+        scenes = self.db.retrieve_scene_context(query, limit)
 
-        summaries = []
+        if max_tokens is not None:
+            return self._pack_context(scenes, self.db.retrieve_context(query, limit), max_tokens)
 
-        for scene in scenes:
-            summary = self.db.retrieve_scene_summary(scene)
-            if summary:
-                summaries.append(f"[Scene: {scene}]\n{summary}")
+        summaries = [f"[Scene: {row['scene']}]\n{row['summary']}" for row in scenes]
 
         return "\n\n".join(summaries)
 
+    def retrieve_context_for_queries(
+        self,
+        queries: List[str],
+        limit: int = 6,
+        max_tokens: Optional[int] = None
+    ) -> List[str]:
+        """
+        Retrieve context for several queries in one database pass
+
+        Args:
+            queries: User queries
+            limit: Maximum number of cells per query
+            max_tokens: Optional token budget per query (see _pack_context)
+
+        Returns:
+            Formatted context string per query, in query order
+        """
+        scenes_per_query = self.db.retrieve_scene_context_many(queries, limit)
+
+        if max_tokens is not None:
+            cells_per_query = self.db.retrieve_context_many(queries, limit)
+            return [
+                self._pack_context(scenes, cells, max_tokens)
+                for scenes, cells in zip(scenes_per_query, cells_per_query)
+            ]
+
+        return [
+            "\n\n".join(f"[Scene: {row['scene']}]\n{row['summary']}" for row in scenes)
+            for scenes in scenes_per_query
+        ]
+
+    def _pack_context(self, scenes: List[Dict], cells: List[Dict], max_tokens: int) -> str:
+        """
+        Pack scene summaries, then individual cells, into a token budget
+
+        Summaries are chosen first by relevance per token using the estimates
+        stored at write time. Budget left over is filled with the matching
+        cells of scenes whose summary did not fit, by score per token.
+        """
+        def header_tokens(scene: str) -> int:
+            return estimate_tokens(f"[Scene: {scene}]")
+
+        packed_scenes = pack(
+            scenes,
+            max_tokens,
+            value=lambda row: row["relevance"],
+            cost=lambda row: header_tokens(row["scene"]) + (row["summary_tokens"] or estimate_tokens(row["summary"]))
+        )
+
+        remaining = max_tokens - sum(
+            header_tokens(row["scene"]) + (row["summary_tokens"] or estimate_tokens(row["summary"]))
+            for row in packed_scenes
+        )
+
+        covered = {row["scene"] for row in packed_scenes}
+        cells = [cell for cell in cells if cell["scene"] not in covered]
+
+        # Each cell is charged its scene header, which keeps the estimate an upper bound
+        packed_cells = pack(
+            cells,
+            remaining,
+            value=lambda cell: cell["score"],
+            cost=lambda cell: header_tokens(cell["scene"]) + 1 + (
+                cell["tokens"] or estimate_tokens(str(json.loads(cell["content"])))
+            )
+        )
+
+        sections = [f"[Scene: {row['scene']}]\n{row['summary']}" for row in packed_scenes]
+
+        cells_by_scene: Dict[str, List[str]] = {}
+        for cell in packed_cells:
+            cells_by_scene.setdefault(cell["scene"], []).append(f"- {json.loads(cell['content'])}")
+
+        sections.extend(
+            f"[Scene: {scene}]\n" + "\n".join(lines)
+            for scene, lines in cells_by_scene.items()
+        )
+
+        return "\n\n".join(sections)
+
+
+def _valid_cell(cell) -> bool:
+    """Check an LLM-extracted cell has the fields insert_cells needs"""
+    return (
+        isinstance(cell, dict)
+        and isinstance(cell.get("scene"), str) and bool(cell["scene"])
+        and cell.get("cell_type") in ("fact", "plan", "preference", "decision", "task", "risk")
+        and isinstance(cell.get("salience"), (int, float))
+        and "content" in cell
+    )
+
 
 def cell_type_to_emoji(cell_type: str) -> str:
     """Convert cell type to emoji for display"""
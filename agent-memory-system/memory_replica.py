@@ -0,0 +1,294 @@
+"""
+Memory Replica Module for Self-Organizing Agent Memory System
+Hot backups and a periodically refreshed read-only replica of the memory database
+
+MemoryDB.backup copies the live database with SQLite's online backup API
+while writers keep committing. ReadReplica uses it to keep a snapshot next
+to the primary (agent_memory_replica.db by default) and serves reads from
+it through immutable, read-only connections: no locks, no WAL lookups and a
+large mmap. Listing every scene or feeding a dashboard then never competes
+with the writer; the price is that the replica is up to refresh_interval
+seconds stale.
+
+Usage:
+    python memory_replica.py backup /backups/agent_memory-2026-03-01.db [--db agent_memory.db]
+    python memory_replica.py replica --every 300 [--db agent_memory.db]
+"""
+
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from context_cache import ContextCache
+from memory_db import MemoryDB
+from query_profiler import ProfiledConnection
+
+
+class ReadOnlyMemoryDB(MemoryDB):
+    """
+    MemoryDB over an immutable snapshot file
+
+    Every read method of MemoryDB works unchanged; writes fail with
+    sqlite3.OperationalError (attempt to write a readonly database).
+    reopen() switches all connections to a newly replaced snapshot file.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        rank_weights: Optional[Dict[str, float]] = None,
+        reader_pool_size: int = 4,
+        mmap_size: int = 1024 * 1024 * 1024,
+        context_cache_size: int = 512,
+        context_cache_ttl: float = 60.0
+    ):
+        """
+        Initialize read-only database
+
+        Args:
+            db_path: Snapshot file (written by MemoryDB.backup)
+            rank_weights: Optional overrides for DEFAULT_RANK_WEIGHTS
+            reader_pool_size: Maximum number of concurrent reader connections
+            mmap_size: Bytes of the snapshot to memory-map per connection
+            context_cache_size: Entries kept by the retrieve_scene_context cache (0 disables)
+            context_cache_ttl: Seconds a cached scene context stays valid
+        """
+        self.rank_weights = dict(self.DEFAULT_RANK_WEIGHTS)
+        self.rank_weights.update(rank_weights or {})
+
+        self.db_path = db_path
+        self.vector_index = None
+        self.dedup = None
+        self.dedup_threshold = 0.0
+        self.context_cache = (
+            ContextCache(context_cache_size, context_cache_ttl) if context_cache_size else None
+        )
+        self.busy_timeout_ms = 0
+        self.mmap_size = mmap_size
+        self.profiler = None
+
+        # Connections opened before the latest reopen() are retired on checkout
+        self.generation = 0
+        self._generations: Dict[sqlite3.Connection, int] = {}
+
+        self._write_lock = threading.RLock()
+        self.db = self._connect()
+        self.stats_histograms = self._has_histograms()
+
+        self.reader_pool_size = reader_pool_size
+        self._readers = queue.Queue()
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open an immutable read-only connection to the snapshot"""
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=ProfiledConnection)
+        conn.row_factory = sqlite3.Row
+        conn.profiler = self.profiler
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        self._generations[conn] = self.generation
+        return conn
+
+    def _has_histograms(self) -> bool:
+        """Whether the primary maintained salience/day histograms"""
+        return self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='mem_stats_hist_ai'"
+        ).fetchone() is not None
+
+    def _checkout_reader(self) -> sqlite3.Connection:
+        """Like MemoryDB._checkout_reader, closing readers of an older snapshot"""
+        while True:
+            conn = super()._checkout_reader()
+            if self._generations.get(conn) == self.generation:
+                return conn
+
+            with self._readers_lock:
+                if conn in self._all_readers:
+                    self._all_readers.remove(conn)
+                self._generations.pop(conn, None)
+            conn.close()
+
+    def reopen(self) -> None:
+        """Switch to the current snapshot file (after it was replaced)"""
+        with self._write_lock:
+            self.generation += 1
+            old = self.db
+            self.db = self._connect()
+            self._generations.pop(old, None)
+            old.close()
+            self.stats_histograms = self._has_histograms()
+
+        if self.context_cache:
+            self.context_cache.clear()
+
+    def close(self):
+        """Close all connections"""
+        super().close()
+        self._generations.clear()
+
+
+class ReadReplica:
+    """
+    Read-only replica of a MemoryDB, refreshed by hot backup
+
+    Usage:
+        replica = ReadReplica(db, refresh_interval=300)
+        replica.start()
+        scenes = replica.db.get_all_scenes()
+    """
+
+    def __init__(
+        self,
+        db: MemoryDB,
+        replica_path: Optional[str] = None,
+        refresh_interval: float = 300.0,
+        pages_per_step: int = 1024,
+        step_sleep: float = 0.005,
+        mmap_size: int = 1024 * 1024 * 1024
+    ):
+        """
+        Initialize replica (takes a first snapshot if none exists yet)
+
+        Args:
+            db: Primary database
+            replica_path: Snapshot file (default: <db>_replica.db next to the primary)
+            refresh_interval: Seconds between refreshes once start() is called
+            pages_per_step: Pages copied per backup step
+            step_sleep: Seconds to pause between backup steps
+            mmap_size: Bytes of the snapshot to memory-map per connection
+        """
+        if replica_path is None:
+            root, ext = os.path.splitext(db.db_path)
+            replica_path = f"{root}_replica{ext or '.db'}"
+
+        self.primary = db
+        self.replica_path = replica_path
+        self.refresh_interval = refresh_interval
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.last_refresh: Optional[Dict] = None
+        self.refreshed_at: Optional[float] = None
+
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if not os.path.exists(replica_path):
+            self._snapshot()
+        else:
+            self.refreshed_at = os.path.getmtime(replica_path)
+
+        self.db = ReadOnlyMemoryDB(
+            replica_path,
+            rank_weights=db.rank_weights,
+            reader_pool_size=db.reader_pool_size,
+            mmap_size=mmap_size
+        )
+
+    def _snapshot(self) -> Dict:
+        """Back up the primary over the replica file"""
+        report = self.primary.backup(
+            self.replica_path,
+            pages_per_step=self.pages_per_step,
+            step_sleep=self.step_sleep
+        )
+        self.last_refresh = report
+        self.refreshed_at = time.time()
+        return report
+
+    def refresh(self) -> Dict:
+        """
+        Take a new snapshot and switch readers to it
+
+        Returns:
+            Backup report: pages, steps and seconds
+        """
+        with self._refresh_lock:
+            report = self._snapshot()
+            self.db.reopen()
+            return report
+
+    def age(self) -> Optional[float]:
+        """Seconds since the snapshot was taken"""
+        return None if self.refreshed_at is None else time.time() - self.refreshed_at
+
+    def start(self) -> None:
+        """Refresh every refresh_interval seconds in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop refreshing
+
+        Args:
+            timeout: Maximum seconds to wait for a running refresh to finish
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        """Background refresh loop"""
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                print(f"⚠️ Replica refresh failed: {e}")
+
+    def close(self) -> None:
+        """Stop refreshing and close replica connections"""
+        self.stop()
+        self.db.close()
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Hot backup or read replica of the agent memory database")
+    parser.add_argument("command", choices=["backup", "replica"])
+    parser.add_argument("dest", nargs="?", help="Backup file (backup) or replica file (replica)")
+    parser.add_argument("--db", help="Path to agent_memory.db (default: next to this script)")
+    parser.add_argument("--pages", type=int, default=1024, help="Pages copied per step")
+    parser.add_argument("--sleep", type=float, default=0.005, help="Seconds to pause between steps")
+    parser.add_argument("--every", type=float, help="Keep refreshing the replica every N seconds (replica)")
+    args = parser.parse_args(argv)
+
+    db = MemoryDB(args.db)
+
+    if args.command == "backup":
+        if not args.dest:
+            parser.error("backup needs a destination file")
+        report = db.backup(args.dest, pages_per_step=args.pages, step_sleep=args.sleep)
+        print(f"💾 Backed up {report['pages']} pages to {args.dest} in {report['seconds']}s ({report['steps']} steps)")
+    else:
+        replica = ReadReplica(db, args.dest, pages_per_step=args.pages, step_sleep=args.sleep)
+        report = replica.refresh()
+        print(f"🪞 Replica {replica.replica_path} refreshed in {report['seconds']}s")
+
+        if args.every:
+            try:
+                while True:
+                    time.sleep(args.every)
+                    report = replica.refresh()
+                    print(f"🪞 Replica refreshed in {report['seconds']}s")
+            except KeyboardInterrupt:
+                pass
+
+        replica.close()
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Memory Shards Module for Self-Organizing Agent Memory System
+One SQLite database per agent (or scene namespace) behind a routing layer
+
+Each shard is an ordinary memory database with its own file and write
+lock, so agents never contend for writes. Shared scenes hold global
+knowledge: a write to one is replicated to every shard, so an agent's
+retrieval stays a single-shard query. Cross-agent queries fan out to the
+shards in parallel and merge the ranked results.
+
+The shard layout lives in <base_dir>/shards.json:
+
+    {
+      "shards": {"researcher": "/fast-disk/researcher.db"},
+      "shared_scenes": ["user-preferences"],
+      "scene_namespaces": {"trading-": "trading"}
+    }
+
+Shards without an explicit path are stored as <base_dir>/<name>.db. Only
+shards in the registry (every shard opened through a router is added) are
+shards; other files in base_dir, such as a shard's replica or archive, are not.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from memory_db import MemoryDB
+
+SHARED_SHARD = "shared"
+DEFAULT_SHARD = "default"
+
+# Files kept next to a database (<db>_replica.db, <db>_archive.db, ...), never shards
+COMPANION_SUFFIXES = ("_llm_cache", "_updates", "_replica", "_archive")
+
+
+def _without_companions(shard_paths: Dict[str, str]) -> Dict[str, str]:
+    """Drop registry entries that are a companion file of another registered shard"""
+    roots = {os.path.splitext(os.path.abspath(path))[0] for path in shard_paths.values()}
+    return {
+        name: path
+        for name, path in shard_paths.items()
+        if not any(
+            os.path.splitext(os.path.abspath(path))[0] == root + suffix
+            for root in roots
+            for suffix in COMPANION_SUFFIXES
+        )
+    }
+
+
+class ShardDB(MemoryDB):
+    """
+    Memory database of one shard
+
+    Cells and summaries written to shared scenes are replicated through the
+    router to the other shards.
+    """
+
+    def __init__(self, db_path: str, router: "ShardRouter", name: str, **kwargs):
+        """
+        Initialize shard database
+
+        Args:
+            db_path: Path to the shard's SQLite file
+            router: Router the shard belongs to
+            name: Shard name
+            **kwargs: MemoryDB options
+        """
+        super().__init__(db_path, **kwargs)
+        self.router = router
+        self.shard_name = name
+
+    def insert_cells(
+        self,
+        cells: Iterable[Dict],
+        batch_size: int = 500,
+        dedup: Optional[str] = "default",
+        source: Optional[str] = None,
+        replicate: bool = True
+    ) -> List[int]:
+        """
+        Insert cells, replicating those of shared scenes (see MemoryDB.insert_cells)
+
+        Args:
+            replicate: Copy shared-scene cells to the other shards
+        """
+        if not replicate or not self.router.shared_scenes:
+            return super().insert_cells(cells, batch_size, dedup, source)
+
+        cells = list(cells)
+        ids = super().insert_cells(cells, batch_size, dedup, source)
+
+        shared = [cell for cell in cells if cell["scene"] in self.router.shared_scenes]
+        if shared:
+            self.router.replicate(shared, origin=self.shard_name, dedup=dedup)
+
+        return ids
+
+    def upsert_scene(
+        self,
+        scene: str,
+        summary: str,
+        last_cell_id: Optional[int] = None,
+        increments: Optional[int] = None,
+        replicate: bool = True
+    ) -> None:
+        """
+        Insert or update a scene summary, replicating shared scenes (see MemoryDB.upsert_scene)
+
+        Args:
+            replicate: Copy a shared scene's summary to the other shards
+        """
+        super().upsert_scene(scene, summary, last_cell_id, increments)
+
+        if replicate and scene in self.router.shared_scenes:
+            self.router.replicate_summary(scene, summary, origin=self.shard_name)
+
+
+class ShardRouter:
+    """
+    Routes memory reads and writes to per-agent shard databases
+
+    Usage:
+        router = ShardRouter("/path/to/shards", shared_scenes=["user-preferences"])
+
+        db = router.shard("researcher")            # one agent's database
+        router.insert_cells(cells, agent="coder")  # routed by agent and scene
+        cells = router.retrieve_context(query)     # fan-out over every shard
+    """
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        shared_scenes: Optional[Iterable[str]] = None,
+        scene_namespaces: Optional[Dict[str, str]] = None,
+        shard_paths: Optional[Dict[str, str]] = None,
+        fanout_workers: int = 8,
+        **db_options
+    ):
+        """
+        Initialize router
+
+        Arguments are merged into <base_dir>/shards.json and saved.
+
+        Args:
+            base_dir: Directory holding shards.json and default shard files
+                      (default: shards/ next to this module)
+            shared_scenes: Scenes replicated to every shard
+            scene_namespaces: Scene prefix -> shard for scenes owned by a namespace
+            shard_paths: Shard name -> database path (e.g. hot shards on a faster disk)
+            fanout_workers: Threads querying shards in parallel
+            **db_options: MemoryDB options for every shard
+        """
+        self.base_dir = base_dir or os.path.join(os.path.dirname(__file__), "shards")
+        os.makedirs(self.base_dir, exist_ok=True)
+
+        self.registry_path = os.path.join(self.base_dir, "shards.json")
+        registry = self._read_registry()
+
+        self.shard_paths: Dict[str, str] = registry.get("shards", {})
+        self.shard_paths.update(shard_paths or {})
+        self.shared_scenes = set(registry.get("shared_scenes", [])) | set(shared_scenes or [])
+        self.scene_namespaces: Dict[str, str] = registry.get("scene_namespaces", {})
+        self.scene_namespaces.update(scene_namespaces or {})
+
+        self.db_options = db_options
+        self.fanout_workers = fanout_workers
+
+        self._shards: Dict[str, ShardDB] = {}
+        self._lock = threading.RLock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self._save_registry()
+
+    def _read_registry(self) -> Dict:
+        """Load shards.json (empty if missing), without companion files registered by mistake"""
+        if not os.path.exists(self.registry_path):
+            return {}
+
+        with open(self.registry_path, "r", encoding="utf-8") as f:
+            registry = json.load(f)
+
+        registry["shards"] = _without_companions(registry.get("shards", {}))
+        return registry
+
+    def _save_registry(self) -> None:
+        """Write shards.json"""
+        registry = {
+            "shards": self.shard_paths,
+            "shared_scenes": sorted(self.shared_scenes),
+            "scene_namespaces": self.scene_namespaces
+        }
+        tmp_path = self.registry_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(registry, f, indent=2)
+        os.replace(tmp_path, self.registry_path)
+
+    def route(self, agent: Optional[str] = None, scene: Optional[str] = None) -> str:
+        """
+        Pick the shard for a write
+
+        Shared scenes go to the shared shard (and are replicated from there),
+        namespaced scenes to their namespace's shard, everything else to the
+        agent's shard.
+
+        Args:
+            agent: Agent identifier
+            scene: Scene identifier
+
+        Returns:
+            Shard name
+        """
+        if scene is not None:
+            if scene in self.shared_scenes:
+                return SHARED_SHARD
+            for prefix, shard in self.scene_namespaces.items():
+                if scene.startswith(prefix):
+                    return shard
+        return agent or DEFAULT_SHARD
+
+    def shard_path(self, name: str) -> str:
+        """Database path of a shard"""
+        return self.shard_paths.get(name) or os.path.join(self.base_dir, f"{name}.db")
+
+    def shard_names(self) -> List[str]:
+        """
+        Every known shard: registered (shards.json is re-read for shards other
+        processes added) or open in this router
+        """
+        with self._lock:
+            for name, path in self._read_registry().get("shards", {}).items():
+                self.shard_paths.setdefault(name, path)
+            return sorted(set(self.shard_paths) | set(self._shards))
+
+    def shard(self, name: str) -> ShardDB:
+        """
+        Open (or create) a shard
+
+        A new shard is seeded with the shared scenes' cells and summaries.
+
+        Args:
+            name: Shard name (usually the agent id)
+
+        Returns:
+            ShardDB instance
+        """
+        with self._lock:
+            if name in self._shards:
+                return self._shards[name]
+
+            path = self.shard_path(name)
+            is_new = not os.path.exists(path)
+
+            db = ShardDB(path, self, name, **self.db_options)
+            self._shards[name] = db
+
+            if name not in self.shard_paths:
+                self.shard_paths[name] = path
+                self._save_registry()
+
+            if is_new and name != SHARED_SHARD and self.shared_scenes:
+                self._seed(db)
+
+            return db
+
+    def _seed(self, db: ShardDB) -> None:
+        """Copy the shared scenes from the shared shard into a new shard"""
+        if not os.path.exists(self.shard_path(SHARED_SHARD)):
+            return
+
+        shared = self.shard(SHARED_SHARD)
+        db.insert_cells(shared.iter_scene_cells(self.shared_scenes), replicate=False)
+
+        for scene in self.shared_scenes:
+            existing = shared.get_scene(scene)
+            if existing and existing["summary"]:
+                db.upsert_scene(scene, existing["summary"], db.get_scene_last_cell_id(scene), replicate=False)
+
+    def insert_cells(self, cells: Iterable[Dict], agent: Optional[str] = None, **kwargs) -> Dict[str, List[int]]:
+        """
+        Insert cells into the shards route() picks for them
+
+        Args:
+            cells: Memory cells
+            agent: Agent the cells belong to
+            **kwargs: insert_cells options
+
+        Returns:
+            Dict of shard name -> inserted cell ids
+        """
+        by_shard: Dict[str, List[Dict]] = {}
+        for cell in cells:
+            by_shard.setdefault(self.route(agent, cell["scene"]), []).append(cell)
+
+        return {name: self.shard(name).insert_cells(batch, **kwargs) for name, batch in by_shard.items()}
+
+    def replicate(self, cells: List[Dict], origin: str, dedup: Optional[str] = "default") -> None:
+        """
+        Copy shared-scene cells to every shard except their origin
+
+        The shared shard always gets a copy (it is created if needed), so
+        shards created later are seeded with them.
+
+        Args:
+            cells: Cells already written to the origin shard
+            origin: Shard the cells were written to
+            dedup: Near-duplicate policy in the target shards
+        """
+        for name in self._replica_targets(origin):
+            self.shard(name).insert_cells(cells, dedup=dedup, replicate=False)
+
+    def replicate_summary(self, scene: str, summary: str, origin: str) -> None:
+        """
+        Copy a shared scene's summary to every shard except its origin
+
+        The summary covers the scene's replicated cells, so each target's
+        high-water mark moves to its own latest cell of the scene.
+        """
+        for name in self._replica_targets(origin):
+            db = self.shard(name)
+            db.upsert_scene(scene, summary, db.get_scene_last_cell_id(scene), replicate=False)
+
+    def _replica_targets(self, origin: str) -> List[str]:
+        """Shards a shared-scene write from origin is copied to, the shared shard first"""
+        others = [name for name in self.shard_names() if name not in (origin, SHARED_SHARD)]
+        return ([SHARED_SHARD] if origin != SHARED_SHARD else []) + others
+
+    def move_shard(self, name: str, new_path: str) -> None:
+        """
+        Move a shard's database file, e.g. a hot agent onto a faster disk
+
+        Args:
+            name: Shard name
+            new_path: New database path
+        """
+        with self._lock:
+            old_path = self.shard_path(name)
+
+            db = self._shards.pop(name, None)
+            if db is not None:
+                db.close()
+
+            if os.path.exists(old_path):
+                # Fold the WAL into the main file so only one file has to move
+                conn = sqlite3.connect(old_path)
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.close()
+
+                os.makedirs(os.path.dirname(os.path.abspath(new_path)), exist_ok=True)
+                shutil.move(old_path, new_path)
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(old_path + suffix):
+                        os.remove(old_path + suffix)
+
+            self.shard_paths[name] = new_path
+            self._save_registry()
+
+    def _fan_out(self, agents: Optional[Iterable[str]], call) -> List:
+        """Run call(shard_name, db) on the target shards in parallel"""
+        names = list(agents) if agents is not None else self.shard_names()
+        if not names:
+            return []
+
+        shards = [(name, self.shard(name)) for name in names]
+        if len(shards) == 1:
+            return [call(*shards[0])]
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.fanout_workers, thread_name_prefix="memory-shard")
+
+        return list(self._pool.map(lambda shard: call(*shard), shards))
+
+    def retrieve_context(
+        self,
+        query: str,
+        limit: int = 6,
+        agents: Optional[Iterable[str]] = None,
+        **kwargs
+    ) -> List[Dict]:
+        """
+        Ranked retrieval across shards
+
+        Each shard returns its own top `limit` cells; the union is re-ranked
+        by score. Replicated shared-scene cells are returned once.
+
+        Args:
+            query: Search query
+            limit: Maximum number of cells
+            agents: Shards to search (default: every shard)
+            **kwargs: retrieve_context options
+
+        Returns:
+            Cells with an added "shard" key, best first
+        """
+        def search(name: str, db: ShardDB) -> List[Dict]:
+            return [dict(cell, shard=name) for cell in db.retrieve_context(query, limit, **kwargs)]
+
+        merged = sorted(
+            (cell for cells in self._fan_out(agents, search) for cell in cells),
+            key=lambda cell: cell.get("score", 0.0),
+            reverse=True
+        )
+
+        results = []
+        seen = set()
+        for cell in merged:
+            key = (cell["scene"], cell["content"])
+            if key not in seen:
+                seen.add(key)
+                results.append(cell)
+                if len(results) >= limit:
+                    break
+
+        return results
+
+    def retrieve_scene_context(
+        self,
+        query: str,
+        limit: int = 6,
+        agents: Optional[Iterable[str]] = None,
+        **kwargs
+    ) -> List[Dict]:
+        """
+        Scene context across shards (see MemoryDB.retrieve_scene_context)
+
+        A scene found in several shards keeps its most relevant entry.
+
+        Args:
+            query: Search query
+            limit: Maximum number of cells per shard
+            agents: Shards to search (default: every shard)
+            **kwargs: retrieve_scene_context options
+
+        Returns:
+            Scene dicts with an added "shard" key, most relevant first
+        """
+        def search(name: str, db: ShardDB) -> List[Dict]:
+            return [dict(scene, shard=name) for scene in db.retrieve_scene_context(query, limit, **kwargs)]
+
+        best: Dict[str, Dict] = {}
+        for scenes in self._fan_out(agents, search):
+            for scene in scenes:
+                current = best.get(scene["scene"])
+                if current is None or scene["relevance"] > current["relevance"]:
+                    best[scene["scene"]] = scene
+
+        return sorted(best.values(), key=lambda scene: scene["relevance"], reverse=True)
+
+    def get_statistics(self) -> Dict:
+        """
+        Statistics per shard and in total
+
+        Returns:
+            Dict with shards (name -> MemoryDB statistics), total_cells and
+            shared_scenes
+        """
+        shards = {name: self.shard(name).get_statistics() for name in self.shard_names()}
+        return {
+            "shards": shards,
+            "total_cells": sum(stats["total_cells"] for stats in shards.values()),
+            "shared_scenes": sorted(self.shared_scenes)
+        }
+
+    def close(self) -> None:
+        """Close every open shard"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+            for db in self._shards.values():
+                db.close()
+            self._shards = {}
+
+
+# Router per base directory
+_shard_routers: Dict[str, ShardRouter] = {}
+
+
+def get_shard_router(base_dir: Optional[str] = None, **kwargs) -> ShardRouter:
+    """
+    Get the shared router for a shard directory
+
+    Args:
+        base_dir: Shard directory (default: shards/ next to this module)
+        **kwargs: ShardRouter options, used when the router is created
+
+    Returns:
+        ShardRouter instance
+    """
+    key = os.path.abspath(base_dir or os.path.join(os.path.dirname(__file__), "shards"))
+    if key not in _shard_routers:
+        _shard_routers[key] = ShardRouter(key, **kwargs)
+    return _shard_routers[key]
@@ -0,0 +1,351 @@
+"""
+Query Profiler Module for Self-Organizing Agent Memory System
+Per-method and per-statement timing, latency histograms and a slow-query log
+
+MemoryDB connections are ProfiledConnection instances. While no profiler is
+attached, execute() is a plain pass-through; MemoryDB.enable_profiling()
+attaches a QueryProfiler to every connection and wraps the public MemoryDB
+methods on the instance, and disable_profiling() removes both again.
+"""
+
+import bisect
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+# Statements are aggregated by their text with whitespace collapsed, cut to this length
+STATEMENT_KEY_LENGTH = 160
+
+
+def statement_key(sql: str) -> str:
+    """Collapse whitespace so the same statement always aggregates under one key"""
+    return re.sub(r"\s+", " ", sql).strip()[:STATEMENT_KEY_LENGTH]
+
+
+class LatencyStats:
+    """Count, total, max, rows and a fixed-bucket histogram for one operation"""
+
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float, rows: int) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.rows += rows
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples"""
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target and count:
+                bound = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "rows": self.rows,
+            "histogram": {
+                (f"<={bound}ms" if i < len(LATENCY_BUCKETS_MS) else f">{LATENCY_BUCKETS_MS[-1]}ms"): count
+                for i, (bound, count) in enumerate(zip(LATENCY_BUCKETS_MS + [None], self.buckets))
+                if count
+            }
+        }
+
+
+class QueryProfiler:
+    """
+    Thread-safe aggregator of MemoryDB method and SQL statement timings
+
+    Statements slower than slow_ms go to an in-memory log of the most recent
+    ones and, with slow_log_path, are appended to a JSON-lines file. With
+    explain enabled, the EXPLAIN QUERY PLAN of each slow statement is
+    captured once and attached to its log entries.
+    """
+
+    def __init__(
+        self,
+        slow_ms: float = 100.0,
+        slow_log_path: Optional[str] = None,
+        explain: bool = False,
+        max_slow_entries: int = 100
+    ):
+        """
+        Initialize profiler
+
+        Args:
+            slow_ms: Statements and methods at or above this many milliseconds are logged as slow
+            slow_log_path: Optional JSON-lines file the slow-query log is appended to
+            explain: Capture EXPLAIN QUERY PLAN for slow statements
+            max_slow_entries: Slow-log entries kept in memory
+        """
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.explain = explain
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.methods: Dict[str, LatencyStats] = {}
+        self.statements: Dict[str, LatencyStats] = {}
+        self.plans: Dict[str, List[str]] = {}
+        self.slow_queries = deque(maxlen=max_slow_entries)
+        self.started_at = time.time()
+
+    def current_method(self) -> Optional[str]:
+        """Outermost MemoryDB method running on this thread"""
+        return getattr(self._local, "method", None)
+
+    def record_method(self, name: str, elapsed_ms: float, rows: int) -> None:
+        """Add one method call"""
+        with self._lock:
+            stats = self.methods.get(name)
+            if stats is None:
+                stats = self.methods[name] = LatencyStats()
+            stats.add(elapsed_ms, rows)
+
+        if elapsed_ms >= self.slow_ms:
+            self._log_slow({"method": name, "ms": round(elapsed_ms, 3), "rows": rows})
+
+    def record_statement(
+        self,
+        sql: str,
+        params,
+        elapsed_ms: float,
+        rows: int,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> None:
+        """
+        Add one statement execution
+
+        Args:
+            sql: Statement text
+            params: Bound parameters (used for EXPLAIN QUERY PLAN)
+            elapsed_ms: Execution plus fetch time
+            rows: Rows returned (SELECT) or changed (DML)
+            conn: Connection the statement ran on (for EXPLAIN QUERY PLAN)
+        """
+        key = statement_key(sql)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = LatencyStats()
+            stats.add(elapsed_ms, rows)
+
+        if elapsed_ms < self.slow_ms:
+            return
+
+        entry = {"sql": key, "ms": round(elapsed_ms, 3), "rows": rows, "method": self.current_method()}
+        if self.explain and conn is not None:
+            entry["plan"] = self._plan(key, sql, params, conn)
+        self._log_slow(entry)
+
+    def _plan(self, key: str, sql: str, params, conn: sqlite3.Connection) -> Optional[List[str]]:
+        """EXPLAIN QUERY PLAN of a statement, captured once per statement"""
+        if key in self.plans:
+            return self.plans[key]
+
+        try:
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            plan = [row[3] for row in rows]
+        except (sqlite3.Error, ValueError):
+            plan = None
+
+        self.plans[key] = plan
+        return plan
+
+    def _log_slow(self, entry: Dict) -> None:
+        """Keep a slow entry and append it to the slow log file"""
+        entry["at"] = round(time.time(), 3)
+        with self._lock:
+            self.slow_queries.append(entry)
+            if self.slow_log_path:
+                try:
+                    with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"⚠️ Could not write slow-query log: {e}")
+
+    def wrap_method(self, name: str, method: Callable) -> Callable:
+        """Time a bound MemoryDB method; nested calls are recorded under their own names"""
+        local = self._local
+
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            outer = getattr(local, "method", None)
+            if outer is None:
+                local.method = name
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if outer is None:
+                    local.method = None
+            self.record_method(name, elapsed_ms, len(result) if isinstance(result, list) else 0)
+            return result
+
+        return profiled
+
+    def snapshot(self, top_statements: int = 20) -> Dict:
+        """
+        Current aggregates
+
+        Args:
+            top_statements: Statements included, by total time
+
+        Returns:
+            Dict with methods, statements (slowest total first), slow_queries and settings
+        """
+        with self._lock:
+            methods = {name: stats.to_dict() for name, stats in sorted(self.methods.items())}
+            ranked = sorted(self.statements.items(), key=lambda item: item[1].total_ms, reverse=True)
+            statements = [
+                dict(stats.to_dict(), sql=key, plan=self.plans.get(key))
+                for key, stats in ranked[:top_statements]
+            ]
+            slow = list(self.slow_queries)
+
+        return {
+            "since": self.started_at,
+            "slow_ms": self.slow_ms,
+            "explain": self.explain,
+            "methods": methods,
+            "statements": statements,
+            "slow_queries": slow
+        }
+
+    def reset(self) -> None:
+        """Drop all aggregates and the in-memory slow log"""
+        with self._lock:
+            self.methods.clear()
+            self.statements.clear()
+            self.plans.clear()
+            self.slow_queries.clear()
+            self.started_at = time.time()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor that reports its statement to a QueryProfiler
+
+    A statement without a result set is recorded right after it runs. For
+    queries, SQLite produces rows as they are fetched, so the time until
+    fetchall()/fetchone()/fetchmany() returns, or iteration ends, is recorded.
+    A query whose rows are never exhausted (e.g. a loop that breaks early) is
+    recorded with the rows seen so far when the cursor is closed, re-executed
+    or garbage-collected.
+    """
+
+    profiler: Optional[QueryProfiler] = None
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish(0)
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        if self.description is None:
+            self._record(sql, parameters, started, max(self.rowcount, 0))
+        else:
+            self._pending = (sql, parameters, started, 0)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish(0)
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._record(sql, (), started, max(self.rowcount, 0))
+        return self
+
+    def close(self):
+        self._finish(0)
+        super().close()
+
+    def __del__(self):
+        # Abandoned mid-iteration without close(); the connection may be gone already
+        try:
+            self._finish(0)
+        except Exception:
+            pass
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._finish(len(rows))
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._finish(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._finish(len(rows))
+        return rows
+
+    def __next__(self):
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish(0)
+            raise
+        if self._pending:
+            sql, parameters, started, rows = self._pending
+            self._pending = (sql, parameters, started, rows + 1)
+        return row
+
+    def _finish(self, rows: int) -> None:
+        if self._pending:
+            sql, parameters, started, seen = self._pending
+            self._pending = None
+            self._record(sql, parameters, started, seen + rows)
+
+    def _record(self, sql, parameters, started: float, rows: int) -> None:
+        if self.profiler is not None:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.profiler.record_statement(sql, parameters, elapsed_ms, rows, self.connection)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection whose execute()/executemany() report to an attached QueryProfiler"""
+
+    profiler: Optional[QueryProfiler] = None
+
+    def execute(self, sql, parameters=()):
+        if self.profiler is None:
+            return super().execute(sql, parameters)
+        cursor = self.cursor(ProfiledCursor)
+        cursor.profiler = self.profiler
+        return cursor.execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.profiler is None:
+            return super().executemany(sql, seq_of_parameters)
+        cursor = self.cursor(ProfiledCursor)
+        cursor.profiler = self.profiler
+        return cursor.executemany(sql, seq_of_parameters)
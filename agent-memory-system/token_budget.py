@@ -0,0 +1,66 @@
+"""
+Token Budget Module for Self-Organizing Agent Memory System
+Token estimates for memory text and greedy packing of context into a token budget
+"""
+
+import re
+from typing import Callable, Dict, List
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many LLM tokens a text costs
+
+    Tokenizer-free approximation: every punctuation mark is one token and a
+    word is one token per started run of five characters. It slightly
+    over-counts ordinary English, which keeps packed contexts inside budget.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count
+    """
+    return sum(1 + (len(piece) - 1) // 5 for piece in _TOKEN_PATTERN.findall(text or ""))
+
+
+def pack(
+    items: List[Dict],
+    max_tokens: int,
+    value: Callable[[Dict], float],
+    cost: Callable[[Dict], int]
+) -> List[Dict]:
+    """
+    Greedily choose items with the best value per token that fit a budget
+
+    Items are taken in order of value / cost; an item that no longer fits is
+    skipped and smaller items after it are still considered (the classic
+    greedy approximation to 0/1 knapsack).
+
+    Args:
+        items: Candidate items
+        max_tokens: Token budget
+        value: Function returning an item's value (higher is better)
+        cost: Function returning an item's token cost
+
+    Returns:
+        Chosen items in their original order
+    """
+    ranked = sorted(
+        range(len(items)),
+        key=lambda i: value(items[i]) / max(cost(items[i]), 1),
+        reverse=True
+    )
+
+    chosen = set()
+    remaining = max_tokens
+
+    for i in ranked:
+        item_cost = cost(items[i])
+        if item_cost <= remaining:
+            chosen.add(i)
+            remaining -= item_cost
+
+    return [item for i, item in enumerate(items) if i in chosen]
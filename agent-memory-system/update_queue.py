@@ -0,0 +1,364 @@
+"""
+Update Queue Module for Self-Organizing Agent Memory System
+Write-behind queue that takes memory updates off the agent's reply path
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+BACKPRESSURE_POLICIES = ("block", "drop-oldest")
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """
+    Bounded, disk-backed queue of interactions waiting to be written to memory
+
+    enqueue() journals the interaction to SQLite and returns; a worker thread
+    drains the queue in batches through process_batch. Journaled
+    interactions are only deleted once processed, so the ones still queued
+    when the process dies are replayed by the next UpdateQueue on the same
+    journal. A batch that still fails after max_retries attempts is moved to
+    the journal's dead-letter table (failed_updates), where it waits for
+    replay_dead_letters(). When max_size interactions are waiting, the
+    backpressure policy either blocks the caller or drops the oldest waiting
+    interaction.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Tuple[str, str]]], object],
+        journal_path: str,
+        max_size: int = 1000,
+        backpressure: str = "block",
+        batch_size: int = 32,
+        max_retries: int = 3,
+        retry_delay: float = 1.0
+    ):
+        """
+        Initialize update queue, replay journaled interactions and start the worker
+
+        Args:
+            process_batch: Function called with a list of (user, assistant) pairs
+            journal_path: SQLite file journaling queued interactions
+            max_size: Maximum interactions waiting in the queue
+            backpressure: "block" (wait for space) or "drop-oldest"
+            batch_size: Maximum interactions handed to process_batch at once
+            max_retries: Attempts per batch before its interactions are dead-lettered
+            retry_delay: Seconds between attempts
+        """
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                f"Invalid backpressure policy '{backpressure}'. Must be one of: {', '.join(BACKPRESSURE_POLICIES)}"
+            )
+
+        self.process_batch = process_batch
+        self.journal_path = journal_path
+        self.max_size = max_size
+        self.backpressure = backpressure
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._cond = threading.Condition()
+        self._pending = deque()  # (journal_id, enqueued_at, user, assistant)
+        self._in_flight: List[tuple] = []
+        self._closed = False
+        self._stopping = False  # close() timed out: take no new batches
+
+        self.enqueued_count = 0
+        self.processed_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+        self.batch_count = 0
+
+        self.journal = sqlite3.connect(journal_path, check_same_thread=False)
+        self.journal.execute("PRAGMA journal_mode=WAL")
+        self.journal.execute("PRAGMA synchronous=NORMAL")
+        self.journal.execute("""
+        CREATE TABLE IF NOT EXISTS pending_updates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user TEXT NOT NULL,
+            assistant TEXT NOT NULL,
+            enqueued_at REAL NOT NULL
+        )
+        """)
+        self.journal.execute("""
+        CREATE TABLE IF NOT EXISTS failed_updates (
+            id INTEGER PRIMARY KEY,
+            user TEXT NOT NULL,
+            assistant TEXT NOT NULL,
+            enqueued_at REAL NOT NULL,
+            failed_at REAL NOT NULL,
+            error TEXT NOT NULL
+        )
+        """)
+        self.journal.commit()
+        self.dead_letter_count = self.journal.execute("SELECT COUNT(*) FROM failed_updates").fetchone()[0]
+
+        # Interactions left over from a previous run go first (may exceed max_size)
+        self._pending.extend(
+            tuple(row) for row in self.journal.execute(
+                "SELECT id, enqueued_at, user, assistant FROM pending_updates ORDER BY id"
+            )
+        )
+        self.replayed_count = len(self._pending)
+
+        self._thread = threading.Thread(target=self._worker, name="memory-update-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_database(cls, db_path: str, process_batch: Callable, **kwargs) -> "UpdateQueue":
+        """Create a queue journaling next to a memory database (<db>_updates.db)"""
+        return cls(process_batch, os.path.splitext(db_path)[0] + "_updates.db", **kwargs)
+
+    def enqueue(self, user: str, assistant: str, timeout: Optional[float] = None) -> bool:
+        """
+        Queue an interaction for writing
+
+        Args:
+            user: User message
+            assistant: Assistant response
+            timeout: With the "block" policy, maximum seconds to wait for space
+
+        Returns:
+            True if queued, False if the block timed out
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("UpdateQueue is closed")
+
+            if self.backpressure == "block":
+                if not self._cond.wait_for(lambda: len(self._pending) < self.max_size or self._closed, timeout):
+                    return False
+                if self._closed:
+                    raise RuntimeError("UpdateQueue is closed")
+            else:
+                while len(self._pending) >= self.max_size:
+                    dropped = self._pending.popleft()
+                    self.journal.execute("DELETE FROM pending_updates WHERE id=?", (dropped[0],))
+                    self.dropped_count += 1
+
+            enqueued_at = time.time()
+            journal_id = self.journal.execute(
+                "INSERT INTO pending_updates (user, assistant, enqueued_at) VALUES (?,?,?)",
+                (user, assistant, enqueued_at)
+            ).lastrowid
+            self.journal.commit()
+
+            self._pending.append((journal_id, enqueued_at, user, assistant))
+            self.enqueued_count += 1
+            self._cond.notify_all()
+            return True
+
+    def depth(self) -> int:
+        """Interactions waiting or being written"""
+        with self._cond:
+            return len(self._pending) + len(self._in_flight)
+
+    def lag_seconds(self) -> float:
+        """Age of the oldest interaction not yet written (0.0 when idle)"""
+        with self._cond:
+            return self._lag()
+
+    def stats(self) -> Dict:
+        """Depth, lag and throughput counters"""
+        with self._cond:
+            return {
+                "depth": len(self._pending) + len(self._in_flight),
+                "lag_seconds": self._lag(),
+                "enqueued": self.enqueued_count,
+                "processed": self.processed_count,
+                "dropped": self.dropped_count,
+                "failed": self.failed_count,
+                "dead_letters": self.dead_letter_count,
+                "batches": self.batch_count,
+                "replayed": self.replayed_count
+            }
+
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        """
+        Interactions whose batch failed every attempt, oldest first
+
+        Args:
+            limit: Maximum number of interactions
+
+        Returns:
+            List of dicts with id, user, assistant, enqueued_at, failed_at and error
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("UpdateQueue is closed")
+
+            rows = self.journal.execute("""
+            SELECT id, user, assistant, enqueued_at, failed_at, error
+            FROM failed_updates
+            ORDER BY id
+            LIMIT ?
+            """, (limit,)).fetchall()
+
+        keys = ("id", "user", "assistant", "enqueued_at", "failed_at", "error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def replay_dead_letters(self, ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Queue dead-lettered interactions again (e.g. once the failure is fixed)
+
+        Replayed interactions join the back of the queue regardless of
+        max_size and get max_retries fresh attempts.
+
+        Args:
+            ids: Dead-letter ids to replay (None replays all)
+
+        Returns:
+            Number of interactions queued
+        """
+        return self._take_dead_letters(ids, replay=True)
+
+    def discard_dead_letters(self, ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Delete dead-lettered interactions for good
+
+        Args:
+            ids: Dead-letter ids to delete (None deletes all)
+
+        Returns:
+            Number of interactions deleted
+        """
+        return self._take_dead_letters(ids, replay=False)
+
+    def _take_dead_letters(self, ids: Optional[Sequence[int]], replay: bool) -> int:
+        """Remove dead letters from the journal, re-queueing them with replay"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("UpdateQueue is closed")
+
+            rows = self.journal.execute(
+                "SELECT id, user, assistant FROM failed_updates ORDER BY id"
+            ).fetchall()
+            if ids is not None:
+                wanted = set(ids)
+                rows = [row for row in rows if row[0] in wanted]
+
+            if not rows:
+                return 0
+
+            now = time.time()
+            for failed_id, user, assistant in rows:
+                self.journal.execute("DELETE FROM failed_updates WHERE id=?", (failed_id,))
+                if replay:
+                    journal_id = self.journal.execute(
+                        "INSERT INTO pending_updates (user, assistant, enqueued_at) VALUES (?,?,?)",
+                        (user, assistant, now)
+                    ).lastrowid
+                    self._pending.append((journal_id, now, user, assistant))
+            self.journal.commit()
+
+            self.dead_letter_count -= len(rows)
+            self._cond.notify_all()
+            return len(rows)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued interaction has been written
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        with self._cond:
+            self._cond.notify_all()
+            self._cond.wait_for(
+                lambda: not self._in_flight and (not self._pending or self._stopping), timeout
+            )
+            return not self._pending and not self._in_flight
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Drain the queue and stop the worker
+
+        Interactions still queued after the timeout stay in the journal and
+        are replayed next time. The worker finishes the batch it is writing,
+        takes no new one, and closes the journal on its way out.
+
+        Args:
+            timeout: Maximum seconds to wait for the drain
+        """
+        with self._cond:
+            already_closed = self._closed
+
+        if not already_closed:
+            drained = self.flush(timeout)
+            with self._cond:
+                self._closed = True
+                self._stopping = not drained
+                self._cond.notify_all()
+
+        self._thread.join(timeout)
+
+    def _lag(self) -> float:
+        """Age of the oldest unwritten interaction (lock held)"""
+        oldest = self._in_flight[0] if self._in_flight else (self._pending[0] if self._pending else None)
+        return max(0.0, time.time() - oldest[1]) if oldest else 0.0
+
+    def _worker(self) -> None:
+        """Worker loop: write queued interactions in batches until closed"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending or self._stopping:
+                    # Closed: what is left stays journaled for the next run
+                    self.journal.close()
+                    self._cond.notify_all()
+                    return
+
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                self._in_flight = batch
+                self._cond.notify_all()  # space for blocked producers
+
+            error = None
+            for attempt in range(self.max_retries):
+                try:
+                    self.process_batch([(user, assistant) for _, _, user, assistant in batch])
+                    error = None
+                    break
+                except Exception as e:
+                    error = e
+                    logger.warning(
+                        "Memory update batch failed (attempt %d/%d): %s", attempt + 1, self.max_retries, e
+                    )
+                    if attempt + 1 < self.max_retries:
+                        time.sleep(self.retry_delay)
+
+            with self._cond:
+                journal_ids = [(journal_id,) for journal_id, _, _, _ in batch]
+                if error is not None:
+                    failed_at = time.time()
+                    self.journal.executemany("""
+                    INSERT INTO failed_updates (id, user, assistant, enqueued_at, failed_at, error)
+                    SELECT id, user, assistant, enqueued_at, ?, ?
+                    FROM pending_updates WHERE id=?
+                    """, [(failed_at, repr(error), journal_id) for (journal_id,) in journal_ids])
+                self.journal.executemany("DELETE FROM pending_updates WHERE id=?", journal_ids)
+                self.journal.commit()
+
+                if error is None:
+                    self.processed_count += len(batch)
+                else:
+                    self.failed_count += len(batch)
+                    self.dead_letter_count += len(batch)
+                    logger.error(
+                        "Moved %d memory updates to the dead-letter table after %d attempts: %s",
+                        len(batch), self.max_retries, error
+                    )
+                self.batch_count += 1
+                self._in_flight = []
+                self._cond.notify_all()
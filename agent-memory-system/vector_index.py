@@ -0,0 +1,528 @@
+"""
+Vector Index Module for Self-Organizing Agent Memory System
+Optional embedding index stored next to the memory database for semantic retrieval
+
+Vectors live in a flat float32 file that is memory-mapped for search, with a
+parallel int64 file of cell ids. Search is batched brute force, or an IVF
+(inverted file) index once build_ivf() has been run, which keeps queries over
+~1M cells well under 50 ms on a laptop CPU. Requires NumPy.
+
+Removed cells are tombstoned in a third file (.deleted) and skipped by every
+search; compact() rewrites the files without them, automatically once
+tombstones reach compact_ratio of the index.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; VectorIndex raises if used without it
+    np = None
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder using signed feature hashing
+
+    Features are words, word bigrams and character n-grams, weighted by
+    sublinear term frequency and L2-normalized. Runs fully offline and is
+    deterministic across processes.
+    """
+
+    name = "hashing"
+
+    def __init__(
+        self,
+        dim: int = 256,
+        char_ngram: int = 3,
+        bigram_weight: float = 0.5,
+        char_weight: float = 0.3
+    ):
+        """
+        Initialize hashing embedder
+
+        Args:
+            dim: Embedding dimension
+            char_ngram: Character n-gram length (0 disables character features)
+            bigram_weight: Weight of word bigram features relative to words
+            char_weight: Weight of character n-gram features relative to words
+        """
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self.bigram_weight = bigram_weight
+        self.char_weight = char_weight
+
+    def _features(self, text: str) -> Dict[str, float]:
+        """Weighted feature counts for one text"""
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features: Dict[str, float] = {}
+
+        def add(feature: str, weight: float):
+            features[feature] = features.get(feature, 0.0) + weight
+
+        for word in words:
+            add("w:" + word, 1.0)
+
+            if self.char_ngram and len(word) > self.char_ngram:
+                padded = f"<{word}>"
+                for i in range(len(padded) - self.char_ngram + 1):
+                    add("c:" + padded[i:i + self.char_ngram], self.char_weight)
+
+        for first, second in zip(words, words[1:]):
+            add(f"b:{first} {second}", self.bigram_weight)
+
+        return features
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        """
+        Embed texts
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows
+        """
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text).items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                # Sublinear term frequency for repeated features
+                tf = 1.0 + math.log(weight) if weight > 1.0 else weight
+                out[row, h % self.dim] += sign * tf
+
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class VectorIndex:
+    """Memory-mapped float32 vector index keyed by memory cell id"""
+
+    def __init__(self, path_prefix: str, embedder=None, compact_ratio: float = 0.25):
+        """
+        Open (or create) a vector index
+
+        Args:
+            path_prefix: Path prefix for the index files (.f32, .ids, .deleted, .json, .ivf*)
+            embedder: Object with a `dim` attribute and `embed(texts) -> np.ndarray`.
+                      Defaults to HashingEmbedder()
+            compact_ratio: Share of tombstoned vectors at which remove() compacts the files
+        """
+        if np is None:
+            raise ImportError("VectorIndex requires numpy (pip install numpy)")
+
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.compact_ratio = compact_ratio
+
+        self.vectors_path = path_prefix + ".f32"
+        self.ids_path = path_prefix + ".ids"
+        self.meta_path = path_prefix + ".json"
+        self.centroids_path = path_prefix + ".ivf.npy"
+        self.assign_path = path_prefix + ".ivf.assign"
+        self.deleted_path = path_prefix + ".deleted"
+        # Present while compact() swaps rewritten files in; _load() finishes the swap
+        self.compacting_path = path_prefix + ".compacting"
+
+        self._lock = threading.RLock()
+        self._check_meta()
+        self._load()
+
+    @classmethod
+    def for_database(cls, db_path: str, embedder=None) -> "VectorIndex":
+        """
+        Open the vector index stored next to a memory database
+
+        Args:
+            db_path: Path to the SQLite database (agent_memory.db -> agent_memory.vectors.*)
+            embedder: Optional embedder
+
+        Returns:
+            VectorIndex instance
+        """
+        return cls(os.path.splitext(db_path)[0] + ".vectors", embedder)
+
+    def _check_meta(self):
+        """Refuse to mix vectors from different embedders or dimensions"""
+        meta = {"dim": self.dim, "embedder": getattr(self.embedder, "name", type(self.embedder).__name__)}
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored != meta:
+                raise ValueError(
+                    f"Vector index at {self.meta_path} was built with {stored}, not {meta}; "
+                    "call clear() and rebuild it"
+                )
+        else:
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+    def _load(self):
+        """(Re)map the vector, id, tombstone and IVF files"""
+        if os.path.exists(self.compacting_path):
+            self._finish_compaction()
+
+        ids_count = os.path.getsize(self.ids_path) // 8 if os.path.exists(self.ids_path) else 0
+        vec_count = (
+            os.path.getsize(self.vectors_path) // (4 * self.dim)
+            if os.path.exists(self.vectors_path) else 0
+        )
+        # A crash between the two appends leaves extra vectors; ignore them
+        self.count = min(ids_count, vec_count)
+
+        self.centroids = None
+        if os.path.exists(self.centroids_path) and os.path.exists(self.assign_path):
+            if os.path.getsize(self.assign_path) // 4 >= self.count:
+                self.centroids = np.load(self.centroids_path)
+
+        self._map()
+
+        # Boolean mask of tombstoned rows, or None when nothing was removed.
+        # Kept in a buffer with spare room so add() can extend it in place
+        self.dead = None
+        self._dead_buffer = None
+        self.dead_count = 0
+        if self.count and os.path.exists(self.deleted_path):
+            deleted = np.fromfile(self.deleted_path, dtype=np.int64)
+            dead = np.isin(self.ids, deleted)
+            self.dead_count = int(dead.sum())
+            if self.dead_count:
+                self.dead = self._dead_buffer = dead
+
+    def _map(self):
+        """Memory-map the first self.count vectors, ids and IVF assignments"""
+        if self.count:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+            self.ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(self.count,))
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self.ids = np.zeros(0, dtype=np.int64)
+
+        self.assignments = None
+        if self.centroids is not None:
+            self.assignments = (
+                np.memmap(self.assign_path, dtype=np.int32, mode="r", shape=(self.count,))
+                if self.count else np.zeros(0, dtype=np.int32)
+            )
+
+    def __len__(self) -> int:
+        """Number of live (not removed) vectors"""
+        return self.count - self.dead_count
+
+    @property
+    def last_id(self) -> int:
+        """Highest cell id appended so far (0 when empty); later cells are not indexed yet"""
+        return int(self.ids[-1]) if self.count else 0
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        """Embed texts with the index's embedder as float32"""
+        return np.ascontiguousarray(self.embedder.embed(list(texts)), dtype=np.float32)
+
+    def add(self, ids: Sequence[int], texts: Sequence[str]) -> None:
+        """
+        Append vectors for new cells
+
+        Args:
+            ids: Cell ids, strictly increasing and greater than any id already indexed
+            texts: Cell text to embed, aligned with ids
+        """
+        if len(ids) == 0:
+            return
+
+        vectors = self.embed(texts)
+        id_array = np.asarray(ids, dtype=np.int64)
+
+        with self._lock:
+            if np.any(np.diff(id_array) <= 0) or (self.count and id_array[0] <= self.ids[-1]):
+                raise ValueError("VectorIndex ids must be appended in increasing order")
+
+            # Vectors first: a crash before the ids append leaves them ignored
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write(id_array.tobytes())
+
+            if self.centroids is not None:
+                with open(self.assign_path, "ab") as f:
+                    f.write(self._nearest_centroid(vectors).tobytes())
+
+            # Extend the in-memory state instead of re-reading the files and tombstones
+            old_count = self.count
+            self.count += len(id_array)
+            self._map()
+
+            if self.dead is not None:
+                if len(self._dead_buffer) < self.count:
+                    buffer = np.zeros(max(self.count, 2 * len(self._dead_buffer)), dtype=bool)
+                    buffer[:old_count] = self.dead
+                    self._dead_buffer = buffer
+                self.dead = self._dead_buffer[:self.count]
+
+    def remove(self, ids: Sequence[int]) -> int:
+        """
+        Tombstone the vectors of removed cells
+
+        Args:
+            ids: Cell ids; ids not in the index are ignored
+
+        Returns:
+            Number of vectors removed
+        """
+        if len(ids) == 0:
+            return 0
+
+        with self._lock:
+            if not self.count:
+                return 0
+
+            wanted = np.unique(np.asarray(ids, dtype=np.int64))
+            rows = np.searchsorted(self.ids, wanted)
+            rows[rows >= self.count] = 0
+            rows = rows[self.ids[rows] == wanted]
+            if self.dead is not None:
+                rows = rows[~self.dead[rows]]
+            if not len(rows):
+                return 0
+
+            with open(self.deleted_path, "ab") as f:
+                f.write(np.asarray(self.ids[rows]).tobytes())
+            self._load()
+
+            if self.dead_count >= self.compact_ratio * self.count:
+                self.compact()
+
+            return len(rows)
+
+    def compact(self, chunk_size: int = 65536) -> int:
+        """
+        Rewrite the index files without tombstoned vectors
+
+        The rewritten files are swapped in under a marker file, so an
+        interrupted swap is completed the next time the index is opened.
+
+        Args:
+            chunk_size: Rows copied per step
+
+        Returns:
+            Number of vectors dropped
+        """
+        with self._lock:
+            if self.dead is None:
+                if os.path.exists(self.deleted_path):
+                    os.remove(self.deleted_path)
+                return 0
+
+            dropped = self.dead_count
+            targets = [(self.vectors_path, self.vectors), (self.ids_path, self.ids)]
+            if self.assignments is not None:
+                targets.append((self.assign_path, self.assignments))
+            elif os.path.exists(self.assign_path):
+                # Stale assignments could look complete for the shorter index
+                os.remove(self.assign_path)
+
+            for path, data in targets:
+                with open(path + ".tmp", "wb") as f:
+                    for start in range(0, self.count, chunk_size):
+                        live = ~self.dead[start:start + chunk_size]
+                        f.write(np.asarray(data[start:start + chunk_size])[live].tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            # Drop the maps of the old files before replacing them
+            self.vectors = self.ids = self.assignments = None
+
+            open(self.compacting_path, "w").close()
+            self._finish_compaction()
+            self._load()
+
+            return dropped
+
+    def _finish_compaction(self):
+        """Swap in the files written by compact() and drop the tombstones"""
+        for path in (self.vectors_path, self.ids_path, self.assign_path):
+            if os.path.exists(path + ".tmp"):
+                os.replace(path + ".tmp", path)
+
+        if os.path.exists(self.deleted_path):
+            os.remove(self.deleted_path)
+        os.remove(self.compacting_path)
+
+    def clear(self) -> None:
+        """Delete all index files"""
+        with self._lock:
+            for path in (self.vectors_path, self.ids_path, self.meta_path, self.deleted_path,
+                         self.centroids_path, self.assign_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._check_meta()
+            self._load()
+
+    def _nearest_centroid(self, vectors: "np.ndarray") -> "np.ndarray":
+        """Index of the closest IVF centroid for each vector"""
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def build_ivf(
+        self,
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        sample_size: int = 50000,
+        seed: int = 0
+    ) -> None:
+        """
+        Train an IVF index with spherical k-means and assign every vector
+
+        Args:
+            nlist: Number of clusters (default: sqrt of vector count)
+            iterations: k-means iterations
+            sample_size: Vectors sampled for training
+            seed: Random seed
+        """
+        with self._lock:
+            if not self.count:
+                return
+
+            nlist = min(nlist or max(1, int(math.sqrt(self.count))), self.count)
+            rng = np.random.default_rng(seed)
+
+            sample_rows = np.sort(rng.choice(self.count, size=min(sample_size, self.count), replace=False))
+            sample = np.asarray(self.vectors[sample_rows])
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=nlist)
+
+                # Re-seed empty clusters from random sample vectors
+                empty = counts == 0
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                centroids = (sums / norms).astype(np.float32)
+
+            self.centroids = centroids
+            np.save(self.centroids_path, centroids)
+
+            with open(self.assign_path, "wb") as f:
+                for start in range(0, self.count, 65536):
+                    chunk = np.asarray(self.vectors[start:start + 65536])
+                    f.write(self._nearest_centroid(chunk).tobytes())
+
+            self._load()
+
+    def search(
+        self,
+        queries: "np.ndarray",
+        k: int = 10,
+        nprobe: int = 8,
+        chunk_size: int = 65536
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Find the k most similar cells for each query vector
+
+        Args:
+            queries: float32 array of shape (dim,) or (n_queries, dim)
+            k: Results per query
+            nprobe: IVF clusters probed per query (ignored without an IVF index)
+            chunk_size: Rows scored per matrix product in brute-force mode
+
+        Returns:
+            Per query, a list of (cell_id, cosine similarity), best first
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+
+        with self._lock:
+            vectors, ids, count, dead = self.vectors, self.ids, self.count, self.dead
+            centroids, assignments = self.centroids, self.assignments
+
+        if not count or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        if centroids is not None:
+            return self._search_ivf(queries, k, nprobe, vectors, ids, centroids, assignments, dead)
+
+        # Batched brute force: keep a running top-k per query across chunks
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, count, chunk_size):
+            scores = queries @ np.asarray(vectors[start:start + chunk_size]).T
+            rows = np.arange(start, start + scores.shape[1], dtype=np.int64)
+            if dead is not None:
+                scores[:, dead[start:start + chunk_size]] = -np.inf
+
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(rows, (len(queries), len(rows)))], axis=1)
+
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+
+            best_scores, best_rows = scores, rows
+
+        results = []
+        for scores, rows in zip(best_scores, best_rows):
+            order = np.argsort(-scores)
+            results.append([(int(ids[rows[i]]), float(scores[i])) for i in order if scores[i] > -np.inf])
+        return results
+
+    def _search_ivf(self, queries, k, nprobe, vectors, ids, centroids, assignments, dead):
+        """Score only live vectors in the nprobe closest clusters of each query"""
+        nprobe = min(nprobe, len(centroids))
+        probes = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        results = []
+        for query, probe in zip(queries, probes):
+            probed = np.isin(assignments, probe)
+            if dead is not None:
+                probed &= ~dead
+            rows = np.nonzero(probed)[0]
+            if not len(rows):
+                results.append([])
+                continue
+
+            scores = np.asarray(vectors[rows]) @ query
+            top = np.argpartition(-scores, min(k, len(rows)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([(int(ids[rows[i]]), float(scores[i])) for i in top])
+        return results
+
+    def similarity(self, query: "np.ndarray", cell_ids: Sequence[int]) -> Dict[int, float]:
+        """
+        Cosine similarity between a query vector and specific cells
+
+        Args:
+            query: float32 array of shape (dim,)
+            cell_ids: Cell ids to score
+
+        Returns:
+            Dict of cell_id -> similarity for ids present in the index
+        """
+        with self._lock:
+            vectors, ids, count, dead = self.vectors, self.ids, self.count, self.dead
+
+        if not count or len(cell_ids) == 0:
+            return {}
+
+        wanted = np.asarray(cell_ids, dtype=np.int64)
+        rows = np.searchsorted(ids, wanted)
+        rows[rows >= count] = 0
+        found = ids[rows] == wanted
+        if dead is not None:
+            found &= ~dead[rows]
+
+        scores = np.asarray(vectors[rows[found]]) @ np.asarray(query, dtype=np.float32)
+        return {int(cell_id): float(score) for cell_id, score in zip(wanted[found], scores)}
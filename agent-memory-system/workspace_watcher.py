@@ -0,0 +1,392 @@
+"""
+Workspace Watcher Module for Self-Organizing Agent Memory System
+Long-running watcher that keeps memory in sync with the markdown workspace
+
+Changes are detected with inotify on Linux (through libc, no extra
+dependency) and by polling file stats elsewhere. Events are debounced, then
+only the touched files go through the incremental importer, which replaces
+the cells of the edited sections and re-consolidates their scenes.
+
+Usage:
+    python workspace_watcher.py /path/to/workspace [--docs] [--poll]
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from memory_db import get_memory_db, MemoryDB
+from memory_manager import MemoryManager
+from import_historical_data import SKIP_DIRS, consolidate_scenes, file_kind, sync_files
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _watched_dir(name: str) -> bool:
+    """Directories searched for importable files"""
+    return name not in SKIP_DIRS and not name.startswith('.')
+
+
+class InotifyBackend:
+    """
+    Change source backed by Linux inotify
+
+    Watches every workspace directory (new ones are added as they appear)
+    and blocks in select() between events, so an idle workspace costs no CPU.
+    """
+
+    def __init__(self, workspace_path: str):
+        """
+        Initialize inotify watches
+
+        Args:
+            workspace_path: Path to workspace directory
+
+        Raises:
+            OSError: If inotify is not available
+        """
+        self.workspace_path = workspace_path
+
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify is only available on Linux")
+
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._dirs: Dict[int, str] = {}  # watch descriptor -> relative directory
+        for root, dirs, _ in os.walk(workspace_path):
+            dirs[:] = [d for d in dirs if _watched_dir(d)]
+            self._add_watch(os.path.relpath(root, workspace_path))
+
+    def _add_watch(self, rel_dir: str) -> None:
+        """Watch one workspace directory"""
+        path = os.path.normpath(os.path.join(self.workspace_path, rel_dir))
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            print(f"Cannot watch '{path}': {os.strerror(ctypes.get_errno())}")
+            return
+        self._dirs[wd] = "" if rel_dir == "." else rel_dir
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        """
+        Wait for changes
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            Changed workspace-relative paths (empty on timeout), or None if
+            events were lost and the whole workspace must be rescanned
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: Set[str] = set()
+        rescan = False
+
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(buf[offset:offset + name_len].rstrip(b"\0"))
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+
+                rel_dir = self._dirs.get(wd)
+                if rel_dir is None or not name:
+                    continue
+                rel = os.path.join(rel_dir, name) if rel_dir else name
+
+                if mask & IN_ISDIR:
+                    if _watched_dir(name):
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            self._add_watch(rel)
+                        # Files inside a moved or created directory were never reported
+                        rescan = True
+                    continue
+
+                changed.add(rel)
+
+        return None if rescan else changed
+
+    def close(self) -> None:
+        """Release the inotify descriptor"""
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """
+    Change source that compares file stats every poll_interval seconds
+
+    Only importable files are tracked, and unchanged files are never opened.
+    """
+
+    def __init__(self, workspace_path: str, include_docs: bool = False, poll_interval: float = 2.0):
+        """
+        Initialize polling backend
+
+        Args:
+            workspace_path: Path to workspace directory
+            include_docs: Also track the other markdown documents at the workspace root
+            poll_interval: Seconds between scans
+        """
+        self.workspace_path = workspace_path
+        self.include_docs = include_docs
+        self.poll_interval = poll_interval
+        self._stats = self._scan()
+
+    def _scan(self) -> Dict[str, tuple]:
+        """(size, mtime_ns) of every importable file"""
+        stats = {}
+        for root, dirs, names in os.walk(self.workspace_path):
+            dirs[:] = [d for d in dirs if _watched_dir(d)]
+            for name in names:
+                rel = os.path.relpath(os.path.join(root, name), self.workspace_path)
+                if file_kind(rel, self.include_docs):
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except FileNotFoundError:
+                        continue
+                    stats[rel] = (stat.st_size, stat.st_mtime_ns)
+        return stats
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        """
+        Wait for changes
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            Changed workspace-relative paths (empty on timeout)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            interval = self.poll_interval
+            if deadline is not None:
+                interval = min(interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(interval)
+
+            stats = self._scan()
+            changed = {
+                rel for rel in stats.keys() | self._stats.keys()
+                if stats.get(rel) != self._stats.get(rel)
+            }
+            self._stats = stats
+
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        """Nothing to release"""
+
+
+class WorkspaceWatcher:
+    """
+    Keeps the memory database in sync with workspace markdown files
+
+    The watcher syncs the whole workspace once on start, then waits for
+    changes. A burst of events (an editor saving several times, a git
+    checkout) is collected until the workspace has been quiet for
+    `debounce` seconds and then synced in one pass.
+    """
+
+    def __init__(
+        self,
+        workspace_path: str,
+        db: Optional[MemoryDB] = None,
+        manager: Optional[MemoryManager] = None,
+        debounce: float = 1.0,
+        poll_interval: float = 2.0,
+        include_docs: bool = False,
+        use_inotify: Optional[bool] = None
+    ):
+        """
+        Initialize watcher
+
+        Args:
+            workspace_path: Path to workspace directory
+            db: Memory database (default: shared instance)
+            manager: Manager used to re-consolidate scenes (default: rule-based, no LLM)
+            debounce: Quiet seconds before a burst of changes is synced
+            poll_interval: Seconds between scans when polling
+            include_docs: Also import the other markdown documents at the workspace root
+            use_inotify: Force (True) or disable (False) inotify; default: use it when available
+        """
+        self.workspace_path = os.path.abspath(workspace_path)
+        self.db = db or get_memory_db()
+        self.manager = manager
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.include_docs = include_docs
+        self.use_inotify = use_inotify
+
+        self.backend = None
+        self.last_report: Optional[Dict] = None
+        self.sync_count = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_backend(self):
+        """inotify when available, polling otherwise"""
+        if self.use_inotify is not False:
+            try:
+                return InotifyBackend(self.workspace_path)
+            except OSError as e:
+                if self.use_inotify:
+                    raise
+                print(f"inotify unavailable ({e}), polling every {self.poll_interval}s")
+
+        return PollingBackend(self.workspace_path, self.include_docs, self.poll_interval)
+
+    def sync(self, paths: Optional[Set[str]] = None) -> Dict:
+        """
+        Sync changed files now and re-consolidate affected scenes
+
+        Args:
+            paths: Workspace-relative paths to sync (default: the whole workspace)
+
+        Returns:
+            Report dict (see import_historical_data.sync_files)
+        """
+        if paths is not None:
+            paths = {p for p in paths if file_kind(p, self.include_docs)}
+            if not paths:
+                return {"scenes": set()}
+
+        # Edits touch a file or two: parse inline rather than starting a process pool
+        report = sync_files(self.db, self.workspace_path, paths, workers=1, include_docs=self.include_docs)
+
+        if report["scenes"]:
+            consolidate_scenes(self.db, report["scenes"], self.manager)
+
+        self.last_report = report
+        self.sync_count += 1
+        return report
+
+    def start(self) -> None:
+        """Sync once and keep watching in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self.backend = self._open_backend()
+        self.sync()
+
+        self._thread = threading.Thread(target=self._run, name="workspace-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop watching
+
+        Args:
+            timeout: Maximum seconds to wait for a running sync to finish
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.backend:
+            self.backend.close()
+            self.backend = None
+
+    def run_forever(self) -> None:
+        """Watch in the foreground until interrupted"""
+        self.start()
+        try:
+            while self._thread and self._thread.is_alive():
+                self._thread.join(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _run(self) -> None:
+        """Watch loop: collect a burst of changes, then sync it"""
+        while not self._stop.is_set():
+            # Short timeout so stop() is noticed promptly
+            changed = self.backend.wait(1.0)
+            if changed is not None and not changed:
+                continue
+
+            # Debounce: keep collecting until the workspace is quiet
+            while not self._stop.is_set():
+                more = self.backend.wait(self.debounce)
+                if more is not None and not more:
+                    break
+                changed = None if changed is None or more is None else changed | more
+
+            if self._stop.is_set():
+                return
+
+            try:
+                report = self.sync(changed)
+            except Exception as e:
+                print(f"Error syncing workspace: {e}")
+                continue
+
+            if report.get("sections_changed"):
+                print(
+                    f"🔄 Synced {report['changed'] + report['removed']} file(s): "
+                    f"{report['sections_changed']} section(s), "
+                    f"+{report['cells_inserted']}/-{report['cells_removed']} cells, "
+                    f"{len(report['scenes'])} scene(s) re-consolidated"
+                )
+
+
+def main():
+    """Watch a workspace from the command line"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    workspace_path = args[0] if args else "/Users/michaelnetto/.openclaw/workspace/"
+
+    watcher = WorkspaceWatcher(
+        workspace_path,
+        include_docs="--docs" in sys.argv,
+        use_inotify=False if "--poll" in sys.argv else None
+    )
+
+    print(f"👀 Watching {watcher.workspace_path} (Ctrl+C to stop)")
+    watcher.run_forever()
+
+
+if __name__ == "__main__":
+    main()